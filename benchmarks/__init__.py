@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+__init__.py
+
+A module that makes the benchmarks runnable with `python -m benchmarks.<name>`
+'''
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+categorical.py
+
+A throughput and allocation benchmark comparing a 'Name|AREA_TYPE' string formatted per address point and split apart
+again against a composite Categorical code.
+Run it from the repository root with `python -m benchmarks.categorical`
+
+Usage:
+  benchmarks.categorical [--points=<points>] [--areas=<areas>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1500000]
+  --areas=<areas>                   The number of distinct area names [default: 300]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import random
+import tracemalloc
+from time import perf_counter
+
+from docopt import docopt
+
+from boost.categorical import Categorical
+
+AREA_TYPES = ['Municipality', 'Unincorporated', 'Other']
+
+
+def per_row(names, area_types):
+    '''what address_counts and postprocess did: format a string per row then split it apart
+    '''
+    name_area = ['{}|{}'.format(name, area_type) for name, area_type in zip(names, area_types)]
+
+    return [value.split('|') for value in name_area]
+
+
+def composite(names, area_types):
+    name_area = Categorical.combine(names, area_types)
+
+    return name_area, [value.split('|') for value in name_area.categories]
+
+
+def measure(label, function, *args):
+    tracemalloc.start()
+    start = perf_counter()
+    result = function(*args)
+    seconds = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:<10} {:>8.3f}s {:>10.1f} MB allocated at peak'.format(label, seconds, peak / 1048576))
+
+    return result
+
+
+def main():
+    options = docopt(__doc__)
+    generator = random.Random(int(options['--seed']))
+    points = int(options['--points'])
+    areas = ['Area {}'.format(i) for i in range(int(options['--areas']))]
+
+    names = [generator.choice(areas) for _ in range(points)]
+    area_types = [generator.choice(AREA_TYPES) for _ in range(points)]
+    print('{:,} address points'.format(points))
+
+    expected = measure('per row', per_row, names, area_types)
+
+    encoded = Categorical.from_values(names), Categorical.from_values(area_types)
+    name_area, parts = measure('composite', composite, *encoded)
+
+    assert [parts[code] for code in name_area.codes.tolist()] == expected, 'the composite codes do not match'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+columns.py
+
+A benchmark of how analyze populates Address_Service_Final. The key, speed, coordinate and analysis area columns are
+computed in memory from the KeyId and FID of each row and then written to a SQLite workspace and, when arcpy can be
+imported and --gdb is given, to a file geodatabase. Each workspace is written a row at a time, the way an update cursor
+does, and with write_columns. The columns read back are compared.
+Run it from the repository root with `python -m benchmarks.columns`
+
+Usage:
+  benchmarks.columns [--rows=<rows>] [--providers=<providers>] [--gdb=<gdb>] [--seed=<seed>]
+
+Options:
+  --rows=<rows>                     The number of Address_Service_Final rows [default: 1000000]
+  --providers=<providers>           The number of service keys [default: 200]
+  --gdb=<gdb>                       An existing file geodatabase to also write to
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from benchmarks.join import synthetic
+from boost import workspaces
+from boost.frame import to_structured
+from boost.join import JoinIndex
+from boost.keys import KeyRegistry
+
+TABLE = 'Address_Service_Final'
+
+
+def identity(rows, providers, seed):
+    '''returns the KeyRegistry, the table as Identity leaves it and the assignment index
+    '''
+    generator = np.random.default_rng(seed)
+    keys = KeyRegistry()
+    for provider in range(providers):
+        keys.register('UT{:03}'.format(provider), int(generator.choice([10, 40, 50, 70])), float(generator.choice([25, 100, 1000])),
+                      float(generator.choice([3, 10, 1000])))
+
+    #: about one in ten address points has no service
+    table = to_structured([
+        ('FID_AddressPoints', np.arange(1, rows + 1, dtype='i4')),
+        ('KeyId', generator.integers(-len(keys) // 10, len(keys) + 1, rows).clip(0).astype('i4')),
+        ('SHAPE@X', generator.uniform(228000, 674000, rows)),
+        ('SHAPE@Y', generator.uniform(4094000, 4653000, rows)),
+    ])
+
+    return keys, table, JoinIndex.from_rows(synthetic(rows, seed))
+
+
+def compute(keys, table, index):
+    '''the columns update_rows writes, computed in memory
+    '''
+    positions = index.positions(table['FID_AddressPoints'])
+
+    return to_structured([('OBJECTID', np.arange(1, len(table) + 1, dtype='i4'))] + keys.columns(table['KeyId']) + [
+        ('x', table['SHAPE@X']),
+        ('y', table['SHAPE@Y']),
+        ('NAME', index.column(2, positions)),
+        ('AREA_TYPE', index.column(1, positions)),
+        ('COUNTYNBR', index.column(0, positions)),
+    ])
+
+
+def sqlite_rows(workspace, columns):
+    '''one UPDATE per row like an update cursor
+    '''
+    fields = [name for name in columns.dtype.names if name != 'OBJECTID']
+    update = 'UPDATE {} SET {} WHERE OBJECTID = ?'.format(TABLE, ', '.join('"{}" = ?'.format(field) for field in fields))
+
+    with workspace.connection as connection:
+        for row in columns[fields + ['OBJECTID']].tolist():
+            connection.execute(update, row)
+
+
+def gdb_rows(workspace, columns):
+    import arcpy
+
+    fields = [name for name in columns.dtype.names if name != 'OBJECTID']
+    with arcpy.da.UpdateCursor(join(workspace.path, TABLE), fields, sql_clause=(None, 'ORDER BY OBJECTID')) as cursor:
+        for row, values in zip(cursor, columns[fields].tolist()):
+            cursor.updateRow(values)
+
+
+def time_write(label, write, workspace, columns):
+    start = perf_counter()
+    write()
+    seconds = perf_counter() - start
+
+    print('{:<24} {:<12} {:>8.3f}s {:>12,.0f} rows/s'.format(type(workspace).__name__, label, seconds, len(columns) / seconds))
+
+    fields = list(columns.dtype.names)
+    rows = list(workspace.read(TABLE, fields))
+    assert len(rows) == len(columns), 'the columns were not written in full'
+    assert [tuple(row) for row in rows[:100]] == columns[:100].tolist(), 'the rows read back do not match'
+
+
+def run(workspace, table, columns, by_row):
+    '''writes the table as Identity leaves it then adds the columns a row at a time and at once
+    '''
+    names = [name for name in columns.dtype.names if name != 'OBJECTID']
+
+    workspace.write_table(TABLE, table)
+    workspace.add_fields(TABLE, [(name, 'TEXT' if columns.dtype[name].kind == 'U' else 'DOUBLE') for name in names])
+    time_write('by row', lambda: by_row(workspace, columns), workspace, columns)
+
+    workspace.write_table(TABLE, table)
+    time_write('by column', lambda: workspace.write_columns(TABLE, 'OBJECTID', columns), workspace, columns)
+
+
+def main():
+    options = docopt(__doc__)
+    keys, table, index = identity(int(options['--rows']), int(options['--providers']), int(options['--seed']))
+    print('{:,} rows'.format(len(table)))
+
+    start = perf_counter()
+    columns = compute(keys, table, index)
+    print('{:<37} {:>8.3f}s'.format('columns computed in memory', perf_counter() - start))
+
+    #: the shape tokens are only read, Identity output does not store them as columns
+    table = to_structured([(name, table[name]) for name in ['FID_AddressPoints', 'KeyId']])
+
+    with TemporaryDirectory() as folder:
+        run(workspaces.create(join(folder, 'benchmark.sqlite')), table, columns, sqlite_rows)
+
+    if options['--gdb']:
+        try:
+            run(workspaces.create(options['--gdb']), table, columns, gdb_rows)
+        except ImportError:
+            print('arcpy is not available, skipping the file geodatabase')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+counts.py
+
+A benchmark comparing the seven group by scans stats used to make over the MSBA table (three address counts and four
+speed tier frequencies) against one MultiCount scan, checking the results are equal.
+Run it from the repository root with `python -m benchmarks.counts`
+
+Usage:
+  benchmarks.counts [--points=<points>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1500000]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+from collections import Counter
+from time import perf_counter
+
+from docopt import docopt
+
+from benchmarks.frame import synthetic
+from boost.frame import MsbaFrame
+
+GROUPS = [
+    ('name_area', ),
+    ('area_type', ),
+    ('county', ),
+    ('down_tier', 'county'),
+    ('up_tier', 'county'),
+    ('down_tier', 'name_area', 'name', 'area_type'),
+    ('up_tier', 'name_area', 'name', 'area_type'),
+]
+
+
+def seven_scans(frame):
+    '''one Counter pass over the decoded columns for every group by, like one Statistics or Frequency tool call each
+    '''
+    columns = {
+        'name_area': frame.name_area.decode().tolist(),
+        'name': frame.name.decode().tolist(),
+        'area_type': frame.area_type.decode().tolist(),
+        'county': frame.county.decode().tolist(),
+        'down_tier': frame.down_tier.tolist(),
+        'up_tier': frame.up_tier.tolist(),
+    }
+
+    results = {}
+    for group in GROUPS:
+        counter = Counter(zip(*[columns[column] for column in group]))
+        results[group] = sorted(counter.items(), key=lambda item: tuple((value is not None, value) for value in item[0]))
+
+    return results, len(GROUPS)
+
+
+def main():
+    options = docopt(__doc__)
+    frame = MsbaFrame.from_rows(synthetic(int(options['--points']), 1, int(options['--seed'])))
+    frame.add_name_area()
+    frame.add_tiers()
+    print('{:,} address points'.format(len(frame)))
+
+    start = perf_counter()
+    expected, scans = seven_scans(frame)
+    print('{} scans {:>8.3f}s'.format(scans, perf_counter() - start))
+
+    start = perf_counter()
+    actual = frame.counts(GROUPS)
+    print('1 scan  {:>8.3f}s'.format(perf_counter() - start))
+
+    assert actual == expected, 'the single scan counts do not match'
+
+
+if __name__ == '__main__':
+    main()
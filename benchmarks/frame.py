@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+frame.py
+
+A benchmark that loads synthetic Address_Service_Final rows into a MsbaFrame, runs the in memory stats steps and
+checks the memory used per address point against MsbaFrame.BYTES_PER_ROW.
+Run it from the repository root with `python -m benchmarks.frame`
+
+Usage:
+  benchmarks.frame [--points=<points>] [--providers=<providers>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1000000]
+  --providers=<providers>           The average number of service rows per address point [default: 2]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import random
+from time import perf_counter
+
+from docopt import docopt
+
+from boost.frame import MsbaFrame
+
+SPEEDS = [0, 0.768, 1.5, 3, 6, 10, 25, 50, 100, 250, 1000]
+AREA_TYPES = ['Municipality', 'Unincorporated', 'Other']
+
+
+def synthetic(points, providers, seed):
+    '''yields Address_Service_Final shaped rows with a random number of providers per address point
+    '''
+    generator = random.Random(seed)
+    for fid in range(1, points + 1):
+        county = str(generator.randint(1, 29))
+        name = 'Area {}'.format(generator.randint(1, 300))
+        area_type = generator.choice(AREA_TYPES)
+
+        for _ in range(generator.randint(1, providers * 2 - 1)):
+            yield fid, generator.choice(SPEEDS), generator.choice(SPEEDS), name, area_type, county
+
+
+def main():
+    options = docopt(__doc__)
+    points = int(options['--points'])
+
+    start = perf_counter()
+    frame = MsbaFrame.from_rows(synthetic(points, int(options['--providers']), int(options['--seed'])))
+    print('load        {:>8.3f}s'.format(perf_counter() - start))
+
+    start = perf_counter()
+    frame.add_name_area()
+    frame.add_tiers()
+    frame.counts([('name_area', ), ('area_type', ), ('county', ), ('down_tier', 'county'), ('up_tier', 'county'),
+                  ('down_tier', 'name_area'), ('up_tier', 'name_area')])
+    print('stats       {:>8.3f}s'.format(perf_counter() - start))
+
+    per_row = frame.nbytes / len(frame)
+    print('{:,} address points, {:.1f} MB, {:.1f} bytes per address point'.format(len(frame), frame.nbytes / 1048576, per_row))
+
+    assert len(frame) == points, 'every address point should have one row'
+    assert per_row <= MsbaFrame.BYTES_PER_ROW, 'the frame uses more than the documented {} bytes per address point'.format(
+        MsbaFrame.BYTES_PER_ROW)
+
+
+if __name__ == '__main__':
+    main()
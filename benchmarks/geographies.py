@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+geographies.py
+
+A benchmark that counts the speed tiers of the area, county and hex geographies with one sparse count and compares it
+with a Counter over each geography and tier column, checking the results are equal.
+Run it from the repository root with `python -m benchmarks.geographies`
+
+Usage:
+  benchmarks.geographies [--points=<points>] [--size=<size>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1500000]
+  --size=<size>                     The hexagon size in meters, smaller makes more units [default: 250]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+from collections import Counter
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from benchmarks.frame import synthetic
+from boost import tiers
+from boost.aggregate import sparse_counts
+from boost.frame import MsbaFrame
+from boost.geographies import AreaGeography
+from boost.geographies import CountyGeography
+from boost.geographies import HexGeography
+
+
+class Counties(object):
+    '''a stand in workspace with the county names CountyGeography reads
+    '''
+
+    def read(self, table, fields):
+        return ((str(county), 'County {}'.format(county)) for county in range(1, 30))
+
+
+def counters(units, tier_columns):
+    '''one Counter pass over the (unit, tier) pairs of every geography and tier column
+    '''
+    results = []
+    for codes, _ in units:
+        results.append([])
+        for column in tier_columns:
+            counter = Counter(zip(column.tolist(), codes.tolist()))
+            results[-1].append(sorted(counter.items()))
+
+    return results
+
+
+def main():
+    options = docopt(__doc__)
+    points = int(options['--points'])
+    generator = np.random.default_rng(int(options['--seed']))
+
+    frame = MsbaFrame.from_rows(synthetic(points, 1, int(options['--seed'])))
+    frame.add_name_area()
+    frame.add_tiers()
+    x = generator.uniform(228000, 674000, points)
+    y = generator.uniform(4094000, 4653000, points)
+
+    start = perf_counter()
+    geographies = [AreaGeography(), CountyGeography(), HexGeography('Hex', float(options['--size']))]
+    units = [geography.assign(frame, Counties(), lambda: (x, y)) for geography in geographies]
+    print('assign      {:>8.3f}s'.format(perf_counter() - start))
+    print('{:,} address points, {:,} units'.format(points, sum(len(unit.categories) for unit in units)))
+
+    codes = [(unit.codes + 1, len(unit.categories) + 1) for unit in units]
+    tier_columns = [frame.down_tier - tiers.MISSING, frame.up_tier - tiers.MISSING]
+
+    start = perf_counter()
+    expected = counters(codes, tier_columns)
+    print('counters    {:>8.3f}s'.format(perf_counter() - start))
+
+    start = perf_counter()
+    actual = sparse_counts(codes, tier_columns, max(tiers.TIERS) - tiers.MISSING + 1)
+    print('sparse      {:>8.3f}s'.format(perf_counter() - start))
+
+    actual = [[sorted(zip(zip(tier_codes.tolist(), unit_codes.tolist()), counts.tolist()))
+               for unit_codes, tier_codes, counts in speeds] for speeds in actual]
+
+    assert actual == expected, 'the sparse counts do not match'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+incremental.py
+
+Times a full shapely analysis against an incremental one for a new submission period where a few percent of the
+service polygons were removed, added or changed speed. Only the service layer of the incremental workspace is written
+again, like a new submission period. The incremental Address_Service_Final must have the same rows as the full one,
+although in another order and with other key ids, and the columns it saves must match its rows. The synthetic service
+areas are large, so a small fraction of changed polygons already touches many of the address points.
+Run it from the repository root with `python -m benchmarks.incremental`
+
+Usage:
+  benchmarks.incremental [--points=<points>] [--change=<change>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 100000]
+  --change=<change>                 The fraction of service polygons removed, added and changed [default: 0.005]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import random
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import fiona
+import numpy as np
+from docopt import docopt
+
+from benchmarks import synthetic
+from boost import sidecar
+from boost import workspaces
+from boost.backends.geos import ShapelyBackend
+from boost.config import feature_classes
+from boost.frame import MsbaFrame
+
+
+def next_period(service, change, generator):
+    '''returns a copy of the service layer with a fraction of the polygons removed, added and given new speeds
+    '''
+    geometries, keys = service
+    count = int(len(keys) * change)
+    keep = sorted(generator.sample(range(len(keys)), len(keys) - count))
+    geometries = list(geometries[keep])
+    keys = [keys[i] for i in keep]
+
+    for i in generator.sample(range(len(keys)), count):
+        provider, tech, _, _ = keys[i]
+        keys[i] = (provider, tech) + generator.choice(synthetic.SPEEDS)
+
+    added = synthetic.service(count, 40, generator)
+
+    return [np.array(geometries + list(added[0]), dtype=object), keys + added[1]]
+
+
+def rows(path):
+    '''the sorted Address_Service_Final rows without the KeyId, after checking every KeyId is the key of its row
+    '''
+    with fiona.open(path, layer=feature_classes['service_keys']) as source:
+        keys = {feature['properties']['KeyId']: tuple(feature['properties'].values())[1:] for feature in source}
+
+    output = []
+    with fiona.open(path, layer=feature_classes['address_service_final']) as source:
+        for feature in source:
+            values = tuple(feature['properties'].values())
+            if values[1]:
+                assert keys[values[1]] == values[2:6], 'a KeyId is not the key of its row'
+
+            output.append((tuple(feature['geometry']['coordinates']), values[:1] + values[2:]))
+
+    return sorted(output, key=repr)
+
+
+def frames(path):
+    '''the MSBA frame from the Address_Service_Final table and from the columns saved next to it
+    '''
+    workspace = workspaces.create(path)
+    table = feature_classes['address_service_final']
+    columns = sidecar.load(workspace, table)
+    assert columns is not None, 'the saved columns are not fresh'
+
+    return (MsbaFrame.from_rows(workspace.read(table, MsbaFrame.source_fields(feature_classes['address_points']))),
+            MsbaFrame.from_columns(columns.fid, columns.down, columns.up, columns.area, columns.areas))
+
+
+def main():
+    options = docopt(__doc__)
+    generator = random.Random(int(options['--seed']))
+    data = synthetic.layers(int(options['--points']), int(options['--seed']))
+    current = dict(data, bb_service=next_period(data['bb_service'], float(options['--change']), generator))
+    output = feature_classes['address_service_final']
+
+    with TemporaryDirectory() as folder:
+        incremental = join(folder, 'incremental.gpkg')
+        full = join(folder, 'full.gpkg')
+
+        #: the last submission period
+        synthetic.write(incremental, data)
+        ShapelyBackend(incremental).address_service(output)
+
+        #: the new period keeps the old service layer under another name
+        synthetic.write(incremental, data, service_layer='previous_service', names=['bb_service'])
+        synthetic.write(incremental, current, names=['bb_service'])
+        synthetic.write(full, current)
+
+        start = perf_counter()
+        ShapelyBackend(full).address_service(output)
+        full_seconds = perf_counter() - start
+
+        start = perf_counter()
+        ShapelyBackend(incremental).incremental(output, 'previous_service')
+        incremental_seconds = perf_counter() - start
+
+        print('full        {:>8.3f}s'.format(full_seconds))
+        print('incremental {:>8.3f}s {:>6.2f}x'.format(incremental_seconds, full_seconds / incremental_seconds))
+
+        assert rows(incremental) == rows(full), 'the incremental analysis does not match a full analysis'
+
+        table, columns = frames(incremental)
+        for column in ['fid', 'frequency', 'max_down', 'max_up']:
+            assert np.array_equal(getattr(table, column), getattr(columns, column)), 'the saved {} does not match'.format(column)
+        for column in ['name', 'area_type', 'county']:
+            assert getattr(table, column).decode().tolist() == getattr(columns, column).decode().tolist(), \
+                'the saved {} does not match'.format(column)
+
+
+if __name__ == '__main__':
+    main()
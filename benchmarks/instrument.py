@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+instrument.py
+
+A benchmark of what the instrumentation costs. It runs the update_rows path analyze takes, reading the key ids and
+coordinates of Address_Service_Final, computing the key columns with a KeyRegistry and writing them back with
+write_columns, against a temporary SQLite workspace with the collector disabled, enabled and enabled with progress. It
+checks that enabling it costs less than 5%.
+Run it from the repository root with `python -m benchmarks.instrument`
+
+Usage:
+  benchmarks.instrument [--rows=<rows>] [--repeat=<repeat>]
+
+Options:
+  --rows=<rows>                     The number of Address_Service_Final rows [default: 1000000]
+  --repeat=<repeat>                 The number of times each run is repeated, the fastest is kept [default: 3]
+'''
+
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from boost import instrument
+from boost import workspaces
+from boost.frame import to_structured
+from boost.keys import KeyRegistry
+
+TABLE = 'Address_Service_Final'
+
+
+def write(workspace, rows):
+    '''writes the identity output update_rows fills in and returns the registry of its key ids
+    '''
+    keys = KeyRegistry()
+    for i in range(21):
+        keys.register('UT{:02}'.format(i), 50, 25.0 * i, 3.0 * i)
+
+    workspace.write_table(TABLE, to_structured([
+        ('KeyId', np.arange(rows) % 22),
+        ('SHAPE_X', np.arange(rows, dtype='f8')),
+        ('SHAPE_Y', np.arange(rows, dtype='f8')),
+    ]))
+
+    return keys
+
+
+def update_rows(workspace, keys):
+    '''the stages of update_rows without the assignment join
+    '''
+    with instrument.stage('update_rows'):
+        with instrument.stage('read'):
+            oid, key_ids, x, y = [np.array(column) for column in zip(*workspace.read(TABLE, ['OBJECTID', 'KeyId', 'SHAPE_X', 'SHAPE_Y']))]
+
+        columns = to_structured([('OBJECTID', oid)] + keys.columns(key_ids) + [('x', x), ('y', y)])
+
+        with instrument.stage('write'):
+            workspace.write_columns(TABLE, 'OBJECTID', columns)
+
+    return len(columns)
+
+
+def fastest(repeat, function, *args):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function(*args)
+        times.append(perf_counter() - start)
+
+    return min(times)
+
+
+def main():
+    options = docopt(__doc__)
+    repeat = int(options['--repeat'])
+
+    with TemporaryDirectory() as folder:
+        workspace = workspaces.create(join(folder, 'benchmark.sqlite'))
+        keys = write(workspace, int(options['--rows']))
+
+        instrument.collector = instrument.NullCollector()
+        disabled = fastest(repeat, update_rows, workspace, keys)
+        print('disabled           {:>8.3f}s'.format(disabled))
+
+        instrument.enable()
+        enabled = fastest(repeat, update_rows, workspace, keys)
+        print('enabled            {:>8.3f}s'.format(enabled))
+
+        instrument.enable(progress=True, interval=0.5)
+        progress = fastest(repeat, update_rows, workspace, keys)
+        print('enabled, progress  {:>8.3f}s'.format(progress))
+        instrument.collector = instrument.NullCollector()
+
+        assert set(workspace.read(TABLE, ['KeyId', 'MaxDown'])) == {(key_id, 25.0 * (key_id - 1) if key_id else 0.0)
+                                                                     for key_id in range(22)}, 'the key columns were not written'
+        workspace.close()
+
+    overhead = enabled / disabled - 1
+    print('overhead when enabled {:.1%}'.format(overhead))
+
+    assert overhead < 0.05, 'the instrumentation costs more than 5% of update_rows'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+join.py
+
+A memory benchmark comparing the peak RSS of the dict of lists join that no_service and join_tables built against a
+JoinIndex over the same rows. Each measurement runs in a fresh process. Peak RSS is read like the instrumentation reads
+it, falling back to the peak of the Python allocations tracemalloc traced where the platform does not report it.
+Run it from the repository root with `python -m benchmarks.join`
+
+Usage:
+  benchmarks.join [--points=<points>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1500000]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import multiprocessing
+import random
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from docopt import docopt
+
+from boost import instrument
+from boost.join import JoinIndex
+
+AREA_TYPES = ['Municipality', 'Unincorporated', 'Other']
+
+
+def synthetic(points, seed):
+    '''yields (fid, county, area type, name) rows like the NoService identity output
+    '''
+    generator = random.Random(seed)
+    names = ['Area {}'.format(i) for i in range(300)]
+    counties = ['{:02}'.format(i) for i in range(1, 30)]
+
+    for fid in range(1, points + 1):
+        yield fid, generator.choice(counties), generator.choice(AREA_TYPES), generator.choice(names)
+
+
+def peak_rss():
+    '''the peak RSS of this process in MB. where it cannot be read the peak of the allocations tracemalloc traced since
+    start_peak is used instead, which leaves out memory allocated outside of Python such as sqlite's page cache
+    '''
+    peak = instrument.peak_rss()
+    if peak is None:
+        _, peak = tracemalloc.get_traced_memory()
+
+    return peak / 1048576
+
+
+def start_peak():
+    if instrument.peak_rss() is None and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def build(mode, points, seed):
+    start_peak()
+    before = peak_rss()
+    start = perf_counter()
+
+    if mode == 'dict':
+        joined = {}
+        for row in synthetic(points, seed):
+            joined[row[0]] = [row[1], row[2], row[3]]
+        sample = joined[points // 2]
+    else:
+        joined = JoinIndex.from_rows(synthetic(points, seed))
+        positions = joined.positions([points // 2])
+        sample = [joined.column(i, positions)[0] for i in range(3)]
+
+    return mode, perf_counter() - start, peak_rss() - before, sample
+
+
+def main():
+    options = docopt(__doc__)
+    points = int(options['--points'])
+    seed = int(options['--seed'])
+
+    samples = []
+    for mode in ['dict', 'index']:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            mode, seconds, rss, sample = executor.submit(build, mode, points, seed).result()
+
+        samples.append(sample)
+        print('{:<6} {:>8.3f}s {:>10.1f} MB peak RSS growth'.format(mode, seconds, rss))
+
+    assert samples[0] == samples[1], 'the index does not return the same values as the dict'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+max_speeds.py
+
+A benchmark comparing the max speed reduction MsbaFrame.from_rows did before MaxSpeedReducer, which kept every
+Address_Service_Final row in typed arrays and then sorted and reduced them with numpy, against the one pass
+MaxSpeedReducer it uses now. The reducer's memory grows with the address points rather than the rows.
+Run it from the repository root with `python -m benchmarks.max_speeds`
+
+Usage:
+  benchmarks.max_speeds [--points=<points>] [--providers=<providers>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1000000]
+  --providers=<providers>           The average number of service rows per address point [default: 2]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import tracemalloc
+from array import array
+from math import nan
+from sys import intern
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from benchmarks.frame import synthetic
+from boost.categorical import Categorical
+from boost.frame import MsbaFrame
+
+
+def materialized(rows):
+    '''what from_rows did before the reducer: every row is kept with its text interned, then a stable sort by fid,
+    fmax.reduceat for the speeds and the first row of each address point for its area, encoded as the frame holds it
+    '''
+    fids = array('q')
+    downs = array('d')
+    ups = array('d')
+    names = []
+    area_types = []
+    counties = []
+
+    for fid, down, up, name, area_type, county in rows:
+        fids.append(fid)
+        downs.append(nan if down is None else down)
+        ups.append(nan if up is None else up)
+        names.append(name if name is None else intern(name))
+        area_types.append(area_type if area_type is None else intern(area_type))
+        counties.append(county if county is None else intern(county))
+
+    fid = np.frombuffer(fids, dtype='i8')
+    order = np.argsort(fid, kind='stable')
+    fid = fid[order]
+    starts = np.flatnonzero(np.r_[True, fid[1:] != fid[:-1]])
+    first = order[starts]
+
+    frame = MsbaFrame()
+    frame.fid = fid[starts].astype('i4')
+    frame.max_down = np.fmax.reduceat(np.frombuffer(downs, dtype='f8')[order], starts)
+    frame.max_up = np.fmax.reduceat(np.frombuffer(ups, dtype='f8')[order], starts)
+    frame.name, frame.area_type, frame.county = [Categorical.from_values(np.array(values, dtype=object)[first].tolist())
+                                                 for values in [names, area_types, counties]]
+
+    return frame
+
+
+def decoded(frame):
+    '''the fids, max speeds and areas of a frame as lists
+    '''
+    areas = zip(frame.name.decode().tolist(), frame.area_type.decode().tolist(), frame.county.decode().tolist())
+
+    return frame.fid.tolist(), frame.max_down.tolist(), frame.max_up.tolist(), list(areas)
+
+
+def measure(label, function, rows):
+    '''times the function then runs it again under tracemalloc for its peak allocations, which slows it down
+    '''
+    start = perf_counter()
+    result = function(rows)
+    seconds = perf_counter() - start
+
+    tracemalloc.start()
+    function(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:<14} {:>8.3f}s {:>10.1f} MB peak'.format(label, seconds, peak / 1048576))
+
+    return result
+
+
+def main():
+    options = docopt(__doc__)
+    rows = list(synthetic(int(options['--points']), int(options['--providers']), int(options['--seed'])))
+    print('{:,} Address_Service_Final rows'.format(len(rows)))
+
+    expected = measure('materialized', materialized, rows)
+    actual = measure('one pass', MsbaFrame.from_rows, rows)
+
+    assert decoded(actual) == decoded(expected), 'the reducer does not match the materialized reduction'
+
+
+if __name__ == '__main__':
+    main()
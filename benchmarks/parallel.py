@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+parallel.py
+
+A scaling benchmark for the county partitioned shapely join with 1, 2, 4 and 8 worker processes on synthetic data.
+Every run must produce the same Address_Service_Final rows as the single process join.
+Run it from the repository root with `python -m benchmarks.parallel`
+
+Usage:
+  benchmarks.parallel [--points=<points>] [--jobs=<jobs>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1000000]
+  --jobs=<jobs>                     The comma separated worker counts [default: 1,2,4,8]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+from time import perf_counter
+
+from docopt import docopt
+
+from benchmarks import synthetic
+from boost.backends.geos import ShapelyBackend
+from boost.backends.geos import encode_keys
+
+
+def main():
+    options = docopt(__doc__)
+    data = synthetic.layers(int(options['--points']), int(options['--seed']))
+
+    fids, x, y = data['address_points']
+    geometries, keys = data['bb_service']
+    polygon_keys, keys = encode_keys(keys)
+    service = [geometries, polygon_keys]
+    backend = ShapelyBackend(None)
+
+    expected = None
+    baseline = None
+    for jobs in [int(jobs) for jobs in options['--jobs'].split(',')]:
+        start = perf_counter()
+        rows = list(backend.rows(fids, x, y, service, keys, data['municip'], data['unincorp'], data['counties'], jobs))
+        seconds = perf_counter() - start
+
+        baseline = baseline or seconds
+        expected = expected or rows
+        print('{} jobs {:>8.3f}s {:>6.2f}x {:>12,} rows'.format(jobs, seconds, baseline / seconds, len(rows)))
+
+        assert rows == expected, 'the partitioned join does not match'
+
+
+if __name__ == '__main__':
+    main()
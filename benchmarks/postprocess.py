@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+postprocess.py
+
+A benchmark of writing a postprocess area CSV for many areas, such as census blocks, comparing the nested dict writer
+postprocess used to have against the TierMatrix writer. The two CSVs must be identical.
+Run it from the repository root with `python -m benchmarks.postprocess`
+
+Usage:
+  benchmarks.postprocess [--areas=<areas>] [--seed=<seed>]
+
+Options:
+  --areas=<areas>                   The number of areas [default: 50000]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import csv
+import random
+import tracemalloc
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from docopt import docopt
+
+from boost.commands.postprocess import PostProcess
+from boost.report import HEADER
+from boost.report import TierMatrix
+from boost.report import write_csv
+
+
+def frequency_rows(areas, speeds, seed):
+    '''yields (frequency, tier, name, area type) rows sorted by tier like the stats area tables
+    '''
+    generator = random.Random(seed)
+    rows = []
+    for area in range(areas):
+        name = 'Block {}'.format(area)
+        for tier in generator.sample(list(speeds), generator.randint(1, 4)):
+            rows.append((generator.randint(1, 500), tier, name, 'Block'))
+
+    return sorted(rows, key=lambda row: row[1])
+
+
+def nested_dict(path, rows, speeds):
+    '''the nested dict and setdefault writer postprocess used before TierMatrix
+    '''
+    data = {}
+    for frequency, tier, area_name, area_type in rows:
+        data.setdefault((area_name, area_type), {})
+        data[(area_name, area_type)][tier] = frequency
+
+    with open(path, 'w', newline='\n') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+
+        for name in sorted(data, key=lambda name: '{}|{}'.format(*name)):
+            area_dict = data[name]
+            total = 0.0
+            for speed in speeds:
+                total = total + area_dict.setdefault(speed, 0)
+
+            for tier in area_dict:
+                frequency = area_dict[tier]
+                percentage = round(frequency / total, 3) if total > 0 else 0
+                writer.writerow([name[0], name[1], tier, speeds[tier], percentage, frequency, total])
+
+
+def tier_matrix(path, rows, speeds):
+    matrix = TierMatrix.from_rows((((name, area_type), tier, frequency) for frequency, tier, name, area_type in rows), speeds)
+    write_csv(path, matrix.sort(lambda area: '{}|{}'.format(*area)), tuple, speeds)
+
+
+def measure(function, *args):
+    '''times a run and then measures the peak memory of a second run under tracemalloc, which slows it down
+    '''
+    start = perf_counter()
+    function(*args)
+    seconds = perf_counter() - start
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main():
+    options = docopt(__doc__)
+    speeds = PostProcess.upload_speeds['MaxDown']
+    rows = frequency_rows(int(options['--areas']), speeds, int(options['--seed']))
+    print('{:,} areas, {:,} frequency rows'.format(int(options['--areas']), len(rows)))
+
+    with TemporaryDirectory() as folder:
+        outputs = []
+        for name, function in [('nested dict', nested_dict), ('tier matrix', tier_matrix)]:
+            path = join(folder, '{}.csv'.format(name.replace(' ', '_')))
+            seconds, peak = measure(function, path, rows, speeds)
+            print('{:<12} {:>8.3f}s {:>8.1f} MB peak'.format(name, seconds, peak / 1048576))
+
+            with open(path, newline='') as file:
+                outputs.append(file.read())
+
+        assert outputs[0] == outputs[1], 'the CSVs do not match'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+sidecar.py
+
+A benchmark of how stats loads Address_Service_Final. Synthetic rows are written to a temporary SQLite workspace along
+with the columns analyze saves next to it. The MsbaFrame is built by reading the table with the workspace cursor and by
+memory mapping the saved columns, and the two frames are compared.
+Run it from the repository root with `python -m benchmarks.sidecar`
+
+Usage:
+  benchmarks.sidecar [--points=<points>] [--providers=<providers>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1000000]
+  --providers=<providers>           The average number of service rows per address point [default: 2]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from benchmarks.frame import synthetic
+from boost import sidecar
+from boost import workspaces
+from boost.frame import MsbaFrame
+from boost.frame import to_structured
+
+TABLE = 'Address_Service_Final'
+FIELDS = ['FID_AddressPoints', 'KeyId', 'Provider', 'TechType', 'MaxDown', 'MaxUp', 'x', 'y', 'NAME', 'AREA_TYPE', 'COUNTYNBR']
+
+
+def address_service(points, providers, seed):
+    '''Address_Service_Final rows laid out like address_service_rows yields them
+    '''
+    for i, (fid, down, up, name, area_type, county) in enumerate(synthetic(points, providers, seed)):
+        yield fid, i % 50 + 1, 'UT{:02}'.format(i % 50), '50', down, up, float(fid), float(fid), name, area_type, county
+
+
+def write(workspace, rows):
+    '''writes the table and saves its columns like analyze does
+    '''
+    columns = sidecar.ColumnWriter()
+    for row in rows:
+        columns.append(row)
+
+    workspace.write_table(TABLE, to_structured(list(zip(FIELDS, zip(*rows)))))
+    columns.write(workspace, TABLE)
+
+
+def timed(label, function, *args):
+    start = perf_counter()
+    result = function(*args)
+    print('{:<10} {:>8.3f}s'.format(label, perf_counter() - start))
+
+    return result
+
+
+def from_cursor(workspace):
+    return MsbaFrame.from_rows(workspace.read(TABLE, MsbaFrame.source_fields('AddressPoints')))
+
+
+def from_columns(workspace):
+    columns = sidecar.load(workspace, TABLE)
+    assert columns is not None, 'the saved columns are not fresh'
+
+    return MsbaFrame.from_columns(columns.fid, columns.down, columns.up, columns.area, columns.areas)
+
+
+def main():
+    options = docopt(__doc__)
+    rows = list(address_service(int(options['--points']), int(options['--providers']), int(options['--seed'])))
+    print('{:,} rows'.format(len(rows)))
+
+    with TemporaryDirectory() as folder:
+        workspace = workspaces.create(join(folder, 'benchmark.sqlite'))
+        timed('write', write, workspace, rows)
+        del rows
+
+        cursor = timed('cursor', from_cursor, workspace)
+        mapped = timed('columns', from_columns, workspace)
+
+        for column in ['fid', 'frequency', 'max_down', 'max_up']:
+            assert np.array_equal(getattr(cursor, column), getattr(mapped, column), equal_nan=True), '{} does not match'.format(column)
+        for column in ['name', 'area_type', 'county']:
+            assert getattr(cursor, column).decode().tolist() == getattr(mapped, column).decode().tolist(), '{} does not match'.format(column)
+
+        #: a table that changed since the columns were saved is read with the cursor
+        workspace.connection.execute('DELETE FROM {} WHERE OBJECTID = 1'.format(TABLE))
+        workspace.connection.commit()
+        assert sidecar.load(workspace, TABLE) is None, 'the saved columns were used after the table changed'
+
+    print('{:,} address points'.format(len(cursor)))
+
+
+if __name__ == '__main__':
+    main()
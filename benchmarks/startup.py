@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+startup.py
+
+A benchmark of how long the boost cli takes to start. Each command line runs in a fresh interpreter with
+`python -X importtime` and the slowest modules it imported are printed. tests/test_startup.py checks which modules each
+command line must not import.
+Run it from the repository root with `python -m benchmarks.startup`
+
+Usage:
+  benchmarks.startup [--repeat=<repeat>]
+
+Options:
+  --repeat=<repeat>                 The number of times each command line is run, the fastest is kept [default: 5]
+'''
+
+import subprocess
+import sys
+from time import perf_counter
+
+from docopt import docopt
+
+COMMAND_LINES = [
+    ['--help'],
+    ['--version'],
+    ['postprocess', '--target', '.', '--workspace', 'missing.gpkg'],
+]
+
+
+def imports(arguments):
+    '''runs boost with the arguments under -X importtime and returns the seconds it took and the imported modules with
+    their cumulative import microseconds
+    '''
+    start = perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'boost'] + arguments, capture_output=True, text=True)
+    seconds = perf_counter() - start
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        modules[name] = int(cumulative)
+
+    return seconds, modules
+
+
+def main():
+    options = docopt(__doc__)
+
+    for arguments in COMMAND_LINES:
+        runs = [imports(arguments) for _ in range(int(options['--repeat']))]
+        seconds, modules = min(runs, key=lambda run: run[0])
+        top = [name for name in modules if '.' not in name]
+        slowest = sorted(top, key=modules.get, reverse=True)[:3]
+
+        print('boost {:<60} {:>7.3f}s {:>4} modules, slowest {}'.format(
+            ' '.join(arguments), seconds, len(modules), ', '.join('{} {:.0f}ms'.format(name, modules[name] / 1000) for name in slowest)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+suite.py
+
+A benchmark suite that times every stage from the address service join to the postprocess CSVs on synthetic statewide
+shaped layers at one or more scales without ArcGIS. The layers come from benchmarks.synthetic, the join runs with the
+shapely backend in memory and populate_keys, stats and postprocess run against a SQLite workspace, with
+populate_keys writing the key columns with write_columns as analyze does. Each scale runs in a fresh process so its
+peak RSS is its own.
+
+The results of every run are appended to a JSON file with the boost version so regressions between releases show up.
+Run it from the repository root with `python -m benchmarks.suite`
+
+Usage:
+  benchmarks.suite [--points=<points>] [--service=<service>] [--providers=<providers>] [--seed=<seed>] [--output=<output>] [--folder=<folder>]
+
+Options:
+  --points=<points>                 The comma separated numbers of address points [default: 10000,100000,1000000]
+  --service=<service>               The number of service areas [default: 500]
+  --providers=<providers>           The number of providers [default: 40]
+  --seed=<seed>                     The random seed [default: 0]
+  --output=<output>                 The JSON file the results are appended to [default: benchmarks/results.json]
+  --folder=<folder>                 The folder the workspaces and CSVs are written to, a temporary folder by default
+'''
+
+import json
+import multiprocessing
+import platform
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from os import makedirs
+from os.path import exists
+from os.path import join
+from tempfile import mkdtemp
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from benchmarks import synthetic
+from boost import __version__
+from boost import instrument
+from boost import tiers
+from boost.backends.geos import address_service_rows
+from boost.backends.geos import area_values
+from boost.backends.geos import encode_keys
+from boost.backends.geos import join_partition
+from boost.commands.postprocess import PostProcess
+from boost.commands.stats import Stats
+from boost.config import feature_classes
+from boost.frame import to_structured
+from boost.workspaces import create
+
+
+class Timer(object):
+    '''collects the seconds each stage takes
+    '''
+
+    def __init__(self):
+        self.seconds = {}
+
+    def time(self, stage, function, *args):
+        start = perf_counter()
+        result = function(*args)
+        self.seconds[stage] = round(perf_counter() - start, 4)
+        print('{:<16}{:>10.3f}s'.format(stage, self.seconds[stage]))
+
+        return result
+
+
+def peak_rss():
+    '''the peak RSS of this process in MB. where it cannot be read the peak of the allocations tracemalloc traced since
+    start_peak is used instead, which leaves out memory allocated outside of Python such as sqlite's page cache
+    '''
+    peak = instrument.peak_rss()
+    if peak is None:
+        _, peak = tracemalloc.get_traced_memory()
+
+    return peak / 1048576
+
+
+def start_peak():
+    if instrument.peak_rss() is None and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def join_layers(layers):
+    '''joins the address points to the service and area layers in memory and returns the Address_Service_Final rows and
+    the KeyRegistry
+    '''
+    fids, x, y = layers['address_points']
+    service = layers['bb_service']
+    polygon_keys, keys = encode_keys(service[1])
+
+    point_index, key_index, *covering_indexes = join_partition(x, y, service[0], polygon_keys, len(keys) + 1,
+                                                                layers['municip'][0], layers['unincorp'][0],
+                                                                layers['counties'][0])
+    areas = area_values(*covering_indexes, layers['municip'], layers['unincorp'], layers['counties'])
+
+    return list(address_service_rows(fids, x, y, point_index, key_index, keys, areas)), keys
+
+
+def populate_keys(workspace, keys):
+    '''reads the KeyId of every joined row back, computes the columns the populate_keys and fill_no_service steps
+    write from it alone, as Identity leaves the rows, writes them with write_columns like update_rows does and checks
+    they match the joined rows
+    '''
+    table = feature_classes['address_service_final']
+    oid, key_ids, joined = [np.array(column) for column in zip(*workspace.read(table, ['OBJECTID', 'KeyId', 'MaxDown']))]
+    columns = to_structured([('OBJECTID', oid)] + keys.columns(key_ids))
+
+    assert columns['MaxDown'].tolist() == joined.tolist(), 'populate_keys does not match the join'
+
+    workspace.write_columns(table, 'OBJECTID', columns)
+
+    return len(columns)
+
+
+def write_inputs(workspace, rows, layers):
+    '''writes Address_Service_Final and the county names stats reads
+    '''
+    addr_fc = feature_classes['address_points']
+    fields = [f'FID_{addr_fc}', 'KeyId', 'Provider', 'TechType', 'MaxDown', 'MaxUp', 'x', 'y', 'NAME', 'AREA_TYPE', 'COUNTYNBR']
+    columns = list(zip(*rows)) if rows else [[] for _ in fields]
+
+    workspace.write_table(feature_classes['address_service_final'], to_structured(list(zip(fields, columns))))
+    workspace.write_table(feature_classes['counties'],
+                          to_structured([('NAME', layers['counties'][1]), ('COUNTYNBR', layers['counties'][2])]))
+
+
+def run(points, options, folder):
+    '''runs every stage for one scale and returns its result record
+    '''
+    start_peak()
+    timer = Timer()
+    print('{:,} address points'.format(points))
+
+    layers = timer.time('generate', synthetic.layers, points, int(options['--seed']), int(options['--service']),
+                        int(options['--providers']))
+    rows, keys = timer.time('join', join_layers, layers)
+
+    path = join(folder, 'suite_{}.sqlite'.format(points))
+    workspace = create(path)
+    timer.time('write', write_inputs, workspace, rows, layers)
+    del rows
+    timer.time('populate_keys', populate_keys, workspace, keys)
+
+    stats = Stats({'--workspace': path, '--geographies': None, '--resume': False})
+    stats.validate(stats.options)
+    frame = timer.time('max_speeds', stats.max_speeds, feature_classes['address_service_final'])
+    timer.time('speed_tiers', stats.speed_tiers, frame)
+    timer.time('address_counts', lambda: stats.address_counts(stats.count(frame), feature_classes['address_count_area'],
+                                                              feature_classes['address_count_type'],
+                                                              feature_classes['address_count_county']))
+    timer.time('speed_counts', stats.speed_counts, frame, stats.geographies)
+    timer.time('joint_counts', stats.joint_counts, frame, tiers.JOINT_TABLE)
+    timer.time('write_msba', stats.write_msba, frame, feature_classes['msba'])
+
+    target = join(folder, 'csv_{}'.format(points))
+    makedirs(target, exist_ok=True)
+    postprocess = PostProcess({'--workspace': path, '--target': target, '--geographies': None, '--resume': False})
+    postprocess.validate(postprocess.options)
+    timer.time('postprocess', postprocess.write_csvs, target, postprocess.workspace, postprocess.levels())
+
+    return {
+        'points': points,
+        'rows': len(frame) and int(frame.frequency.sum()),
+        'seconds': timer.seconds,
+        'total': round(sum(timer.seconds.values()), 4),
+        'peak_rss_mb': round(peak_rss(), 1),
+    }
+
+
+def main():
+    options = docopt(__doc__)
+    folder = options['--folder'] or mkdtemp(prefix='boost_suite_')
+    makedirs(folder, exist_ok=True)
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for points in [int(value) for value in options['--points'].split(',')]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(run, points, options, folder).result())
+
+    history = []
+    if exists(options['--output']):
+        with open(options['--output']) as output:
+            history = json.load(output)
+
+    history.append({
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'options': {name.lstrip('-'): options[name] for name in ['--service', '--providers', '--seed']},
+        'results': results,
+    })
+
+    with open(options['--output'], 'w') as output:
+        json.dump(history, output, indent=2)
+
+    print('results appended to {}'.format(options['--output']))
+
+
+if __name__ == '__main__':
+    main()
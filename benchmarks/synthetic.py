@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+synthetic.py
+
+A module that generates statewide shaped synthetic layers for the benchmarks. Counties are a grid of rectangles,
+municipalities and unincorporated places are smaller rectangles inside them and service areas are rectangles with
+realistic provider, technology and speed keys.
+'''
+
+import random
+
+import numpy as np
+from shapely.geometry import box
+
+#: roughly the extent of Utah in UTM zone 12N meters
+EXTENT = (228000, 4094000, 674000, 4653000)
+TECHNOLOGIES = [10, 40, 41, 42, 50, 60, 70]
+SPEEDS = [(0.768, 0.2), (1.5, 0.768), (3, 0.768), (6, 1.5), (10, 1), (25, 3), (50, 5), (100, 10), (250, 25), (1000, 1000)]
+
+
+def counties(columns=6, rows=5):
+    '''returns a [geometries, names, county numbers] layer tiling the extent
+    '''
+    minx, miny, maxx, maxy = EXTENT
+    width = (maxx - minx) / columns
+    height = (maxy - miny) / rows
+
+    geometries = []
+    names = []
+    numbers = []
+    for row in range(rows):
+        for column in range(columns):
+            geometries.append(box(minx + column * width, miny + row * height, minx + (column + 1) * width,
+                                  miny + (row + 1) * height))
+            names.append('County {}'.format(len(names) + 1))
+            numbers.append('{:02}'.format(len(numbers) + 1))
+
+    return [np.array(geometries, dtype=object), names, numbers]
+
+
+def places(county_layer, per_county, prefix, generator, size=0.15):
+    '''returns a [geometries, names] layer of rectangles inside each county
+    '''
+    geometries = []
+    names = []
+    for county in county_layer[0]:
+        minx, miny, maxx, maxy = county.bounds
+        for _ in range(per_county):
+            width = (maxx - minx) * size * generator.uniform(0.3, 1)
+            height = (maxy - miny) * size * generator.uniform(0.3, 1)
+            x = generator.uniform(minx, maxx - width)
+            y = generator.uniform(miny, maxy - height)
+
+            geometries.append(box(x, y, x + width, y + height))
+            names.append('{} {}'.format(prefix, len(names) + 1))
+
+    return [np.array(geometries, dtype=object), names]
+
+
+def service(count, providers, generator):
+    '''returns [geometries, keys] where each key is a (provider, tech, down, up) tuple
+    '''
+    minx, miny, maxx, maxy = EXTENT
+    geometries = []
+    keys = []
+    for _ in range(count):
+        width = generator.uniform(2000, 60000)
+        height = generator.uniform(2000, 60000)
+        x = generator.uniform(minx, maxx - width)
+        y = generator.uniform(miny, maxy - height)
+        down, up = generator.choice(SPEEDS)
+
+        geometries.append(box(x, y, x + width, y + height))
+        keys.append(('UT{:02}'.format(generator.randint(1, providers)), generator.choice(TECHNOLOGIES), down, up))
+
+    return [np.array(geometries, dtype=object), keys]
+
+
+def address_points(count, generator):
+    '''returns fids, x and y for points spread across the extent
+    '''
+    minx, miny, maxx, maxy = EXTENT
+    x = np.array([generator.uniform(minx, maxx) for _ in range(count)], dtype='f8')
+    y = np.array([generator.uniform(miny, maxy) for _ in range(count)], dtype='f8')
+
+    return list(range(1, count + 1)), x, y
+
+
+def layers(points, seed=0, service_areas=2000, providers=40):
+    '''returns every layer the analysis needs as a dict
+    '''
+    generator = random.Random(seed)
+    county_layer = counties()
+
+    return {
+        'address_points': address_points(points, generator),
+        'bb_service': service(service_areas, providers, generator),
+        'counties': county_layer,
+        'municip': places(county_layer, 8, 'City', generator),
+        'unincorp': places(county_layer, 4, 'Place', generator, size=0.25),
+    }
+
+
+def write(path, data, service_layer=None, names=None):
+    '''writes the layers to a GeoPackage with the names in config.py. service_layer overrides the name of the service
+    layer and names limits the layers written to those keys of data
+    '''
+    import fiona
+    from shapely.geometry import mapping
+
+    from boost.config import feature_classes
+
+    def sink(name, geometry, properties):
+        return fiona.open(path, 'w', driver='GPKG', layer=name, crs='EPSG:26912',
+                          schema={'geometry': geometry, 'properties': properties})
+
+    names = list(data) if names is None else names
+
+    if 'address_points' in names:
+        fids, x, y = data['address_points']
+        with sink(feature_classes['address_points'], 'Point', {'ADDR': 'str'}) as layer:
+            layer.writerecords([{
+                'geometry': {'type': 'Point', 'coordinates': (x[i], y[i])},
+                'properties': {'ADDR': str(fid)},
+            } for i, fid in enumerate(fids)])
+
+    if 'bb_service' in names:
+        geometries, keys = data['bb_service']
+        fields = {'UTProvCode': 'str', 'TRANSTECH': 'int', 'MAXADDOWN': 'float', 'MAXADUP': 'float'}
+        with sink(service_layer or feature_classes['bb_service'], 'Polygon', fields) as layer:
+            layer.writerecords([{
+                'geometry': mapping(geometry),
+                'properties': dict(zip(fields, key)),
+            } for geometry, key in zip(geometries, keys)])
+
+    for name, fields in [('counties', ['NAME', 'COUNTYNBR']), ('municip', ['NAME']), ('unincorp', ['PLACENAME'])]:
+        if name not in names:
+            continue
+
+        with sink(feature_classes[name], 'Polygon', {field: 'str' for field in fields}) as layer:
+            layer.writerecords([{
+                'geometry': mapping(geometry),
+                'properties': dict(zip(fields, values)),
+            } for geometry, *values in zip(*data[name])])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+tiers.py
+
+A benchmark comparing the original if/elif speed tier ladder against boost.tiers.
+Run it from the repository root with `python -m benchmarks.tiers`
+
+Usage:
+  benchmarks.tiers [--rows=<rows>] [--seed=<seed>]
+
+Options:
+  --rows=<rows>                     The number of synthetic rows [default: 5000000]
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+import random
+from time import perf_counter
+
+import numpy as np
+from docopt import docopt
+
+from boost import tiers
+
+#: speeds that are commonly advertised plus every breakpoint so the boundaries are exercised
+SPEEDS = [0, 0.2, 0.5, 0.768, 1, 1.5, 2, 3, 5, 6, 7, 10, 12, 15, 25, 30, 50, 75, 100, 250, 500, 940, 1000, 2000]
+
+
+def ladder(value):
+    '''the per row classification that Stats.speed_tiers used to run
+    '''
+    if value < 0.768:
+        return 0
+    elif 0.768 <= value < 1.5:
+        return 3
+    elif 1.5 <= value < 3:
+        return 4
+    elif 3 <= value < 6:
+        return 5
+    elif 6 <= value < 10:
+        return 6
+    elif 10 <= value < 25:
+        return 7
+    elif 25 <= value < 50:
+        return 8
+    elif 50 <= value < 100:
+        return 9
+    elif 100 <= value < 1000:
+        return 10
+    elif value >= 1000:
+        return 11
+
+
+def synthetic(rows, seed):
+    '''create a download and upload column of random advertised speeds
+    '''
+    generator = random.Random(seed)
+    down = [generator.choice(SPEEDS) for _ in range(rows)]
+    up = [generator.choice(SPEEDS) for _ in range(rows)]
+
+    return down, up
+
+
+def timed(label, function, *args):
+    start = perf_counter()
+    result = function(*args)
+    print('{:<12} {:>8.3f}s'.format(label, perf_counter() - start))
+
+    return result
+
+
+def main():
+    options = docopt(__doc__)
+    rows = int(options['--rows'])
+
+    down, up = synthetic(rows, int(options['--seed']))
+    print('classifying {:,} rows'.format(rows))
+
+    expected = timed('ladder', lambda: ([ladder(value) for value in down], [ladder(value) for value in up]))
+    vectorized = timed('numpy', tiers.classify_speeds, np.asarray(down), np.asarray(up))
+
+    assert [column.tolist() for column in vectorized] == list(expected), 'numpy tiers do not match the ladder'
+
+
+if __name__ == '__main__':
+    main()
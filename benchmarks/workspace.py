@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+workspace.py
+
+A benchmark of the bulk table write throughput of the workspaces. An MSBA shaped table is built from synthetic address
+points and written to a temporary SQLite database and, when arcpy can be imported and --gdb is given, to a file
+geodatabase. The rows are read back and compared.
+Run it from the repository root with `python -m benchmarks.workspace`
+
+Usage:
+  benchmarks.workspace [--points=<points>] [--gdb=<gdb>] [--seed=<seed>]
+
+Options:
+  --points=<points>                 The number of address points [default: 1000000]
+  --gdb=<gdb>                       An existing file geodatabase to also write to
+  --seed=<seed>                     The random seed [default: 0]
+'''
+
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from docopt import docopt
+
+from benchmarks.frame import synthetic
+from boost import workspaces
+from boost.frame import MsbaFrame
+from boost.frame import to_structured
+
+
+def msba(frame):
+    frame.add_name_area()
+    frame.add_tiers()
+
+    return to_structured([
+        ('FID_AddressPoints', frame.fid),
+        ('FREQUENCY', frame.frequency),
+        ('MAX_MaxDown', frame.max_down),
+        ('MAX_MaxUp', frame.max_up),
+        ('NAME', frame.name),
+        ('AREA_TYPE', frame.area_type),
+        ('COUNTYNBR', frame.county),
+        ('Name_Area', frame.name_area),
+        ('MaxDown_Tier', frame.down_tier),
+        ('MaxUp_Tier', frame.up_tier),
+    ])
+
+
+def time_write(workspace, array):
+    start = perf_counter()
+    workspace.write_table('MSBA', array)
+    seconds = perf_counter() - start
+
+    print('{:<24} {:>8.3f}s {:>12,.0f} rows/s'.format(type(workspace).__name__, seconds, len(array) / seconds))
+
+    fields = list(array.dtype.names)
+    rows = list(workspace.read('MSBA', fields))
+    assert len(rows) == len(array), 'the table was not written in full'
+    assert [tuple(row) for row in rows[:100]] == array[:100].tolist(), 'the rows read back do not match'
+
+
+def main():
+    options = docopt(__doc__)
+    array = msba(MsbaFrame.from_rows(synthetic(int(options['--points']), 1, int(options['--seed']))))
+    print('{:,} rows'.format(len(array)))
+
+    with TemporaryDirectory() as folder:
+        time_write(workspaces.create(join(folder, 'benchmark.sqlite')), array)
+
+    if options['--gdb']:
+        try:
+            time_write(workspaces.create(options['--gdb']), array)
+        except ImportError:
+            print('arcpy is not available, skipping the file geodatabase')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,4 +8,5 @@ A module that allows this package to be run from `python -m boost`
 
 from .cli import main
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+aggregate.py
+
+A module that computes many group by counts over integer coded columns with a single scan of the rows
+'''
+
+from collections import OrderedDict
+
+import numpy as np
+
+#: the largest number of combinations counted with a dense np.bincount (32 MB of int64 counts). past this the cells are
+#: found with np.unique instead
+DENSE_LIMIT = 1 << 22
+
+
+class MultiCount(object):
+    '''counts rows for several group bys with one scan.
+
+    every column is an array of integer codes in [0, cardinality). the rows are counted once on the mixed radix
+    combination of all the columns, which leaves one count per non-zero cell. each group by is then a weighted bincount
+    over those cells, which number in the thousands rather than the millions.
+
+    a derived column maps the codes of a base column to new codes, for example area type from a name and area type
+    composite, so it can be grouped on without being part of the scan.
+    '''
+
+    def __init__(self):
+        self.columns = OrderedDict()
+        self.derived = {}
+        self.cells = None
+        self.counts = None
+        self.scans = 0
+
+    def add(self, name, codes, cardinality):
+        self.columns[name] = (np.asarray(codes, dtype='i8'), int(cardinality))
+
+        return self
+
+    def derive(self, name, base, mapping, cardinality):
+        '''adds a column whose code for each row is mapping[code of base]
+        '''
+        self.derived[name] = (base, np.asarray(mapping, dtype='i8'), int(cardinality))
+
+        return self
+
+    def scan(self):
+        '''counts the rows on the combination of every column
+        '''
+        size = 1
+        composite = None
+        for codes, cardinality in self.columns.values():
+            composite = codes.copy() if composite is None else composite * cardinality + codes
+            size *= cardinality
+
+        if composite is None:
+            composite = np.empty(0, dtype='i8')
+
+        if size <= DENSE_LIMIT:
+            counts = np.bincount(composite, minlength=size)
+            self.cells = np.flatnonzero(counts)
+            self.counts = counts[self.cells]
+        else:
+            self.cells, self.counts = np.unique(composite, return_counts=True)
+
+        self.scans += 1
+
+        return self
+
+    def cell_codes(self, name):
+        '''returns the code of a column for every non-zero cell
+        '''
+        if name in self.derived:
+            base, mapping, _ = self.derived[name]
+
+            return mapping[self.cell_codes(base)]
+
+        stride = 1
+        for column, (_, cardinality) in reversed(self.columns.items()):
+            if column == name:
+                return (self.cells // stride) % cardinality
+
+            stride *= cardinality
+
+        raise KeyError(name)
+
+    def cardinality(self, name):
+        if name in self.derived:
+            return self.derived[name][2]
+
+        return self.columns[name][1]
+
+    def group(self, *names):
+        '''returns a list of (code tuple, count) for every combination of the named columns that has rows, sorted by code
+        '''
+        if self.cells is None:
+            self.scan()
+
+        codes = [self.cell_codes(name) for name in names]
+        combined = np.zeros(len(self.cells), dtype='i8')
+        for name, column in zip(names, codes):
+            combined = combined * self.cardinality(name) + column
+
+        groups, inverse = np.unique(combined, return_inverse=True)
+        counts = np.bincount(inverse.reshape(-1), weights=self.counts, minlength=len(groups)).astype('i8')
+
+        keys = []
+        for name in reversed(names):
+            cardinality = self.cardinality(name)
+            keys.append(groups % cardinality)
+            groups = groups // cardinality
+
+        return list(zip(zip(*[key.tolist() for key in reversed(keys)]), counts.tolist()))
+
+
+def sparse_counts(units, tier_columns, tier_cardinality):
+    '''counts the rows in every (unit, tier) cell of several geographies and tier columns with one bincount.
+
+    units is a list of (codes, cardinality) for each geography and tier_columns a list of tier code arrays in
+    [0, tier_cardinality). each geography and tier column pair gets its own block of cells in one code space so a
+    hundred thousand census blocks and a few hundred areas are counted together.
+
+    returns a list with an item per geography of a list with an item per tier column of (unit codes, tier codes, counts)
+    for the cells that have rows, sorted by tier then unit
+    '''
+    blocks = []
+    cells = []
+    offset = 0
+    for codes, cardinality in units:
+        for tiers in tier_columns:
+            size = int(cardinality) * tier_cardinality
+            blocks.append((offset, size, int(cardinality)))
+            cells.append(offset + np.asarray(tiers, dtype='i8') * cardinality + np.asarray(codes, dtype='i8'))
+            offset += size
+
+    cells = np.concatenate(cells) if cells else np.empty(0, dtype='i8')
+
+    if offset <= DENSE_LIMIT:
+        counts = np.bincount(cells, minlength=offset)
+        found = np.flatnonzero(counts)
+        counts = counts[found]
+    else:
+        found, counts = np.unique(cells, return_counts=True)
+
+    results = []
+    bounds = np.searchsorted(found, [start for start, _, _ in blocks] + [offset])
+    for i, (start, _, cardinality) in enumerate(blocks):
+        local = found[bounds[i]:bounds[i + 1]] - start
+
+        if i % len(tier_columns) == 0:
+            results.append([])
+
+        results[-1].append((local % cardinality, local // cardinality, counts[bounds[i]:bounds[i + 1]]))
+
+    return results
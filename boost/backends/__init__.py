@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+__init__.py
+
+A module that makes the analysis backends importable by name
+'''
+
+from importlib import import_module
+
+#: backend name: (module, class). modules are imported on demand so arcpy is only loaded by the arcpy backend
+backends = {
+    'arcpy': ('boost.backends.esri', 'ArcpyBackend'),
+    'shapely': ('boost.backends.geos', 'ShapelyBackend'),
+}
+
+
+def create(name, workspace, **kwargs):
+    '''creates the backend registered as name for the workspace
+    '''
+    if name not in backends:
+        raise Exception('{} is not a backend. Choose one of {}'.format(name, ', '.join(sorted(backends))))
+
+    module, backend = backends[name]
+
+    return getattr(import_module(module), backend)(workspace, **kwargs)
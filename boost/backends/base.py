@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+base.py
+
+A module that contains the abstract analysis backend
+'''
+
+from boost.stages import StageRunner
+from boost.stages import state_path
+
+
+class Backend(object):
+    '''An abstract backend that attaches the covering broadband service keys and analysis area to each address point.
+
+    Every backend writes an Address_Service_Final table with one row per address point and service key containing
+    FID_<address_points>, KeyId, Provider, TechType, MaxDown, MaxUp, x, y, NAME, AREA_TYPE and COUNTYNBR.
+    Address points with no service get a single row with a MaxDown and MaxUp of 0.
+
+    Each step of address_service runs as a stage of self.runner so a rerun with resume skips the steps whose inputs
+    have not changed since they last succeeded.
+    '''
+
+    def __init__(self, workspace, resume=False):
+        self.workspace = workspace
+        self.runner = StageRunner(state_path(workspace), 'analyze', self.fingerprint, resume)
+
+    def validate(self):
+        raise NotImplementedError('You must implement the validate() method in the inheriting class.')
+
+    def address_service(self, output, jobs=1):
+        raise NotImplementedError('You must implement the address_service() method in the inheriting class.')
+
+    def incremental(self, output, previous, jobs=1):
+        '''updates the output of the last analysis for a new broadband service layer. previous is the service layer the
+        last analysis used
+        '''
+        raise NotImplementedError('You must implement the incremental() method in the inheriting class.')
+
+    def fingerprint(self, name):
+        '''returns a json serializable description of a dataset that changes when its contents change or None when it
+        does not exist
+        '''
+        raise NotImplementedError('You must implement the fingerprint() method in the inheriting class.')
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+esri.py
+
+A module that contains the ArcGIS backend. Broadband data is associated with address points using an Identity tool
+against the dissolved service areas. The analysis area of every address point comes from an assignment table built with
+one Identity against Analysis_Areas and kept for as long as the address points and boundaries do not change.
+
+Total runtime varies between 2-4 hours
+'''
+
+import arcpy
+import numpy as np
+from .base import Backend
+from boost import instrument
+from boost import sidecar
+from boost.config import feature_classes
+from boost.frame import to_structured
+from boost.join import AREA_FIELDS
+from boost.join import JoinIndex
+from boost.join import area_columns
+from boost.keys import KeyRegistry
+from boost.stages import digest
+from boost.workspaces.esri import GeodatabaseWorkspace
+from boost.workspaces.esri import fingerprint
+from boost.workspaces.esri import stamp
+from os.path import join
+
+
+class ArcpyBackend(Backend):
+    '''builds Address_Service_Final with arcpy geoprocessing tools in a file geodatabase
+    '''
+
+    #: the KeyRegistry for the service layer, built by composite_key
+    keys = None
+
+    @property
+    def tables(self):
+        '''the workspace the columns computed in memory are written to
+        '''
+        return GeodatabaseWorkspace(self.workspace)
+
+    def validate(self):
+        if not arcpy.Exists(self.workspace):
+            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.workspace))
+
+    def address_service(self, output, jobs=1):
+        #: define workspace geodatabse
+        arcpy.env.workspace = self.workspace
+        arcpy.env.overwriteOutput = True
+
+        #: the geoprocessing tools cannot be split across processes on one license so jobs is handed to the tools that
+        #: parallelize internally (Dissolve)
+        if jobs > 1:
+            arcpy.env.parallelProcessingFactor = str(jobs)
+
+        runner = self.runner
+        counties, municip, unincorp = feature_classes['counties'], feature_classes['municip'], feature_classes['unincorp']
+        bb_service, address_points = feature_classes['bb_service'], feature_classes['address_points']
+        service_keys = feature_classes['service_keys']
+
+        #: composite_key adds KeyId to bb_service so it is an output too
+        analysis_layer = self.analysis_areas_layer(counties, municip, unincorp)
+        analysis_fc = runner.run('analysis_areas', lambda: self.analysis_areas(counties, municip, unincorp, analysis_layer),
+                                 inputs=[counties, municip, unincorp], outputs=[analysis_layer])
+        dissolved_fc = runner.run('composite_key', lambda: self.composite_key(bb_service),
+                                  inputs=[bb_service], outputs=['BB_Service_Dissolve', bb_service, service_keys])
+        assignments = self.area_assignments_table(address_points, analysis_fc)
+        runner.run('area_assignments', lambda: self.area_assignments(address_points, analysis_fc, assignments),
+                   inputs=[address_points, analysis_fc], outputs=[assignments])
+        runner.run('identity', lambda: self.identity(address_points, dissolved_fc, output),
+                   inputs=[address_points, dissolved_fc], outputs=[output])
+        runner.run('update_rows', lambda: self.update_rows(output, assignments), inputs=[output, service_keys, assignments],
+                   outputs=[output])
+
+    def incremental(self, output, previous, jobs=1):
+        raise Exception('--previous is only supported by the shapely backend. Run the analysis without it.')
+
+    def fingerprint(self, name):
+        return fingerprint(join(self.workspace, name))
+
+    def analysis_areas(self, counties, municip, unincorp, layer):
+        '''create area types for analysis. the layer is cached by the fingerprints of the three boundary layers so it is
+        only built when one of them changes. the copies built from earlier boundaries are deleted
+        '''
+        self.delete_superseded(layer, arcpy.ListFeatureClasses)
+        if arcpy.Exists(layer):
+            print('Reusing {}, the boundaries have not changed...'.format(layer))
+
+            return layer
+
+        print('Creating {} Layer...'.format(layer))
+        try:
+            with instrument.stage('union'):
+                arcpy.Union_analysis([municip, unincorp], 'Not_Counties')
+            with instrument.stage('erase'):
+                arcpy.Erase_analysis(unincorp, municip, 'Unincorporated')  #: Unincorporated
+                arcpy.Erase_analysis(counties, 'Not_Counties', 'Other')  #: Counties
+            arcpy.Delete_management('Not_Counties')
+
+            #: every area is inserted with its type so there is no cursor pass per layer to fill in Area_Type and the
+            #: source layers are not modified
+            spatial_reference = arcpy.Describe(counties).spatialReference
+            arcpy.CreateFeatureclass_management(self.workspace, layer, 'POLYGON', spatial_reference=spatial_reference)
+            arcpy.AddField_management(layer, 'NAME', 'TEXT')
+            arcpy.AddField_management(layer, 'Area_Type', 'TEXT')
+            arcpy.AddField_management(layer, 'CountyNbr', 'TEXT')
+
+            sources = [('Unincorporated', 'PLACENAME', 'Unincorporated'), ('Other', 'NAME', 'Other'), (municip, 'NAME', 'Municipality')]
+            with instrument.stage('insert'), arcpy.da.InsertCursor(layer, ['SHAPE@', 'NAME', 'Area_Type', 'CountyNbr']) as insert:
+                for source, name_field, area_type in sources:
+                    fields = ['SHAPE@', name_field]
+                    has_county = 'COUNTYNBR' in [field.name.upper() for field in arcpy.ListFields(source)]
+                    if has_county:
+                        fields.append('CountyNbr')
+
+                    inserted = 0
+                    with arcpy.da.SearchCursor(source, fields) as cursor:
+                        for row in cursor:
+                            insert.insertRow((row[0], row[1], area_type, row[2] if has_county else None))
+                            inserted += 1
+
+                    instrument.rows(read=inserted, written=inserted)
+
+            arcpy.Delete_management('Unincorporated')
+            arcpy.Delete_management('Other')
+
+            return layer
+        except:
+            print(arcpy.GetMessages())
+            raise
+
+    def analysis_areas_layer(self, counties, municip, unincorp):
+        '''the name of the cached Analysis_Areas built from the current version of the boundary layers
+        '''
+        return 'Analysis_Areas_{}'.format(digest(self.runner.fingerprints([counties, municip, unincorp])))
+
+    def delete_superseded(self, name, listing):
+        '''deletes the cached copies named <prefix>_<digest> like name that were built from other versions of their inputs.
+        listing is arcpy.ListFeatureClasses or arcpy.ListTables
+        '''
+        prefix = name.rsplit('_', 1)[0]
+        for older in listing('{}_*'.format(prefix)) or []:
+            if older.lower() != name.lower() and len(older) == len(name):
+                print('Deleting {}, it was built from earlier inputs...'.format(older))
+                arcpy.Delete_management(older)
+
+    def composite_key(self, bb_service):
+        '''assigns an integer KeyId to each unique provider, technology and speed combination in BB_Service and dissolves
+        on it. the ids and the values they stand for are written to the service keys lookup table
+        '''
+        layer = 'BB_Service_Dissolve'
+
+        print('Creating Composite Key in {}...'.format(layer))
+        try:
+            self.keys = KeyRegistry()
+            oid = arcpy.Describe(bb_service).OIDFieldName
+            with arcpy.da.SearchCursor(bb_service, [oid, 'UTProvCode', 'TRANSTECH', 'MAXADDOWN', 'MAXADUP']) as cursor:
+                key_ids = np.array([(row[0], self.keys.register(*row[1:])) for row in cursor], dtype=[(oid, 'i4'), ('KeyId', 'i4')])
+
+            self.tables.write_columns(bb_service, oid, key_ids)
+            self.write_keys(self.keys, feature_classes['service_keys'])
+
+            #: Dissolve features based on the composite key
+            with instrument.stage('dissolve'):
+                arcpy.Dissolve_management(bb_service, layer, 'KeyId')
+
+            return layer
+        except:
+            print(arcpy.GetMessages())
+            raise
+
+    def write_keys(self, keys, table):
+        '''writes the KeyId lookup table
+        '''
+        rows = list(keys.rows())
+        path = join(self.workspace, table)
+        if arcpy.Exists(path):
+            arcpy.Delete_management(path)
+
+        arcpy.da.NumPyArrayToTable(
+            to_structured([
+                ('KeyId', np.array([row[0] for row in rows], dtype='i4')),
+                ('Provider', [row[1] for row in rows]),
+                ('TechType', [str(row[2]) for row in rows]),
+                ('MaxDown', np.array([row[3] for row in rows], dtype='f8')),
+                ('MaxUp', np.array([row[4] for row in rows], dtype='f8')),
+            ]), path)
+        stamp(path)
+
+    def service_keys(self):
+        '''returns the registry built by composite_key or reads it back from the lookup table
+        '''
+        if self.keys is None:
+            fields = ['KeyId', 'Provider', 'TechType', 'MaxDown', 'MaxUp']
+            with arcpy.da.SearchCursor(feature_classes['service_keys'], fields) as cursor:
+                self.keys = KeyRegistry.from_rows(cursor)
+
+        return self.keys
+
+    def area_assignments_table(self, address_points, analysis_fc):
+        '''the name of the assignment table for the current version of the address points and analysis areas. the
+        address points are keyed by their layer name and their fingerprint, which the runner remembers for the stages
+        that read them
+        '''
+        return 'Address_Areas_{}'.format(digest([address_points, self.runner.fingerprints([address_points]), analysis_fc]))
+
+    def area_assignments(self, address_points, analysis_fc, table):
+        '''assigns every address point its analysis area NAME, Area_Type and CountyNbr. this is the only overlay of the
+        address points with Analysis_Areas and the table is reused until either of them changes. the tables built from
+        earlier versions are deleted
+        '''
+        self.delete_superseded(table, arcpy.ListTables)
+        if arcpy.Exists(table):
+            print('Reusing {}, the address points and analysis areas have not changed...'.format(table))
+
+            return table
+
+        print('Assigning Address Points to Analysis Areas in {}...'.format(table))
+        try:
+            arcpy.Identity_analysis(address_points, analysis_fc, table)
+
+            return table
+        except:
+            print(arcpy.GetMessages())
+            raise
+
+    def identity(self, identity_on, identity_features, output):
+        '''attaches composite key values to AddressPoints based on their relationships to BB Service areas
+        '''
+        print('Running Identity Tool...')
+        try:
+            arcpy.Identity_analysis(identity_on, identity_features, output)
+        except:
+            print(arcpy.GetMessages())
+            raise
+
+    def update_rows(self, layer, assignments):
+        '''computes the composite key values, speeds, coordinates and analysis area of every address point as columns in
+        memory and writes them to the layer with one ExtendTable. served and unserved address points alike get their
+        area from the assignment table by their FID. the columns stats reads are also saved next to the geodatabase
+        '''
+        print('Populating Fields With Composite Key Values for {}...'.format(layer))
+        addr_fc = feature_classes['address_points']
+        oid = arcpy.Describe(layer).OIDFieldName
+        sidecar.discard(self.tables, layer)
+
+        try:
+            with instrument.stage('read'):
+                #: Identity leaves KeyId null for address points with no service
+                rows = arcpy.da.FeatureClassToNumPyArray(layer, [oid, 'KeyId', f'FID_{addr_fc}', 'SHAPE@X', 'SHAPE@Y'],
+                                                         null_value=0)
+                with arcpy.da.SearchCursor(assignments, [f'FID_{addr_fc}', 'CountyNbr', 'Area_Type', 'NAME']) as cursor:
+                    index = JoinIndex.from_rows(cursor)
+                instrument.rows(read=len(rows) + len(index))
+
+            assigned = area_columns(index, rows[f'FID_{addr_fc}'])
+            columns = to_structured([(oid, rows[oid])] + self.service_keys().columns(rows['KeyId']) + [
+                ('x', rows['SHAPE@X']),
+                ('y', rows['SHAPE@Y']),
+            ] + assigned)
+
+            #: unassigned address points are null like the shapely backend writes them rather than empty strings
+            with instrument.stage('write'):
+                self.tables.write_columns(layer, oid, columns, nulls=AREA_FIELDS)
+
+            print('{} rows written at once'.format(len(columns)))
+
+            #: the columns stats reads are already in memory so they are saved for it to memory map
+            area, areas = sidecar.encode_areas(*[values.tolist() for _, values in assigned])
+            sidecar.write(self.tables, layer, {
+                'fid': rows[f'FID_{addr_fc}'],
+                'key': rows['KeyId'],
+                'down': columns['MaxDown'],
+                'up': columns['MaxUp'],
+                'x': columns['x'],
+                'y': columns['y'],
+                'area': area,
+            }, areas)
+        except:
+            print(arcpy.GetMessages())
+            raise
@@ -0,0 +1,568 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+geos.py
+
+A module that contains the shapely backend. It reads the layers named in config.py from a GeoPackage (or a folder of
+Shapefiles) and attaches the covering service keys and analysis area to each address point with STRtree
+point-in-polygon queries. It does not require ArcGIS so it runs on Linux.
+
+The analysis areas are the same as the arcpy backend builds with Union and Erase: a point inside a municipality is in
+that Municipality, otherwise a point inside an unincorporated area is Unincorporated, otherwise it is in the Other part
+of its county.
+
+When the workspace is a folder of Shapefiles the output is written to boost.gpkg in that folder because Shapefile field
+names are too short for FID_<address_points>.
+'''
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from os.path import exists
+from os.path import getmtime
+from os.path import getsize
+from os.path import isdir
+from os.path import join as join_path
+
+import fiona
+import numpy as np
+from shapely import STRtree
+from shapely import from_wkb
+from shapely import points as to_points
+from shapely import to_wkb
+from shapely.geometry import box
+from shapely.geometry import shape
+
+from .base import Backend
+from boost import instrument
+from boost import sidecar
+from boost import workspaces
+from boost.config import feature_classes
+from boost.keys import KeyRegistry
+from boost.stages import digest
+
+#: the service layer fields that make up the composite key
+SERVICE_FIELDS = ['UTProvCode', 'TRANSTECH', 'MAXADDOWN', 'MAXADUP']
+
+#: the files of a Shapefile that hold its rows, geometry, projection and encoding
+SHAPEFILE_FILES = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+
+#: the Address_Service_Final schema written by this backend
+FIELDS = OrderedDict([
+    ('KeyId', 'int'),
+    ('Provider', 'str:50'),
+    ('TechType', 'str:10'),
+    ('MaxDown', 'float'),
+    ('MaxUp', 'float'),
+    ('x', 'float'),
+    ('y', 'float'),
+    ('NAME', 'str'),
+    ('AREA_TYPE', 'str'),
+    ('COUNTYNBR', 'str'),
+])
+
+
+def pairs(points, geometries):
+    '''returns the (point index, polygon index) pairs where a point intersects a polygon sorted by point then polygon
+    '''
+    if not len(points) or not len(geometries):
+        return np.empty(0, dtype='i8'), np.empty(0, dtype='i8')
+
+    point_index, polygon_index = STRtree(geometries).query(points, predicate='intersects')
+    order = np.lexsort((polygon_index, point_index))
+
+    return point_index[order], polygon_index[order]
+
+
+def covering(points, geometries):
+    '''returns the index of the first polygon covering each point or -1 when there is none
+    '''
+    point_index, polygon_index = pairs(points, geometries)
+    first = np.full(len(points), -1, dtype='i8')
+    unique, starts = np.unique(point_index, return_index=True)
+    first[unique] = polygon_index[starts]
+
+    return first
+
+
+def area_values(municipality, unincorp, county, municipalities, unincorporated, counties):
+    '''returns the (NAME, AREA_TYPE, COUNTYNBR) for each point from the index of the municipality, unincorporated area and
+    county covering it. the layers are [geometries, names, county numbers]. like the arcpy backend the county number is
+    copied from the layer the area comes from, so a municipality or unincorporated layer without county numbers gives None
+    '''
+    def county_numbers(layer):
+        return layer[2] if len(layer) > 2 else [None] * len(layer[0])
+
+    municipality_counties = county_numbers(municipalities)
+    unincorporated_counties = county_numbers(unincorporated)
+    county_counties = county_numbers(counties)
+
+    areas = []
+    for muni_index, unincorp_index, county_index in zip(municipality.tolist(), unincorp.tolist(), county.tolist()):
+        if muni_index >= 0:
+            areas.append((municipalities[1][muni_index], 'Municipality', municipality_counties[muni_index]))
+        elif unincorp_index >= 0:
+            areas.append((unincorporated[1][unincorp_index], 'Unincorporated', unincorporated_counties[unincorp_index]))
+        elif county_index >= 0:
+            areas.append((counties[1][county_index], 'Other', county_counties[county_index]))
+        else:
+            areas.append((None, None, None))
+
+    return areas
+
+
+def encode_keys(keys):
+    '''registers each (provider, tech, down, up) key, which is what the arcpy backend dissolves on.
+    returns the key id of each polygon and the KeyRegistry
+    '''
+    registry = KeyRegistry()
+    polygon_keys = np.array([registry.register(*key) for key in keys], dtype='i8')
+
+    return polygon_keys, registry
+
+
+def service_pairs(points, geometries, polygon_keys, width):
+    '''returns the (point index, key id) pairs for the distinct keys covering each point sorted by point then key id
+    '''
+    point_index, polygon_index = pairs(points, geometries)
+    codes = np.unique(point_index * width + polygon_keys[polygon_index])
+
+    return codes // width, codes % width
+
+
+def join_partition(x, y, service, polygon_keys, width, municipalities, unincorporated, counties):
+    '''runs the point to service join for one partition. this is the unit of work sent to the process pool so it takes
+    geometry arrays and returns only integer arrays: the (point index, key id) pairs and the index of the municipality,
+    unincorporated area and county polygon covering each point
+    '''
+    points = to_points(x, y)
+    point_index, key_index = service_pairs(points, service, polygon_keys, width)
+
+    return point_index, key_index, covering(points, municipalities), covering(points, unincorporated), covering(points, counties)
+
+
+def address_service_rows(fids, x, y, point_index, key_index, keys, areas):
+    '''yields the Address_Service_Final rows for each address point and distinct service key covering it, ordered by point
+    then key id. point_index and key_index are sorted pairs from service_pairs, keys is the KeyRegistry and areas is the
+    output of area_values
+    '''
+    bounds = np.searchsorted(point_index, np.arange(len(fids) + 1))
+
+    for i, fid in enumerate(fids):
+        name, area_type, county = areas[i]
+        start, end = bounds[i], bounds[i + 1]
+
+        if start == end:
+            yield fid, 0, '', None, 0.0, 0.0, x[i], y[i], name, area_type, county
+            continue
+
+        for key in key_index[start:end].tolist():
+            provider, tech, down, up = keys[key]
+            yield fid, key, provider, str(tech), down, up, x[i], y[i], name, area_type, county
+
+
+def changed_keys(previous_keys, previous_wkbs, keys, wkbs):
+    '''returns the set of (provider, tech, down, up) keys whose polygons were added, removed or changed between two
+    service layers. the polygons of a key are compared as a sorted list of their well known binary
+    '''
+    def polygons(layer_keys, layer_wkbs):
+        grouped = {}
+        for key, wkb in zip(layer_keys, layer_wkbs):
+            grouped.setdefault(KeyRegistry.normalize(*key), []).append(wkb)
+
+        return {key: sorted(wkbs) for key, wkbs in grouped.items()}
+
+    previous = polygons(previous_keys, previous_wkbs)
+    current = polygons(keys, wkbs)
+
+    return {key for key in set(previous) | set(current) if previous.get(key) != current.get(key)}
+
+
+def feature(fields, row):
+    '''the point feature of an Address_Service_Final row
+    '''
+    return {
+        'geometry': {'type': 'Point', 'coordinates': (row[6], row[7])},
+        'properties': OrderedDict(zip(fields, row)),
+    }
+
+
+def subset(geometries, bounds):
+    '''returns the index of the geometries that intersect the bounds in their original order
+    '''
+    if not len(geometries):
+        return np.empty(0, dtype='i8')
+
+    return np.sort(STRtree(geometries).query(box(*bounds)))
+
+
+def partitions(county_index, counties, layers):
+    '''splits the address points by the county covering them. yields the point indexes and the index of the features of
+    each layer inside the county bounding box. points outside every county share one partition with every feature
+    '''
+    for county in np.unique(county_index).tolist():
+        points = np.flatnonzero(county_index == county)
+        if county < 0:
+            yield points, [np.arange(len(layer)) for layer in layers]
+            continue
+
+        yield points, [subset(layer, counties[county].bounds) for layer in layers]
+
+
+def remap(local, index):
+    '''turns polygon indexes into a subset back into indexes into the full layer keeping -1 for no polygon
+    '''
+    return np.where(local >= 0, index[np.maximum(local, 0)] if len(index) else -1, -1)
+
+
+class ShapelyBackend(Backend):
+    '''builds Address_Service_Final with shapely from a GeoPackage or a folder of Shapefiles
+    '''
+
+    #: the largest fraction of the address points an incremental analysis replaces the rows of. deleting and appending
+    #: rows costs more per row than writing the table, so past about half of them a full analysis is faster
+    patch_limit = 0.5
+
+    def validate(self):
+        if not exists(self.workspace):
+            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.workspace))
+
+    def open(self, name, *args, **kwargs):
+        if isdir(self.workspace):
+            return fiona.open(join_path(self.workspace, '{}.shp'.format(name)), *args, **kwargs)
+
+        return fiona.open(self.workspace, *args, layer=name, **kwargs)
+
+    @instrument.measured
+    def read(self, name, fields):
+        '''returns the geometries and a list of values for each field. field names match in any case like arcpy and a
+        field the layer does not have is None
+        '''
+        geometries = []
+        values = [[] for _ in fields]
+        with self.open(name) as source:
+            names = {field.upper(): field for field in source.schema['properties']}
+            fields = [names.get(field.upper()) for field in fields]
+
+            for feature in source:
+                geometries.append(shape(feature['geometry']))
+                properties = feature['properties']
+                for i, field in enumerate(fields):
+                    values[i].append(None if field is None else properties[field])
+
+        instrument.rows(read=len(geometries))
+
+        return [np.array(geometries, dtype=object)] + values
+
+    @instrument.measured
+    def read_points(self, name):
+        '''returns the feature ids, x and y coordinates and crs of a point layer
+        '''
+        fids = []
+        x = []
+        y = []
+        with self.open(name) as source:
+            crs = source.crs
+            for feature in source:
+                fids.append(int(feature.id))
+                coordinates = feature['geometry']['coordinates']
+                x.append(coordinates[0])
+                y.append(coordinates[1])
+
+        instrument.rows(read=len(fids))
+
+        return fids, np.array(x, dtype='f8'), np.array(y, dtype='f8'), crs
+
+    def fingerprint(self, name):
+        '''describes a layer. a Shapefile by its row count, schema and bounds along with the size and modified time of
+        each of its files. a GeoPackage layer by the fingerprint of the SQLite workspace, which has the last change GDAL
+        records for the layer and a change token for the layers boost wrote. modified times of a GeoPackage are not used
+        since writing any layer touches the file
+        '''
+        shapefile = join_path(self.workspace, '{}.shp'.format(name))
+        if isdir(self.workspace) and exists(shapefile):
+            with fiona.open(shapefile) as source:
+                fingerprint = {'count': len(source), 'schema': source.schema, 'bounds': source.bounds}
+
+            base = shapefile[:-len('.shp')]
+            fingerprint['files'] = {
+                extension: [getsize(base + extension), getmtime(base + extension)]
+                for extension in SHAPEFILE_FILES if exists(base + extension)
+            }
+
+            return fingerprint
+
+        if not exists(self.path()):
+            return None
+
+        with self.tables as tables:
+            return tables.fingerprint(name)
+
+    def address_service(self, output, jobs=1):
+        '''the join is done in memory in one pass so it is a single stage
+        '''
+        inputs = [feature_classes[name] for name in ['address_points', 'bb_service', 'municip', 'unincorp', 'counties']]
+
+        self.runner.run('address_service', lambda: self.join(output, jobs), inputs=inputs,
+                        outputs=[output, feature_classes['service_keys']])
+
+    def boundaries(self):
+        '''a digest of the layers an incremental analysis expects to be unchanged
+        '''
+        return digest(self.runner.fingerprints([feature_classes[name] for name in ['address_points', 'counties', 'municip', 'unincorp']]))
+
+    def join(self, output, jobs=1):
+        print('Reading Address Points and Service Areas...')
+        fids, x, y, crs = self.read_points(feature_classes['address_points'])
+        geometries, providers, techs, downs, ups = self.read(feature_classes['bb_service'], SERVICE_FIELDS)
+        polygon_keys, keys = encode_keys(zip(providers, techs, downs, ups))
+
+        municipalities = self.read(feature_classes['municip'], ['NAME', 'COUNTYNBR'])
+        unincorporated = self.read(feature_classes['unincorp'], ['PLACENAME', 'COUNTYNBR'])
+        counties = self.read(feature_classes['counties'], ['NAME', 'COUNTYNBR'])
+
+        self.write_keys(keys, feature_classes['service_keys'])
+
+        print('Joining Address Points to Service Areas...')
+        self.write(output, self.rows(fids, x, y, [geometries, polygon_keys], keys, municipalities, unincorporated, counties, jobs),
+                   crs)
+
+        return {'boundaries': self.boundaries()}
+
+    def incremental(self, output, previous, jobs=1):
+        '''updates the Address_Service_Final of the last analysis in place for a new service layer. previous is the
+        service layer that analysis used. only the rows of the address points inside the polygons of keys that were
+        added, removed or changed are replaced. the boundaries and address points must not have changed, otherwise the
+        analysis runs in full
+        '''
+        record = self.runner.stages.get('address_service') or {}
+        if (record.get('result') or {}).get('boundaries') != self.boundaries():
+            print('The address points or boundaries changed since the last analysis. Running it in full...')
+
+            return self.address_service(output, jobs)
+
+        inputs = [feature_classes[name] for name in ['address_points', 'bb_service', 'municip', 'unincorp', 'counties']]
+
+        return self.runner.run('address_service', lambda: self.patch(output, previous, jobs), inputs=inputs,
+                               outputs=[output, feature_classes['service_keys']])
+
+    def patch(self, output, previous, jobs=1):
+        '''the address points, their coordinates and areas come from the columns the last analysis saved so neither the
+        address points nor the boundaries are read
+        '''
+        with self.tables as tables:
+            columns = sidecar.load(tables, output, self.runner.fingerprints([output])[output])
+        if columns is None:
+            print('The columns the last analysis saved are missing or out of date. Running it in full...')
+
+            return self.join(output, jobs)
+
+        print('Reading Both Service Layers...')
+        previous_wkbs, *previous_values = self.read_wkb(previous, SERVICE_FIELDS)
+        wkbs, *values = self.read_wkb(feature_classes['bb_service'], SERVICE_FIELDS)
+
+        #: the lookup table stores the tech as text so the keys are compared and registered as text too
+        previous_service = [KeyRegistry.normalize(provider, str(tech), down, up) for provider, tech, down, up in zip(*previous_values)]
+        service = [KeyRegistry.normalize(provider, str(tech), down, up) for provider, tech, down, up in zip(*values)]
+        changed = changed_keys(previous_service, previous_wkbs, service, wkbs)
+
+        #: a key keeps the id the last analysis gave it so the rows that are not replaced stay valid. the ids of keys
+        #: that are gone are left unused and new keys get the next ids
+        keys = self.read_keys(feature_classes['service_keys'], set(service))
+        polygon_keys = np.array([keys.register(*key) for key in service], dtype='i8')
+
+        fids, first = np.unique(np.asarray(columns.fid, dtype='i8'), return_index=True)
+        x = np.asarray(columns.x)[first]
+        y = np.asarray(columns.y)[first]
+
+        changed_wkbs = [wkb for key, wkb in zip(previous_service, previous_wkbs) if key in changed]
+        changed_wkbs += [wkb for key, wkb in zip(service, wkbs) if key in changed]
+        affected = np.unique(pairs(to_points(x, y), from_wkb(changed_wkbs))[0])
+        print('{} of {} keys changed, {} of {} address points are affected'.format(len(changed), len(keys), len(affected), len(fids)))
+
+        if len(affected) > len(fids) * self.patch_limit:
+            print('Replacing the rows of that many address points is slower than writing them all. Running it in full...')
+
+            return self.join(output, jobs)
+
+        point_index, key_index = service_pairs(to_points(x[affected], y[affected]), from_wkb(wkbs), polygon_keys, len(keys) + 1)
+        #: the appended area is what an area code of -1 picks
+        areas = columns.areas + [(None, None, None)]
+        affected_areas = [areas[code] for code in np.asarray(columns.area)[first][affected].tolist()]
+
+        keep = ~np.isin(columns.fid, fids[affected])
+        kept = {name: np.asarray(getattr(columns, name))[keep] for name, _ in sidecar.COLUMNS}
+        writer = sidecar.ColumnWriter(columns.areas)
+        #: the saved columns are written again once the table is updated and a memory mapped file can not be replaced
+        #: while it is open on windows
+        del columns
+
+        self.write_keys(keys, feature_classes['service_keys'])
+        self.replace_rows(output, fids[affected],
+                          address_service_rows(fids[affected].tolist(), x[affected], y[affected], point_index, key_index, keys,
+                                               affected_areas),
+                          kept, writer)
+
+        return {'boundaries': self.boundaries()}
+
+    @instrument.measured
+    def read_wkb(self, name, fields):
+        '''returns the well known binary of each geometry and a list of values for each field. a GeoPackage layer is read
+        with the SQLite workspace without building shapely geometries
+        '''
+        if isdir(self.workspace):
+            geometries, *values = self.read(name, fields)
+
+            return [to_wkb(geometries).tolist() if len(geometries) else []] + values
+
+        with workspaces.create(self.workspace) as tables:
+            rows = list(tables.read(name, ['SHAPE@WKB'] + fields))
+
+        return [list(column) for column in zip(*rows)] if rows else [[] for _ in range(len(fields) + 1)]
+
+    def read_keys(self, table, current):
+        '''reads the KeyId lookup table of the last analysis keeping only the keys in current
+        '''
+        fields = ['KeyId', 'Provider', 'TechType', 'MaxDown', 'MaxUp']
+        with fiona.open(self.path(), layer=table) as source:
+            rows = [[feature['properties'][field] for field in fields] for feature in source]
+
+        return KeyRegistry.from_rows(row for row in rows if KeyRegistry.normalize(*row[1:]) in current)
+
+    @instrument.measured
+    def replace_rows(self, output, fids, rows, kept, writer):
+        '''deletes the Address_Service_Final rows of the address points in fids, appends their new rows and saves the
+        columns again as the kept columns followed by the columns of the new rows
+        '''
+        addr_fc = feature_classes['address_points']
+        fields = [f'FID_{addr_fc}'] + list(FIELDS)
+        with self.tables as tables:
+            sidecar.discard(tables, output)
+            tables.delete_rows(output, fields[0], fids.tolist())
+
+        with fiona.open(self.path(), 'a', layer=output) as sink:
+            records = []
+            for row in rows:
+                writer.append(row)
+                records.append(feature(fields, row))
+
+            sink.writerecords(records)
+            instrument.rows(written=len(records))
+
+        columns = {name: np.concatenate([kept[name], np.asarray(writer.values[name], dtype=dtype)]) for name, dtype in sidecar.COLUMNS}
+        with self.tables as tables:
+            sidecar.write(tables, output, columns, writer.encoder.categories)
+
+    @instrument.measured
+    def rows(self, fids, x, y, service, keys, municipalities, unincorporated, counties, jobs=1):
+        '''joins the address points to the service and area layers and yields the Address_Service_Final rows.
+        with more than one job the address points are partitioned by county and each partition is joined in a process
+        pool. the partial outputs are merged back into point order so the rows match a single process run
+        '''
+        width = len(keys) + 1
+        layers = [service[0], municipalities[0], unincorporated[0], counties[0]]
+
+        if jobs > 1:
+            point_index, key_index, covering_indexes = self.parallel_join(x, y, service[1], width, layers, jobs)
+        else:
+            point_index, key_index, *covering_indexes = join_partition(x, y, service[0], service[1], width, *layers[1:])
+
+        areas = area_values(*covering_indexes, municipalities, unincorporated, counties)
+
+        return address_service_rows(fids, x, y, point_index, key_index, keys, areas)
+
+    def parallel_join(self, x, y, polygon_keys, width, layers, jobs):
+        '''runs join_partition for each county in a process pool and stitches the integer results back together
+        '''
+        county_index = covering(to_points(x, y), layers[3])
+        covering_indexes = [np.full(len(x), -1, dtype='i8') for _ in layers[1:]]
+        point_parts = []
+        key_parts = []
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = []
+            for points, indexes in partitions(county_index, layers[3], layers):
+                arguments = [layer[index] for layer, index in zip(layers, indexes)]
+                future = executor.submit(join_partition, x[points], y[points], arguments[0], polygon_keys[indexes[0]], width,
+                                         *arguments[1:])
+                futures.append((points, indexes, future))
+
+            for points, indexes, future in futures:
+                point_index, key_index, *local = future.result()
+                point_parts.append(points[point_index])
+                key_parts.append(key_index)
+
+                for output, found, index in zip(covering_indexes, local, indexes[1:]):
+                    output[points] = remap(found, index)
+
+        print('Merged {} partitions'.format(len(futures)))
+
+        point_index = np.concatenate(point_parts) if point_parts else np.empty(0, dtype='i8')
+        key_index = np.concatenate(key_parts) if key_parts else np.empty(0, dtype='i8')
+        order = np.lexsort((key_index, point_index))
+
+        return point_index[order], key_index[order], covering_indexes
+
+    def path(self):
+        '''the GeoPackage outputs are written to
+        '''
+        return join_path(self.workspace, 'boost.gpkg') if isdir(self.workspace) else self.workspace
+
+    def track(self, table):
+        '''gives a table written with GDAL the change token the SQLite workspace keeps for the tables boost writes
+        '''
+        with self.tables as tables, tables.connection:
+            tables.track(table)
+
+    @property
+    def tables(self):
+        '''the outputs as a new workspace, which is what stats reads. use it in a with block so its connection is closed
+        before GDAL writes the GeoPackage again
+        '''
+        return workspaces.create(self.path())
+
+    @instrument.measured
+    def write_keys(self, keys, table):
+        '''writes the KeyId lookup table
+        '''
+        schema = {
+            'geometry': None,
+            'properties': OrderedDict([('KeyId', 'int'), ('Provider', 'str:50'), ('TechType', 'str:10'), ('MaxDown', 'float'),
+                                       ('MaxUp', 'float')])
+        }
+
+        with fiona.open(self.path(), 'w', driver='GPKG', layer=table, schema=schema) as sink:
+            sink.writerecords([{
+                'geometry': None,
+                'properties': OrderedDict(zip(schema['properties'], (key_id, provider, str(tech), down, up)))
+            } for key_id, provider, tech, down, up in keys.rows()])
+
+        self.track(table)
+
+    @instrument.measured
+    def write(self, output, rows, crs, chunk=100000):
+        '''writes Address_Service_Final rows in chunks and saves the columns stats reads next to the GeoPackage
+        '''
+        addr_fc = feature_classes['address_points']
+        fields = [f'FID_{addr_fc}'] + list(FIELDS)
+        schema = {'geometry': 'Point', 'properties': OrderedDict([(fields[0], 'int')] + list(FIELDS.items()))}
+        columns = sidecar.ColumnWriter()
+        with self.tables as tables:
+            sidecar.discard(tables, output)
+
+        with fiona.open(self.path(), 'w', driver='GPKG', layer=output, schema=schema, crs=crs) as sink:
+            records = []
+            for row in rows:
+                columns.append(row)
+                records.append(feature(fields, row))
+
+                if len(records) == chunk:
+                    sink.writerecords(records)
+                    instrument.rows(written=len(records))
+                    records = []
+
+            sink.writerecords(records)
+            instrument.rows(written=len(records))
+
+        self.track(output)
+        with self.tables as tables:
+            columns.write(tables, output)
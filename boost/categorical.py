@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+categorical.py
+
+A module that contains a dictionary encoded column type for the few hundred distinct area names, area types and county
+numbers that repeat across millions of address points
+'''
+
+import numpy as np
+
+
+class Encoder(object):
+    '''assigns a dense integer code to each distinct value as values stream in. None is always code -1
+    '''
+    __slots__ = ['lookup']
+
+    def __init__(self):
+        self.lookup = {}
+
+    def encode(self, value):
+        if value is None:
+            return -1
+
+        lookup = self.lookup
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(lookup)
+
+        return code
+
+    @property
+    def categories(self):
+        return list(self.lookup)
+
+
+class Categorical(object):
+    '''an int32 array of codes into a list of categories. a code of -1 is None.
+
+    a categorical built by combine keeps its parts: one Categorical per side holding the code of that side for each
+    category, so the composite can be taken apart without parsing its strings
+    '''
+    __slots__ = ['codes', 'categories', 'parts']
+
+    def __init__(self, codes, categories, parts=None):
+        self.codes = np.asarray(codes, dtype='i4')
+        self.categories = list(categories)
+        self.parts = parts
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        '''returns a Categorical of the rows selected by a slice, mask or index array sharing the same categories
+        '''
+        return Categorical(self.codes[index], self.categories, self.parts)
+
+    @classmethod
+    def from_values(cls, values):
+        encoder = Encoder()
+        codes = np.fromiter((encoder.encode(value) for value in values), dtype='i4')
+
+        return cls(codes, encoder.categories)
+
+    @classmethod
+    def combine(cls, left, right, template='{}|{}'):
+        '''builds the composite of two categoricals with integer arithmetic on their codes. the template is only formatted
+        once for each distinct pair that actually occurs
+        '''
+        width = len(right.categories) + 1
+        composite = (left.codes.astype('i8') + 1) * width + (right.codes + 1)
+        unique, codes = np.unique(composite, return_inverse=True)
+
+        left_codes = unique // width - 1
+        right_codes = unique % width - 1
+        categories = [template.format(left.category(left_code), right.category(right_code))
+                      for left_code, right_code in zip(left_codes.tolist(), right_codes.tolist())]
+
+        return cls(codes.reshape(-1), categories, (cls(left_codes, left.categories), cls(right_codes, right.categories)))
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def category(self, code):
+        return None if code < 0 else self.categories[code]
+
+    def decode(self):
+        '''returns an object array of the values
+        '''
+        return np.array(self.categories + [None], dtype=object)[self.codes]
+
+    def strings(self, null=''):
+        '''returns a fixed width unicode array of the values with None as null, for writing tables
+        '''
+        categories = [null if value is None else str(value) for value in self.categories]
+
+        return np.array(categories + [null], dtype=str)[self.codes]
@@ -4,20 +4,36 @@
 boost
 
 Usage:
-  boost analyze --workspace <workspace>
-  boost stats --workspace <workspace>
-  boost postprocess --target <target> --workspace <workspace>
+  boost analyze --workspace <workspace> [--backend <backend>] [--jobs <jobs>] [--previous <previous>] [--resume] [--report <report>] [--progress] [--profile <profile>] [--profile-out <folder>]
+  boost stats --workspace <workspace> [--geographies <geographies>] [--resume] [--report <report>] [--progress] [--profile <profile>] [--profile-out <folder>]
+  boost postprocess --target <target> --workspace <workspace> [--geographies <geographies>] [--resume] [--report <report>] [--progress] [--profile <profile>] [--profile-out <folder>]
+  boost export --workspace <workspace> --target <target> [--format <format>] [--report <report>] [--progress] [--profile <profile>] [--profile-out <folder>]
   boost -h | --help
   boost --version
 
 Options:
-  --target                          The target folder
-  --workspace                       A geodatabse
+  --target <target>                 The target folder
+  --workspace <workspace>           A geodatabse
+  --backend <backend>               The analysis backend, arcpy (default) or shapely
+  --jobs <jobs>                     The number of worker processes
+  --previous <previous>             The service layer of the last analysis. Only the address points its changes touch are joined
+  --format <format>                 The export format, parquet (default)
+  --geographies <geographies>       The comma separated geographies to count speed tiers in, area,county (default), state, tract, block or hex
+  --resume                          Fingerprint every step and skip the ones whose inputs have not changed since they last succeeded
+  --report <report>                 Write the time, memory and rows of every step to this JSON file
+  --progress                        Print the progress of long steps with the time left
+  --profile <profile>               Profile every step with cprofile or sample, a low overhead stack sampler
+  --profile-out <folder>            The folder the profiles are written to [default: profile]
   -h --help                         Show this screen.
   --version                         Show version.
 
 Examples:
   boost analyze --workspace c:\bbservice_s12.gdb
+  boost analyze --workspace /data/bbservice_s12.gpkg --backend shapely
+  boost analyze --workspace c:\bbservice_s12.gdb --resume
+  boost export --workspace c:\bbservice_s12.gdb --target c:\temp\parquet
+  boost stats --workspace /data/bbservice_s12.gpkg --geographies area,county,hex
+  boost analyze --workspace /data/bbservice.gpkg --backend shapely --previous Utilities_BroadbandService_20200601
 
 Help:
   For help using this tool, please open an issue on the Github repository:
@@ -25,24 +41,40 @@ Help:
 '''
 
 from . import __version__ as VERSION
+from . import commands
+from . import instrument
 from docopt import docopt
-from inspect import getmembers, isclass
 
 
 def main():
     '''Main CLI entrypoint.
     '''
-    import boost.commands
     options = docopt(__doc__, version=VERSION)
 
-    # Here we'll try to dynamically match the command the user is trying to run
-    # with a pre-defined command class we've already created.
-    for k, v in options.items():
-        if k[0] in ['-', '<', '['] or not v or not hasattr(boost.commands, k):
+    # Here we'll match the command the user is trying to run with the module registered for it. Only that module and
+    # its dependencies are imported.
+    for k in commands.commands:
+        if not options.get(k):
             continue
 
-        module = getattr(boost.commands, k)
-        boost.commands = getmembers(module, isclass)
-        Command = [command[1] for command in boost.commands if command[0] != 'Command'][0]
-        command = Command(options)
-        command.execute()
+        command = commands.create(k, options)
+
+        if options['--report'] or options['--progress'] or options['--profile']:
+            instrument.enable(progress=options['--progress'])
+
+        profiler = None
+        if options['--profile']:
+            from . import profiling
+
+            profiler = profiling.create(options['--profile'], options['--profile-out'], instrument.collector)
+
+        try:
+            with instrument.stage(k):
+                command.execute()
+        finally:
+            if profiler is not None:
+                print('Profile written to {}'.format(profiler.close()))
+
+        if options['--report']:
+            instrument.collector.write(options['--report'], command=k, version=VERSION)
+            print('Run report written to {}'.format(options['--report']))
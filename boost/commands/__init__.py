@@ -3,9 +3,24 @@
 '''
 __init__.py
 
-A module that makes the commands importable
+A module that makes the commands importable by name
 '''
 
-from .analyze import *
-from .postprocess import *
-from .stats import *
+from importlib import import_module
+
+#: command name: (module, class). modules are imported on demand so only the dependencies of the command that runs are
+#: loaded and boost --help loads none of them
+commands = {
+    'analyze': ('boost.commands.analyze', 'Analyze'),
+    'export': ('boost.commands.export', 'Export'),
+    'postprocess': ('boost.commands.postprocess', 'PostProcess'),
+    'stats': ('boost.commands.stats', 'Stats'),
+}
+
+
+def create(name, options):
+    '''creates the command registered as name with the cli options
+    '''
+    module, command = commands[name]
+
+    return getattr(import_module(module), command)(options)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+export.py
+
+A module that contains the export command. Address_Service_Final and MSBA are written as compressed Parquet datasets
+partitioned by COUNTYNBR, one folder per table in the target folder, so they can be queried a few columns at a time with
+pyarrow, pandas or duckdb without arcpy.
+
+The rows are streamed from the workspace in record batches. The repeated text columns (provider, technology, area
+name, area type) are dictionary encoded which is how pandas reads them back as categoricals.
+
+Install the extra dependencies with `pip install -e ./[parquet]`
+'''
+
+from os.path import join
+
+from .command import Command
+from boost import instrument
+from boost import workspaces
+from boost.config import feature_classes
+
+#: the text columns written as dictionary encoded categoricals
+CATEGORICAL = ['Provider', 'TechType', 'NAME', 'AREA_TYPE', 'Name_Area']
+
+#: the column type of every other exported field
+TYPES = {
+    'KeyId': 'int32',
+    'MaxDown': 'float64',
+    'MaxUp': 'float64',
+    'x': 'float64',
+    'y': 'float64',
+    'COUNTYNBR': 'string',
+    'FREQUENCY': 'int32',
+    'MAX_MaxDown': 'float64',
+    'MAX_MaxUp': 'float64',
+    'MaxDown_Tier': 'int16',
+    'MaxUp_Tier': 'int16',
+}
+
+
+class Export(Command):
+
+    formats = ['parquet']
+
+    #: the rows in each record batch
+    batch = 250000
+
+    def execute(self):
+        self.validate(self.options)
+
+        addr_fc = feature_classes['address_points']
+        tables = [
+            (feature_classes['address_service_final'],
+             [f'FID_{addr_fc}', 'KeyId', 'Provider', 'TechType', 'MaxDown', 'MaxUp', 'x', 'y', 'NAME', 'AREA_TYPE', 'COUNTYNBR']),
+            (feature_classes['msba'], [f'FID_{addr_fc}', 'FREQUENCY', 'MAX_MaxDown', 'MAX_MaxUp', 'NAME', 'AREA_TYPE', 'COUNTYNBR',
+                                       'Name_Area', 'MaxDown_Tier', 'MaxUp_Tier']),
+        ]
+
+        for table, fields in tables:
+            print('Exporting {}...'.format(table))
+            with instrument.stage(table):
+                rows = self.write_parquet(self.workspace.read(table, fields), fields, join(self.options['--target'], table))
+                instrument.rows(written=rows)
+
+            print('{} rows written'.format(rows))
+
+        print('done')
+
+    def schema(self, fields):
+        import pyarrow as pa
+
+        columns = []
+        for field in fields:
+            if field in CATEGORICAL:
+                columns.append((field, pa.dictionary(pa.int32(), pa.string())))
+            elif field.startswith('FID_'):
+                columns.append((field, pa.int64()))
+            else:
+                columns.append((field, pa.type_for_alias(TYPES[field])))
+
+        return pa.schema(columns)
+
+    def batches(self, rows, schema):
+        '''yields record batches of the rows
+        '''
+        import pyarrow as pa
+
+        def to_batch(chunk):
+            columns = list(zip(*chunk))
+            arrays = []
+            for column, field in zip(columns, schema):
+                if pa.types.is_dictionary(field.type):
+                    arrays.append(pa.array(column, pa.string()).dictionary_encode())
+                else:
+                    arrays.append(pa.array(column, field.type))
+
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+
+            if len(chunk) == self.batch:
+                yield to_batch(chunk)
+                chunk = []
+
+        if chunk:
+            yield to_batch(chunk)
+
+    def write_parquet(self, rows, fields, folder):
+        '''writes the rows as a zstd compressed Parquet dataset partitioned by COUNTYNBR and returns the row count
+        '''
+        import pyarrow.dataset as ds
+
+        schema = self.schema(fields)
+        count = [0]
+
+        def counted(batches):
+            for batch in batches:
+                count[0] += batch.num_rows
+                yield batch
+
+        ds.write_dataset(
+            counted(self.batches(rows, schema)),
+            folder,
+            schema=schema,
+            format='parquet',
+            partitioning=['COUNTYNBR'],
+            partitioning_flavor='hive',
+            file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+            existing_data_behavior='delete_matching',
+        )
+
+        return count[0]
+
+    def validate(self, options):
+        if not self.options['--target']:
+            raise Exception('--target needs to be set so we now what folder to write to')
+
+        if not self.options['--workspace']:
+            raise Exception('--workspace needs to be set so we now what geodatabase to act on')
+
+        export_format = self.options['--format'] or 'parquet'
+        if export_format not in self.formats:
+            raise Exception('{} is not an export format. Choose one of {}'.format(export_format, ', '.join(self.formats)))
+
+        self.workspace = workspaces.create(self.options['--workspace'])
+        if not self.workspace.exists():
+            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.options['--workspace']))
@@ -6,12 +6,26 @@ postprocess.py
 For use with ArcGIS 10.4 and Python 2.7
 This script takes the results from Broadband Stats from Address Points and prepares the output to load into a Google
 spreadsheet (sorts speeds, adds nodata rows, and adds standard speed tiers to records)
+
+The counts of a geography that nests in another chosen geography are summed from it instead of read, so the county
+and statewide CSVs come from the area counts. The statewide CSVs are always written along with the share of address
+points at or above each tier and the share at or above both the download and upload tier of each pair, where 25/3 Mbps
+is read from.
 '''
 
-import arcpy
-import csv
 from .command import Command
-from os.path import isdir
+from boost import instrument
+from boost import tiers
+from boost import workspaces
+from boost.geographies import STATE
+from boost.geographies import geographies
+from boost.geographies import select
+from boost.report import TierMatrix
+from boost.report import write_csv
+from boost.report import write_joint_csv
+from boost.stages import StageRunner
+from boost.stages import file_fingerprint
+from boost.stages import state_path
 from os.path import join
 
 
@@ -44,85 +58,99 @@ class PostProcess(Command):
             11: '1 Gbps or greater'
         }
     }
-    geometry_types = ['Area', 'County']
 
     def execute(self):
         self.validate(self.options)
 
-        target_folder = self.options['<target>']
-        database = self.options['<workspace>']
+        target_folder = self.options['--target']
+        workspace = self.workspace
+        levels = self.levels()
 
+        tables = []
+        csvs = []
         for speed_type in self.upload_speeds:
-            for geometry_type in self.geometry_types:
-                print(speed_type, geometry_type)
-
-                csv_fields = ['AreaName', 'AreaType', 'NTIA Speed Code', 'NTIA Speed Range', 'Percentage', 'Count', 'Address Count']
-
-                target_path = join(target_folder, '{}_{}.csv'.format(speed_type, geometry_type))
-                table = join(database, '{}_{}'.format(speed_type, geometry_type))
-
-                data = {}
-                '''
-                example
-                {
-                    'Bicknell': {
-                        5: 188,
-                        6: 199
-                    }
-                }
-                '''
-
-                #: aggregate data by area
-                with arcpy.da.SearchCursor(table, '*') as cur:
-                    if geometry_type == self.geometry_types[0]:  #: Area
-                        for objectid, frequency, tier, name in cur:
-                            data.setdefault(name, {})
-
-                            data[name][tier] = frequency
-                    else:  #: County
-                        for objectid, frequency, tier, county_number, name in cur:  #: Removed total from unpack list; change in arcpy function that created the table?
-                            if not name:
-                                name = 'NULL'
-                            data.setdefault(name, {})
-
-                            data[name][tier] = frequency
-
-                with open(target_path, 'w', newline='\n') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(csv_fields)
-
-                    for name in sorted(data):
-                        if name is None:
-                            continue
-
-                        area_dict = data[name]
-                        total = 0.0
-
-                        if geometry_type == self.geometry_types[0]:
-                            area_name, area_type = name.split('|')
-                        else:
-                            area_name = name
-
-                        #: fill in missing speeds and tally up total
-                        for speed in self.upload_speeds[speed_type]:
-                            total = total + area_dict.setdefault(speed, 0)
-
-                        for tier in area_dict:
-                            frequency = area_dict[tier]
-                            if total > 0:
-                                percentage = round(frequency / total, 3)
-                            else:
-                                percentage = 0
-
-                            if geometry_type == self.geometry_types[0]:
-                                line = [area_name, area_type, tier, self.upload_speeds[speed_type][tier], percentage, frequency, total]
-                            else:
-                                line = [area_name, 'County', tier, self.upload_speeds[speed_type][tier], percentage, frequency, total]
-
-                            writer.writerow(line)
+            for geography, child in levels:
+                if child is None:
+                    tables.append('{}_{}'.format(speed_type, geography.name))
+
+                csvs.append(join(target_folder, '{}_{}.csv'.format(speed_type, geography.name)))
+
+            csvs.append(join(target_folder, '{}_State_AtOrAbove.csv'.format(speed_type)))
+
+        tables.append(tiers.JOINT_TABLE)
+        csvs.append(join(target_folder, '{}_AtOrAbove.csv'.format(tiers.JOINT_TABLE)))
+
+        runner = StageRunner(state_path(workspace.path), 'postprocess',
+                             lambda name: file_fingerprint(name) if name in csvs else workspace.fingerprint(name),
+                             self.options['--resume'])
+        runner.run('postprocess', lambda: self.write_csvs(target_folder, workspace, levels), inputs=tables, outputs=csvs,
+                   config={'speeds': self.upload_speeds, 'levels': [(geography.name, child) for geography, child in levels]})
 
         print('done')
 
+    def levels(self):
+        '''returns the (geography, child) of the chosen geographies and the state in the order they are built. child is
+        the name of the geography whose counts are rolled up into it or None when its table is read
+        '''
+        chosen = list(self.geographies)
+        if geographies['state'] not in chosen:
+            chosen.append(geographies['state'])
+
+        names = [geography.name for geography in chosen]
+        #: the geographies that are read come first so every rolled up geography has its child built already
+        chosen.sort(key=lambda geography: geography.rolled_up_from(names) is not None)
+
+        return [(geography, geography.rolled_up_from(names)) for geography in chosen]
+
+    def write_csvs(self, target_folder, workspace, levels):
+        '''reads the frequency tables of the geographies that are not rolled up once into unit by tier TierMatrix and
+        sums the others from them, writing each CSV in chunks. the state is also written as at or above each tier and
+        at or above each pair of download and upload tiers
+        '''
+        for speed_type in self.upload_speeds:
+            matrices = {}
+            ranges = self.upload_speeds[speed_type]
+
+            for geography, child in levels:
+                print(speed_type, geography.name)
+
+                with instrument.stage('{}_{}'.format(speed_type, geography.name)):
+                    if child is None:
+                        matrices[geography.name] = self.matrix(workspace, speed_type, geography)
+                        if matrices[geography.name].missing:
+                            print('{:,} address points have no {} and are not counted'.format(matrices[geography.name].missing,
+                                                                                           speed_type))
+                    else:
+                        matrices[geography.name] = matrices[child].rollup(geography.parent)
+
+                    target_path = join(target_folder, '{}_{}.csv'.format(speed_type, geography.name))
+                    labeled = matrices[geography.name].rollup(geography.label).sort(geography.sort_key)
+
+                    write_csv(target_path, labeled, lambda label: label, ranges)
+
+            with instrument.stage('{}_State_AtOrAbove'.format(speed_type)):
+                state = matrices['State'].rollup(geographies['state'].label)
+                write_csv(join(target_folder, '{}_State_AtOrAbove.csv'.format(speed_type)), state, lambda label: label, ranges,
+                          cumulative=True)
+
+        with instrument.stage('{}_AtOrAbove'.format(tiers.JOINT_TABLE)):
+            rows = workspace.read(tiers.JOINT_TABLE, ['FREQUENCY', 'MaxDown_Tier', 'MaxUp_Tier'])
+            missing = write_joint_csv(join(target_folder, '{}_AtOrAbove.csv'.format(tiers.JOINT_TABLE)), rows,
+                                      geographies['state'].label((STATE, )), self.upload_speeds['MaxDown'], self.upload_speeds['MaxUp'])
+            if missing:
+                print('{:,} address points have no MaxDown or MaxUp and are not counted in {}'.format(missing, tiers.JOINT_TABLE))
+
+    def matrix(self, workspace, speed_type, geography):
+        '''reads a frequency table into a TierMatrix keyed by the field values of each geography unit
+        '''
+        table = '{}_{}'.format(speed_type, geography.name)
+        ranges = self.upload_speeds[speed_type]
+
+        fields = ['FREQUENCY', '{}_Tier'.format(speed_type)] + geography.fields
+        rows = ((tuple(row[2:]), row[1], row[0]) for row in workspace.read(table, fields))
+
+        return TierMatrix.from_rows(rows, ranges)
+
     def validate(self, options):
         if not self.options['--target']:
             raise Exception('--target needs to be set so we now what geodatabase to act on')
@@ -130,5 +158,7 @@ class PostProcess(Command):
         if not self.options['--workspace']:
             raise Exception('--workspace needs to be set so we now what geodatabase to act on')
 
-        if not isdir(self.options['<workspace>']):
-            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.options['<workspace>']))
+        self.geographies = select(self.options['--geographies'])
+        self.workspace = workspaces.create(self.options['--workspace'])
+        if not self.workspace.exists():
+            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.options['--workspace']))
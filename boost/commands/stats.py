@@ -3,186 +3,246 @@
 '''
 stats.py
 
-A module that contains
+A module that contains the statistics command. Address_Service_Final is read once into a MsbaFrame and every step
+runs against it in memory. The only writes are the final output tables. When the columns analyze saved next to the
+workspace are still fresh they are memory mapped instead of reading the table. See sidecar.py.
+
+The workspace is a file geodatabase or, without ArcGIS, the GeoPackage the shapely backend wrote.
+
+Speed tiers are counted for each geography chosen with --geographies, by default area and county. See geographies.py.
 '''
 
-import arcpy
+import numpy as np
+
 from .command import Command
+from boost import instrument
+from boost import sidecar
+from boost import tiers
+from boost import workspaces
+from boost.aggregate import sparse_counts
 from boost.config import feature_classes
+from boost.frame import MsbaFrame
+from boost.frame import to_structured
+from boost.geographies import select
+from boost.stages import StageRunner
+from boost.stages import state_path
+
+
+def field_values(rows, i):
+    '''the values of field i of the unit rows. numeric fields stay numeric with None as NaN so they are not written as text
+    '''
+    values = [row[i] for row in rows]
+    present = [value for value in values if value is not None]
+
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return np.array([np.nan if value is None else value for value in values], dtype='f8')
+
+    return values
 
 
 class Stats(Command):
 
+    #: the memory mapped columns of Address_Service_Final when analyze saved them and they are fresh
+    columns = None
+    #: the StageRunner of the command, which remembers the fingerprints of the tables
+    runner = None
+
+    #: the address count group bys. they are counted together in one scan of the frame
+    groups = [
+        ('name_area', ),
+        ('area_type', ),
+        ('county', ),
+    ]
+
     def execute(self):
         self.validate(self.options)
 
-        #: define workspace geodatabse
-        arcpy.env.workspace = self.options['<workspace>']
-        arcpy.env.overwriteOutput = True
-
-        self.max_speeds(feature_classes['address_service_final'])
-        self.address_counts(feature_classes['msba'], feature_classes['address_count_area'], feature_classes['address_count_type'],
+        self.runner = runner = StageRunner(state_path(self.workspace.path), 'stats', self.workspace.fingerprint, self.options['--resume'])
+        inputs = [feature_classes['address_service_final'], feature_classes['counties']]
+        inputs += [geography.layer for geography in self.geographies if hasattr(geography, 'layer')]
+        outputs = [feature_classes[name] for name in ['address_count_area', 'address_count_type', 'address_count_county', 'msba']]
+        outputs += ['{}_{}'.format(speed, geography.name) for geography in self.geographies for speed in ['MaxDown', 'MaxUp']]
+        outputs.append(tiers.JOINT_TABLE)
+
+        #: the steps share the frame in memory so they are one stage
+        runner.run('stats', self.summarize, inputs=inputs, outputs=outputs,
+                   config={'groups': self.groups, 'geographies': [geography.name for geography in self.geographies]})
+
+    def summarize(self):
+        frame = self.max_speeds(feature_classes['address_service_final'])
+        self.speed_tiers(frame)
+        counts = self.count(frame)
+        self.address_counts(counts, feature_classes['address_count_area'], feature_classes['address_count_type'],
                             feature_classes['address_count_county'])
-        self.speed_tiers(feature_classes['msba'])
-        self.speed_counts(feature_classes['msba'], feature_classes['counties'])
+        self.speed_counts(frame, self.geographies)
+        self.joint_counts(frame, tiers.JOINT_TABLE)
+        self.write_msba(frame, feature_classes['msba'])
 
     def validate(self, options):
         if not self.options['--workspace']:
             raise Exception('--workspace needs to be set so we now what geodatabase to act on')
 
-        if not arcpy.Exists(self.options['<workspace>']):
-            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.options['<workspace>']))
+        self.geographies = select(self.options['--geographies'])
+        self.workspace = workspaces.create(self.options['--workspace'])
+        if not self.workspace.exists():
+            raise Exception('We could not find {}. Will you make sure it exist and try again?'.format(self.options['--workspace']))
 
+    @instrument.measured
     def max_speeds(self, address_points):
-        '''find maximum download and upload speed for each address ( ~ 10 Minutes)
+        '''find maximum download and upload speed for each address along with the area it is in. the columns analyze
+        saved are memory mapped when they are fresh, otherwise a streaming MaxSpeedReducer runs over the cursor. this is
+        the only read of Address_Service_Final
         '''
         print('Calculating Maximum Upload and Download Speeds for Addresses...')
-        try:
-            addr_fc = feature_classes['address_points']
-            arcpy.Statistics_analysis(address_points, feature_classes['msba'], [['MaxDown', 'MAX'], ['MaxUp', 'MAX']], f'FID_{addr_fc}')
-        except:
-            print(arcpy.GetMessages())
-        try:
-            #: calls function above. Adds new Max statistics back to main data table (~ 5 minutes)
-            self.join_tables(feature_classes['msba'], address_points)
-        except:
-            print(arcpy.GetMessages())
-
-    def address_counts(self, layer, out_name, out_type, out_county):
-        '''find number of address points in each area by name.
+        #: the runner already has the fingerprint when resuming so the table is described once
+        fingerprint = self.runner.fingerprints([address_points])[address_points] if self.runner else None
+        self.columns = sidecar.load(self.workspace, address_points, fingerprint)
+
+        if self.columns is not None:
+            print('Reading the columns analyze saved in {}...'.format(sidecar.folder(self.workspace, address_points)))
+            columns = self.columns
+            frame = MsbaFrame.from_columns(columns.fid, columns.down, columns.up, columns.area, columns.areas)
+            instrument.rows(read=len(columns))
+        else:
+            fields = MsbaFrame.source_fields(feature_classes['address_points'])
+            frame = MsbaFrame.from_rows(self.workspace.read(address_points, fields))
+
+        print('{} address points loaded ({} MB)'.format(len(frame), round(frame.nbytes / 1048576, 1)))
+
+        return frame
+
+    @instrument.measured
+    def speed_tiers(self, frame):
+        '''Calculates Speed Tiers for MaxDown and MaxUp Speeds
+        both columns are classified together against the breakpoint table in boost.tiers'''
+        print('Calculating Speed Tiers...')
+        frame.add_tiers()
+
+    @instrument.measured
+    def count(self, frame):
+        '''counts the address points for every group by in one scan.
         A new field 'Name_Area' is specified due to duplicate names (Emery=County and Emery=Municipality) This is
         important when running query script'''
-        print('Calculating Address Count By Area Name...')
-        try:
-            arcpy.AddField_management(layer, 'Name_Area', 'Text')
-            with arcpy.da.UpdateCursor(layer, ['Name_Area', 'NAME', 'AREA_TYPE']) as cursor:
-                for row in cursor:
-                    row[0] = '{}|{}'.format(row[1], row[2])
-                    cursor.updateRow(row)
-
-            addr_fc = feature_classes['address_points']
-            arcpy.Statistics_analysis(layer, out_name, [[f'FID_{addr_fc}', 'Count']], ['Name_Area'])
-        except:
-            print(arcpy.GetMessages())
+        print('Counting Address Points By Area, Type, County and Speed Tier...')
+        frame.add_name_area()
+
+        return frame.counts(self.groups)
+
+    @instrument.measured
+    def address_counts(self, counts, out_name, out_type, out_county):
+        '''find number of address points in each area by name
+        '''
+        print('Writing Address Count By Area Name...')
+        self.write_counts(counts[('name_area', )], ['Name_Area'], out_name)
+
         #: find number of address points in each area by area type (Municipality, Unincorporated, Other)
-        print('Calculating Address Count By Area Type...')
-        try:
-            addr_fc = feature_classes['address_points']
-            arcpy.Statistics_analysis(layer, out_type, [[f'FID_{addr_fc}', 'Count']], ['AREA_TYPE'])
-        except:
-            print(arcpy.GetMessages())
+        print('Writing Address Count By Area Type...')
+        self.write_counts(counts[('area_type', )], ['AREA_TYPE'], out_type)
+
         #: find number of address points in each area by County
         #: The 'other' category only represents County area that is not a municipality or unincorporated.
         #: This step gets an address count using the entire County's area
-        print('Calculating Address Count By County...')
-        try:
-            addr_fc = feature_classes['address_points']
-            arcpy.Statistics_analysis(layer, out_county, [[f'FID_{addr_fc}', 'Count']], ['COUNTYNBR'])
-        except:
-            print(arcpy.GetMessages())
-
-    def speed_tiers(self, table):
-        '''Calculates Speed Tiers for MaxDown and MaxUp Speeds
-        ~ 5 Minutes'''
-        print('Calculating Speed Tiers...')
-        arcpy.AddField_management(table, 'MaxDown_Tier', 'Short')
-        arcpy.AddField_management(table, 'MaxUp_Tier', 'Short')
-
-        #: TODO combine these to one loop
-        with arcpy.da.UpdateCursor(table, ['MAX_MaxDown', 'MaxDown_Tier']) as cursor:
-            for row in cursor:
-                if row[0] < 0.768:
-                    row[1] = 0
-                elif 0.768 <= row[0] < 1.5:
-                    row[1] = 3
-                elif 1.5 <= row[0] < 3:
-                    row[1] = 4
-                elif 3 <= row[0] < 6:
-                    row[1] = 5
-                elif 6 <= row[0] < 10:
-                    row[1] = 6
-                elif 10 <= row[0] < 25:
-                    row[1] = 7
-                elif 25 <= row[0] < 50:
-                    row[1] = 8
-                elif 50 <= row[0] < 100:
-                    row[1] = 9
-                elif 100 <= row[0] < 1000:
-                    row[1] = 10
-                elif row[0] >= 1000:
-                    row[1] = 11
-
-                cursor.updateRow(row)
-        with arcpy.da.UpdateCursor(table, ['MAX_MaxUp', 'MaxUp_Tier']) as cursor:
-            for row in cursor:
-                if row[0] < 0.768:
-                    row[1] = 0
-                elif 0.768 <= row[0] < 1.5:
-                    row[1] = 3
-                elif 1.5 <= row[0] < 3:
-                    row[1] = 4
-                elif 3 <= row[0] < 6:
-                    row[1] = 5
-                elif 6 <= row[0] < 10:
-                    row[1] = 6
-                elif 10 <= row[0] < 25:
-                    row[1] = 7
-                elif 25 <= row[0] < 50:
-                    row[1] = 8
-                elif 50 <= row[0] < 100:
-                    row[1] = 9
-                elif 100 <= row[0] < 1000:
-                    row[1] = 10
-                elif row[0] >= 1000:
-                    row[1] = 11
-
-                cursor.updateRow(row)
-
-    def speed_counts(self, msba, counties):
-        '''Calculates number of address points in each speed tier for: Counties
+        print('Writing Address Count By County...')
+        self.write_counts(counts[('county', )], ['COUNTYNBR'], out_county)
+
+    @instrument.measured
+    def speed_counts(self, frame, geographies):
+        '''Writes the number of address points in each speed tier for every geography. the tiers of every geography are
+        counted together and only the unit and tier cells with address points are written
+        '''
+        print('Assigning Address Points to {}...'.format(', '.join(geography.name for geography in geographies)))
+        units = [geography.assign(frame, self.workspace, lambda: self.coordinates(frame)) for geography in geographies]
+
+        print('Counting Speed Tiers...')
+        tier_cardinality = max(tiers.TIERS) - tiers.MISSING + 1
+        #: code 0 of each unit column is None
+        counts = sparse_counts([(unit.codes + 1, len(unit.categories) + 1) for unit in units],
+                               [frame.down_tier - tiers.MISSING, frame.up_tier - tiers.MISSING], tier_cardinality)
+
+        for geography, unit, speeds in zip(geographies, units, counts):
+            print('Writing Speed Tier Statistics for {}...'.format(geography.name))
+            values = [tuple(None for _ in geography.fields)] + unit.categories
+
+            for speed, (unit_codes, tier_codes, frequency) in zip(['MaxDown', 'MaxUp'], speeds):
+                rows = [values[code] for code in unit_codes.tolist()]
+                columns = [('FREQUENCY', frequency), ('{}_Tier'.format(speed), (tier_codes + tiers.MISSING).astype('i2'))]
+                columns += [(field, field_values(rows, i)) for i, field in enumerate(geography.fields)]
+
+                self.write_table(to_structured(columns), '{}_{}'.format(speed, geography.name))
+
+    @instrument.measured
+    def joint_counts(self, frame, output):
+        '''writes the number of address points statewide in each pair of download and upload tiers with address points,
+        which postprocess needs for the share at or above both speeds of a pair such as 25/3 Mbps
         '''
-        print('Calculating Speed Tier Statistics for Counties...')
-        arcpy.Frequency_analysis(msba, 'MaxDown_County', ['MaxDown_Tier', 'COUNTYNBR'])
-        arcpy.Frequency_analysis(msba, 'MaxUp_County', ['MaxUp_Tier', 'COUNTYNBR'])
-        tables = ['MaxDown_County', 'MaxUp_County']
-
-        for table in tables:
-            arcpy.JoinField_management(table, 'COUNTYNBR', counties, 'COUNTYNBR', ['NAME'])
-            arcpy.JoinField_management(table, 'COUNTYNBR', feature_classes['address_count_county'], 'COUNTYNBR', ['COUNT_FID_AddressPoints'])
-
-        #: Named Areas (Municipalities, Unincorporated, Other)
-        print('Calculating Speed Tier Statistics for Areas...')
-        arcpy.Frequency_analysis(msba, 'MaxDown_Area', ['MaxDown_Tier', 'Name_Area'])
-        arcpy.Frequency_analysis(msba, 'MaxUp_Area', ['MaxUp_Tier', 'Name_Area'])
-
-    def join_tables(self, target, join):
-        '''join area data (area name, type, county) to MSBA statistics generated above
-        this custom join function is much faster than the JoinField tool'''
+        print('Writing Download by Upload Speed Tier Statistics...')
+        tier_cardinality = max(tiers.TIERS) - tiers.MISSING + 1
+        pairs = (frame.down_tier.astype('i8') - tiers.MISSING) * tier_cardinality + frame.up_tier - tiers.MISSING
+        pairs, frequency = np.unique(pairs, return_counts=True)
+
+        self.write_table(to_structured([
+            ('FREQUENCY', frequency),
+            ('MaxDown_Tier', (pairs // tier_cardinality + tiers.MISSING).astype('i2')),
+            ('MaxUp_Tier', (pairs % tier_cardinality + tiers.MISSING).astype('i2')),
+        ]), output)
+
+    @instrument.measured
+    def coordinates(self, frame):
+        '''reads the x and y of each address point in frame order from the saved columns or Address_Service_Final. only the
+        geographies that locate address points call this
+        '''
+        if getattr(self, '_coordinates', None) is None:
+            print('Reading Address Point Coordinates...')
+            if self.columns is not None:
+                fids, x, y = [np.asarray(column, dtype='f8') for column in [self.columns.fid, self.columns.x, self.columns.y]]
+            else:
+                addr_fc = feature_classes['address_points']
+                rows = self.workspace.read(feature_classes['address_service_final'], [f'FID_{addr_fc}', 'x', 'y'])
+                fids, x, y = [np.array(column, dtype='f8') for column in zip(*rows)] or [np.empty(0)] * 3
+
+            #: keep the first row of each address point and line them up with the frame, which is sorted by fid
+            _, first = np.unique(fids, return_index=True)
+            order = np.argsort(fids[first], kind='stable')
+            positions = np.searchsorted(fids[first][order], frame.fid)
+            rows_of_frame = first[order][np.minimum(positions, max(len(first) - 1, 0))]
+
+            self._coordinates = (np.array([np.nan if value is None else value for value in x[rows_of_frame].tolist()], dtype='f8'),
+                                 np.array([np.nan if value is None else value for value in y[rows_of_frame].tolist()], dtype='f8'))
+
+        return self._coordinates
+
+    def write_counts(self, counts, fields, output):
+        '''writes the (key, count) pairs from MsbaFrame.count in the shape of a Statistics_analysis COUNT table
+        '''
+        addr_fc = feature_classes['address_points']
+        columns = [(field, [key[i] for key, _ in counts]) for i, field in enumerate(fields)]
+        columns.append(('FREQUENCY', [count for _, count in counts]))
+        columns.append((f'COUNT_FID_{addr_fc}', [count for _, count in counts]))
+
+        self.write_table(to_structured(columns), output)
+
+    @instrument.measured
+    def write_msba(self, frame, output):
+        '''writes the in memory frame as the MSBA table
+        '''
+        print('Writing {}...'.format(output))
         addr_fc = feature_classes['address_points']
-        fieldlist = [f'FID_{addr_fc}', 'NAME', 'AREA_TYPE', 'COUNTYNBR']
-
-        #: Step 1: Create dictionary of fields and values to be joined
-        joindict = {}
-        with arcpy.da.SearchCursor(join, fieldlist) as rows:
-            for row in rows:
-                joinval = row[0]
-                val1 = row[1]
-                val2 = row[2]
-                val3 = row[3]
-                joindict[joinval] = [val1, val2, val3]
-
-        arcpy.AddField_management(target, 'NAME', 'TEXT')
-        arcpy.AddField_management(target, 'AREA_TYPE', 'TEXT')
-        arcpy.AddField_management(target, 'COUNTYNBR', 'TEXT')
-
-        #:  Step 2: Specify Key Value field. If it exists in target, populate new fields with appropriate values
-        with arcpy.da.UpdateCursor(target, fieldlist) as recs:
-            for rec in recs:
-                #: import pdb; pdb.set_trace()
-                keyval = rec[0]
-                if keyval in joindict:
-                    rec[1] = joindict[keyval][0]
-                    rec[2] = joindict[keyval][1]
-                    rec[3] = joindict[keyval][2]
-
-                recs.updateRow(rec)
+
+        self.write_table(
+            to_structured([
+                (f'FID_{addr_fc}', frame.fid),
+                ('FREQUENCY', frame.frequency),
+                ('MAX_MaxDown', frame.max_down),
+                ('MAX_MaxUp', frame.max_up),
+                ('NAME', frame.name),
+                ('AREA_TYPE', frame.area_type),
+                ('COUNTYNBR', frame.county),
+                ('Name_Area', frame.name_area),
+                ('MaxDown_Tier', frame.down_tier),
+                ('MaxUp_Tier', frame.up_tier),
+            ]), output)
+
+    def write_table(self, array, name):
+        '''replaces the table in the workspace with the contents of a numpy structured array
+        '''
+        self.workspace.write_table(name, array)
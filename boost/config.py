@@ -18,9 +18,13 @@ feature_classes = {
     'municip': 'municipal_boundaries',
     #: Approximate unincorporated areas
     'unincorp': 'unincorporated_boundaries',
+    #: Census geographies, only needed for the tract and block geographies
+    'census_tracts': 'CensusTracts2020',
+    'census_blocks': 'CensusBlocks2020',
 
     #: Output dataset names
     'address_service_final': 'Address_Service_Final_20201105no_syringa',
+    'service_keys': 'Service_Keys_20201105no_syringa',
     'msba': 'MSBA_20201105no_syringa',
     'address_count_area': 'AddressCount_AreaName_20201105no_syringa',
     'address_count_type': 'AddressCount_AreaType_20201105no_syringa',
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+frame.py
+
+A module that holds the maximum speed by address (MSBA) table in memory as parallel column arrays so every stats step
+can run against it without going back to the geodatabase.
+
+Memory: each address point costs MsbaFrame.BYTES_PER_ROW (44) bytes across the numeric columns and the int32 codes of
+the categorical text columns, about 44 MB per million address points. Each distinct area name, type and county number
+is stored once in the categories.
+'''
+
+import numpy as np
+
+from boost import tiers
+from boost.aggregate import MultiCount
+from boost.categorical import Categorical
+from boost.reduce import MaxSpeedReducer
+
+
+def to_structured(columns):
+    '''turns a list of (field name, values) into a numpy structured array suitable for NumPyArrayToTable.
+    text and categorical columns become fixed width unicode with None written as an empty string
+    '''
+    dtypes = []
+    values = []
+    for field, column in columns:
+        if isinstance(column, Categorical):
+            column = column.strings()
+        else:
+            column = np.asarray(column)
+
+        if column.dtype.kind == 'U':
+            dtypes.append((field, column.dtype))
+        elif column.dtype.kind == 'O':
+            column = np.array(['' if value is None else str(value) for value in column], dtype=str)
+            dtypes.append((field, 'U{}'.format(max(column.dtype.itemsize // 4, 1))))
+        else:
+            dtypes.append((field, column.dtype))
+
+        values.append(column)
+
+    length = len(values[0]) if values else 0
+    output = np.empty(length, dtype=dtypes)
+    for (field, _), column in zip(dtypes, values):
+        output[field] = column
+
+    return output
+
+
+class MsbaFrame(object):
+    '''the maximum download and upload speed for each address point along with the area it falls in
+    '''
+    __slots__ = ['fid', 'frequency', 'max_down', 'max_up', 'name', 'area_type', 'county', 'name_area', 'down_tier', 'up_tier']
+
+    #: fid (4) + frequency (4) + max_down (8) + max_up (8) + tiers (2 + 2) + four categorical codes (4 * 4)
+    BYTES_PER_ROW = 44
+
+    def __init__(self):
+        for slot in self.__slots__:
+            setattr(self, slot, None)
+
+    def __len__(self):
+        return 0 if self.fid is None else len(self.fid)
+
+    @property
+    def nbytes(self):
+        '''the bytes held by the column arrays, not counting the shared text values
+        '''
+        return sum(getattr(self, slot).nbytes for slot in self.__slots__ if getattr(self, slot) is not None)
+
+    @staticmethod
+    def source_fields(address_points):
+        '''the Address_Service_Final fields from_rows expects, in order
+        '''
+        return [f'FID_{address_points}', 'MaxDown', 'MaxUp', 'NAME', 'AREA_TYPE', 'COUNTYNBR']
+
+    @classmethod
+    def from_rows(cls, rows):
+        '''builds the frame from (fid, max down, max up, name, area type, county) rows of Address_Service_Final.
+        an address point with many providers has many rows which are reduced to the max speeds and the area of the first row
+        '''
+        return cls.from_reducer(MaxSpeedReducer().update(rows))
+
+    @classmethod
+    def from_reducer(cls, reducer):
+        '''builds the frame from the per address records of a MaxSpeedReducer sorted by fid
+        '''
+        frame = cls()
+        fid = np.asarray(reducer.fid, dtype='i8')
+        order = np.argsort(fid, kind='stable')
+
+        frame.fid = fid[order].astype('i4')
+        frame.frequency = np.asarray(reducer.frequency, dtype='i4')[order]
+        frame.max_down = np.asarray(reducer.max_down, dtype='f8')[order]
+        frame.max_up = np.asarray(reducer.max_up, dtype='f8')[order]
+        frame.name = reducer.categorical('name')[order]
+        frame.area_type = reducer.categorical('area_type')[order]
+        frame.county = reducer.categorical('county')[order]
+
+        return frame
+
+    @classmethod
+    def from_columns(cls, fid, down, up, area, areas):
+        '''builds the frame from the per row columns of Address_Service_Final, such as the memory mapped sidecar, with
+        the same reduction as from_rows. area is a code into the list of (name, area type, county) areas with -1 for none
+        '''
+        frame = cls()
+        order = np.argsort(fid, kind='stable')
+        fid = np.asarray(fid)[order]
+        #: the first row of each address point in table order
+        starts = np.flatnonzero(np.r_[True, fid[1:] != fid[:-1]]) if len(fid) else np.empty(0, dtype='i8')
+
+        frame.fid = fid[starts].astype('i4')
+        frame.frequency = np.diff(np.r_[starts, len(fid)]).astype('i4')
+        #: fmax ignores NaN like the MAX statistic ignores null speeds
+        frame.max_down = np.fmax.reduceat(np.asarray(down, dtype='f8')[order], starts) if len(starts) else np.empty(0)
+        frame.max_up = np.fmax.reduceat(np.asarray(up, dtype='f8')[order], starts) if len(starts) else np.empty(0)
+
+        first = np.asarray(area)[order][starts]
+        for i, column in enumerate(['name', 'area_type', 'county']):
+            values = Categorical.from_values([values[i] for values in areas])
+            #: the appended -1 is what an area code of -1 picks
+            setattr(frame, column, Categorical(np.r_[values.codes, -1][first], values.categories))
+
+        return frame
+
+    def add_name_area(self):
+        '''adds the 'Name|AREA_TYPE' value that keeps duplicate names (Emery County and Emery Municipality) apart.
+        it is a composite code so the string is only formatted once per distinct area
+        '''
+        self.name_area = Categorical.combine(self.name, self.area_type)
+
+        return self.name_area
+
+    def add_tiers(self):
+        '''classifies the max speeds into speed tiers
+        '''
+        self.down_tier, self.up_tier = tiers.classify_speeds(self.max_down, self.max_up)
+
+        return self.down_tier, self.up_tier
+
+    def count(self, *columns):
+        '''counts the address points for each unique combination of the named columns.
+        returns a list of (key tuple, count) sorted by key with None sorting first
+        '''
+        return self.counts([columns])[columns]
+
+    def counts(self, groups):
+        '''counts the address points for every group by in groups, a list of column name tuples, with one scan over the
+        frame. the columns are name_area, county, down_tier and up_tier plus name and area_type which are taken from
+        the name_area composite. returns a dict of group to the same (key tuple, count) lists as count
+        '''
+        if self.name_area is None:
+            self.add_name_area()
+        if self.down_tier is None:
+            self.add_tiers()
+
+        tier_cardinality = max(tiers.TIERS) - tiers.MISSING + 1
+        name, area_type = self.name_area.parts
+
+        aggregate = MultiCount()
+        aggregate.add('name_area', self.name_area.codes + 1, len(self.name_area.categories) + 1)
+        aggregate.add('county', self.county.codes + 1, len(self.county.categories) + 1)
+        aggregate.add('down_tier', self.down_tier - tiers.MISSING, tier_cardinality)
+        aggregate.add('up_tier', self.up_tier - tiers.MISSING, tier_cardinality)
+        #: code 0 of name_area is None so it maps to the None code of each part
+        aggregate.derive('name', 'name_area', np.r_[0, name.codes + 1], len(name.categories) + 1)
+        aggregate.derive('area_type', 'name_area', np.r_[0, area_type.codes + 1], len(area_type.categories) + 1)
+        aggregate.scan()
+
+        def tier(code):
+            return code + tiers.MISSING
+
+        def categorical(column):
+            return lambda code: column.category(code - 1)
+
+        decoders = {
+            'name_area': categorical(self.name_area),
+            'county': categorical(self.county),
+            'name': categorical(name),
+            'area_type': categorical(area_type),
+            'down_tier': tier,
+            'up_tier': tier,
+        }
+
+        results = {}
+        for group in groups:
+            decode = [decoders[column] for column in group]
+            counts = [(tuple(decoder(code) for decoder, code in zip(decode, key)), count) for key, count in aggregate.group(*group)]
+
+            results[tuple(group)] = sorted(counts, key=lambda item: tuple((value is not None, value) for value in item[0]))
+
+        return results
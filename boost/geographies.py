@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+geographies.py
+
+A module that contains the geographies the stats command counts speed tiers in. Each geography assigns every address
+point in the MsbaFrame to a unit: an analysis area, a county, a census tract or block, or a hex grid cell. The tier
+counts for every selected geography are computed together with one sparse count.
+
+A geography writes a MaxDown_<name> and MaxUp_<name> table of FREQUENCY, the tier and its fields, and postprocess turns
+each into a CSV of the same name. Areas nest in counties and everything nests in the state, so postprocess sums the
+counts of a child geography into its parent instead of reading the parent's table when both are chosen.
+
+The census and hex geographies locate address points by the x and y of Address_Service_Final and the census geographies
+need shapely.
+'''
+
+from collections import OrderedDict
+from math import sqrt
+
+import numpy as np
+
+from boost.categorical import Categorical
+from boost.config import feature_classes
+
+#: the geographies stats and postprocess use when none are chosen
+DEFAULT = ['area', 'county']
+#: the name of the single state unit
+STATE = 'Utah'
+
+
+def county_names(workspace):
+    '''returns a dict of COUNTYNBR to the county NAME
+    '''
+    return dict(workspace.read(feature_classes['counties'], ['COUNTYNBR', 'NAME']))
+
+
+class Geography(object):
+    '''An abstract geography.
+
+    assign returns a Categorical of the unit of each address point whose categories are tuples of the values of fields.
+    '''
+
+    #: the suffix of the table and CSV names
+    name = None
+    #: the fields that identify a unit in the output tables
+    fields = []
+    #: the names of the geographies whose units nest in these units, in the order they are preferred to roll up from
+    children = []
+
+    def assign(self, frame, workspace, coordinates):
+        '''returns a Categorical of the unit of each address point in the frame. coordinates() returns the x and y arrays
+        of the address points in frame order
+        '''
+        raise NotImplementedError('You must implement the assign() method in the inheriting class.')
+
+    def parent(self, values):
+        '''returns the field values of the unit containing the unit of a child geography with the field values values
+        '''
+        raise NotImplementedError('You must implement the parent() method in a geography with children.')
+
+    def rolled_up_from(self, names):
+        '''the name of the first child in names, the geography whose counts are summed into this one, or None
+        '''
+        return next((child for child in self.children if child in names), None)
+
+    def label(self, values):
+        '''returns the (AreaName, AreaType) postprocess writes for the field values of a unit
+        '''
+        return (values[0] if values[0] not in (None, '') else 'NULL', self.name)
+
+    def sort_key(self, label):
+        '''the postprocess CSV order
+        '''
+        return label[0]
+
+
+class AreaGeography(Geography):
+    '''the municipalities, unincorporated areas and rest of each county by Name_Area. an area in two counties is a unit
+    in each so the counties can be rolled up from the areas. postprocess writes the area totals across counties
+    '''
+    name = 'Area'
+    fields = ['Name_Area', 'NAME', 'AREA_TYPE', 'COUNTYNBR', 'COUNTY_NAME']
+
+    def assign(self, frame, workspace, coordinates):
+        if frame.name_area is None:
+            frame.add_name_area()
+
+        units = Categorical.combine(frame.name_area, frame.county)
+        name_areas, counties = units.parts
+        name, area_type = frame.name_area.parts
+        names = county_names(workspace)
+
+        categories = []
+        for name_area, county in zip(name_areas.codes.tolist(), counties.codes.tolist()):
+            county = counties.category(county)
+            categories.append((frame.name_area.category(name_area), name.category(name.codes[name_area]),
+                               area_type.category(area_type.codes[name_area]), county, names.get(county)))
+
+        return Categorical(units.codes, categories)
+
+    def label(self, values):
+        return (values[1], values[2])
+
+    def sort_key(self, label):
+        #: areas sort in the same order as their 'Name|AREA_TYPE' strings
+        return '{}|{}'.format(*label)
+
+
+class CountyGeography(Geography):
+    '''the counties by COUNTYNBR with the county NAME
+    '''
+    name = 'County'
+    fields = ['COUNTYNBR', 'NAME']
+    children = ['Area']
+
+    def assign(self, frame, workspace, coordinates):
+        names = county_names(workspace)
+
+        return Categorical(frame.county.codes, [(county, names.get(county)) for county in frame.county.categories])
+
+    def parent(self, values):
+        return (values[3], values[4])
+
+    def label(self, values):
+        return (values[1] or 'NULL', self.name)
+
+
+class StateGeography(Geography):
+    '''the whole state. postprocess always writes it, rolled up from whichever geography was chosen
+    '''
+    name = 'State'
+    fields = ['STATE']
+    children = ['County', 'Area', 'Tract', 'Block', 'Hex']
+
+    def assign(self, frame, workspace, coordinates):
+        return Categorical(np.zeros(len(frame), dtype='i4'), [(STATE, )])
+
+    def parent(self, values):
+        return (STATE, )
+
+
+class PolygonGeography(Geography):
+    '''the polygons of a layer in the workspace identified by a field, such as census tracts or blocks by GEOID
+    '''
+
+    def __init__(self, name, layer, field):
+        self.name = name
+        self.layer = layer
+        self.fields = [field]
+
+    def assign(self, frame, workspace, coordinates):
+        from shapely import from_wkb
+        from shapely import points as to_points
+
+        from boost.backends.geos import covering
+
+        polygons = []
+        identifiers = []
+        for wkb, identifier in workspace.read(self.layer, ['SHAPE@WKB'] + self.fields):
+            polygons.append(bytes(wkb))
+            identifiers.append(identifier)
+
+        x, y = coordinates()
+        index = covering(to_points(x, y), from_wkb(np.array(polygons, dtype=object)))
+
+        #: the polygons are dictionary encoded by identifier so a unit split into several polygons is counted once
+        units = Categorical.from_values(identifiers)
+        codes = np.where(index >= 0, units.codes[np.maximum(index, 0)] if len(identifiers) else -1, -1)
+
+        return Categorical(codes, [(identifier, ) for identifier in units.categories])
+
+
+class HexGeography(Geography):
+    '''a grid of pointy top hexagons with the given distance from center to corner in the units of the coordinates.
+    HEX_ID is the 'q,r' axial coordinate of the cell and HEX_X and HEX_Y its center for mapping
+    '''
+    fields = ['HEX_ID', 'HEX_X', 'HEX_Y']
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def cells(self, x, y):
+        '''returns the axial q and r of the hexagon containing each point
+        '''
+        q = (sqrt(3) / 3 * x - y / 3) / self.size
+        r = (2 / 3 * y) / self.size
+        s = -q - r
+
+        #: round the cube coordinates and fix the one that moved the most so q + r + s stays 0
+        rounded_q, rounded_r, rounded_s = np.rint(q), np.rint(r), np.rint(s)
+        q_diff, r_diff, s_diff = np.abs(rounded_q - q), np.abs(rounded_r - r), np.abs(rounded_s - s)
+
+        fix_q = (q_diff > r_diff) & (q_diff > s_diff)
+        fix_r = ~fix_q & (r_diff > s_diff)
+        rounded_q = np.where(fix_q, -rounded_r - rounded_s, rounded_q)
+        rounded_r = np.where(fix_r, -rounded_q - rounded_s, rounded_r)
+
+        return rounded_q, rounded_r
+
+    def assign(self, frame, workspace, coordinates):
+        x, y = coordinates()
+        located = ~(np.isnan(x) | np.isnan(y))
+        q, r = self.cells(np.where(located, x, 0), np.where(located, y, 0))
+
+        cells, inverse = np.unique(np.stack([q, r], axis=1)[located].astype('i8'), axis=0, return_inverse=True)
+        codes = np.full(len(x), -1, dtype='i4')
+        codes[located] = inverse.reshape(-1)
+
+        categories = [('{},{}'.format(cell_q, cell_r), self.size * sqrt(3) * (cell_q + cell_r / 2), self.size * 1.5 * cell_r)
+                      for cell_q, cell_r in cells.tolist()]
+
+        return Categorical(codes, categories)
+
+    def label(self, values):
+        return (values[0] or 'NULL', self.name)
+
+
+#: name: geography
+geographies = OrderedDict([
+    ('area', AreaGeography()),
+    ('county', CountyGeography()),
+    ('state', StateGeography()),
+    ('tract', PolygonGeography('Tract', feature_classes['census_tracts'], 'GEOID20')),
+    ('block', PolygonGeography('Block', feature_classes['census_blocks'], 'GEOID20')),
+    ('hex', HexGeography('Hex', 1000)),
+])
+
+
+def select(names=None):
+    '''returns the geographies for a comma separated list of names or the default geographies
+    '''
+    names = [name.strip().lower() for name in names.split(',')] if names else DEFAULT
+
+    for name in names:
+        if name not in geographies:
+            raise Exception('{} is not a geography. Choose from {}'.format(name, ', '.join(geographies)))
+
+    return [geographies[name] for name in names]
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+instrument.py
+
+A module that measures the wall time, CPU time, peak memory and rows read and written of each stage of a command and
+writes a JSON run report. Stages nest, so a command is a stage and the steps it runs are stages inside it.
+
+The module level functions report to the active collector. Until enable is called it is a NullCollector whose stages
+do nothing so the instrumented code costs a function call per stage and per chunk of rows.
+
+A Collector takes the clocks and the memory reader it uses so it can be driven by a fake clock. Listeners such as the
+profilers in profiling.py are told when each stage is entered and exited.
+'''
+
+import json
+import sys
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+from time import process_time
+
+try:
+    import resource
+except ImportError:  #: pragma: no cover
+    resource = None
+
+
+def peak_rss():
+    '''the peak resident set size of this process in bytes or None when it cannot be read
+    '''
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        #: kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    if sys.platform == 'win32':
+        return windows_peak_rss()
+
+    return None
+
+
+def windows_peak_rss():
+    '''the peak working set of this process from GetProcessMemoryInfo
+    '''
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in [
+                'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage'
+            ]
+        ]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+
+    return counters.PeakWorkingSetSize
+
+
+def duration(seconds):
+    '''formats seconds as h:mm:ss
+    '''
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return '{}:{:02}:{:02}'.format(hours, minutes, seconds)
+
+
+class Stage(object):
+    '''the measurements of one run of a stage. a context manager that starts timing when it is entered
+    '''
+    __slots__ = ['collector', 'name', 'path', 'depth', 'started', 'wall', 'cpu', 'peak', 'rows_read', 'rows_written', 'notes']
+
+    def __init__(self, collector, name, path, depth):
+        self.collector = collector
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.started = None
+        self.wall = None
+        self.cpu = None
+        self.peak = None
+        self.rows_read = 0
+        self.rows_written = 0
+        self.notes = {}
+
+    def __enter__(self):
+        self.collector.stack.append(self)
+        for listener in self.collector.listeners:
+            listener.enter(self)
+
+        self.started = (self.collector.clock(), self.collector.cpu_clock())
+
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        wall, cpu = self.started
+        self.wall = self.collector.clock() - wall
+        self.cpu = self.collector.cpu_clock() - cpu
+        self.peak = self.collector.memory()
+
+        for listener in reversed(self.collector.listeners):
+            listener.exit(self)
+        self.collector.stack.pop()
+
+        if error_type is not None:
+            self.notes['failed'] = error_type.__name__
+
+        return False
+
+    def note(self, key, value):
+        '''records an extra value for the stage such as it being skipped
+        '''
+        self.notes[key] = value
+
+    def report(self):
+        def rate(rows):
+            return round(rows / self.wall, 1) if rows and self.wall else None
+
+        report = {
+            'name': self.name,
+            'path': self.path,
+            'depth': self.depth,
+            'wall_seconds': round(self.wall, 4),
+            'cpu_seconds': round(self.cpu, 4),
+            'peak_rss_mb': None if self.peak is None else round(self.peak / 1048576, 1),
+            'rows_read': self.rows_read,
+            'rows_written': self.rows_written,
+            'rows_read_per_second': rate(self.rows_read),
+            'rows_written_per_second': rate(self.rows_written),
+        }
+        report.update(self.notes)
+
+        return report
+
+
+class Progress(object):
+    '''prints how far a long loop has come with its rate and, when the total is known, the time left. it prints at most
+    once every interval seconds however often update is called
+    '''
+    __slots__ = ['label', 'total', 'clock', 'interval', 'started', 'printed']
+
+    def __init__(self, label, total, clock, interval):
+        self.label = label
+        self.total = total
+        self.clock = clock
+        self.interval = interval
+        self.started = clock()
+        self.printed = self.started
+
+    def update(self, done):
+        now = self.clock()
+        if now - self.printed < self.interval:
+            return
+
+        self.printed = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed else 0
+        message = '{}: {:,} rows, {:,.0f} rows per second'.format(self.label, done, rate)
+
+        if self.total and rate:
+            message = '{}: {:,} of {:,} rows ({:.0%}), {:,.0f} rows per second, {} left'.format(
+                self.label, done, self.total, done / self.total, rate, duration((self.total - done) / rate))
+
+        print(message)
+
+
+class NullStage(object):
+    '''the stage of a disabled collector
+    '''
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+    def note(self, key, value):
+        pass
+
+
+class NullProgress(object):
+    __slots__ = []
+
+    def update(self, done):
+        pass
+
+
+NULL_STAGE = NullStage()
+NULL_PROGRESS = NullProgress()
+
+
+class NullCollector(object):
+    '''a collector that measures nothing
+    '''
+    enabled = False
+
+    def stage(self, name):
+        return NULL_STAGE
+
+    def rows(self, read=0, written=0):
+        pass
+
+    def progress(self, label, total=None):
+        return NULL_PROGRESS
+
+
+class Collector(object):
+    '''collects the stages of a run. clock and cpu_clock return seconds and memory returns the peak RSS in bytes or
+    None. progress turns on the live progress lines, printed at most every interval seconds
+    '''
+    enabled = True
+
+    def __init__(self, clock=perf_counter, cpu_clock=process_time, memory=peak_rss, progress=False, interval=10):
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.memory = memory
+        self.show_progress = progress
+        self.interval = interval
+        self.stack = []
+        self.stages = []
+        self.listeners = []
+        self.started = datetime.now()
+
+    def stage(self, name):
+        '''returns the context manager measuring a stage inside the current one
+        '''
+        path = '/'.join([stage.name for stage in self.stack] + [name])
+        stage = Stage(self, name, path, len(self.stack))
+        self.stages.append(stage)
+
+        return stage
+
+    def rows(self, read=0, written=0):
+        '''adds rows read and written to the current stage and the stages around it
+        '''
+        for stage in self.stack:
+            stage.rows_read += read
+            stage.rows_written += written
+
+    def progress(self, label, total=None):
+        if not self.show_progress:
+            return NULL_PROGRESS
+
+        return Progress(label, total, self.clock, self.interval)
+
+    def report(self, **extra):
+        '''the run report of every stage that finished in the order they started
+        '''
+        finished = [stage for stage in self.stages if stage.wall is not None]
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(sum(stage.wall for stage in finished if stage.depth == 0), 4),
+            'cpu_seconds': round(sum(stage.cpu for stage in finished if stage.depth == 0), 4),
+            'stages': [stage.report() for stage in finished],
+        }
+        report.update(extra)
+
+        return report
+
+    def write(self, path, **extra):
+        with open(path, 'w') as output:
+            json.dump(self.report(**extra), output, indent=2)
+
+
+#: the active collector
+collector = NullCollector()
+
+
+def enable(**kwargs):
+    '''makes a Collector with the arguments the active collector and returns it
+    '''
+    global collector
+    collector = Collector(**kwargs)
+
+    return collector
+
+
+def stage(name):
+    '''measures a stage with the active collector. use it as a context manager
+    '''
+    return collector.stage(name)
+
+
+def rows(read=0, written=0):
+    '''counts rows read and written by the current stage
+    '''
+    collector.rows(read, written)
+
+
+def progress(label, total=None):
+    '''returns a progress reporter for a loop over total rows, which does nothing unless progress is turned on
+    '''
+    return collector.progress(label, total)
+
+
+def measured(function):
+    '''measures every call of a function or method as a stage named after it
+    '''
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with collector.stage(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+join.py
+
+A module that contains a compact index for joining an attribute table onto a target table by an integer key
+'''
+
+from array import array
+
+import numpy as np
+
+#: the analysis area fields of Address_Service_Final, which are null for an address point outside every area
+AREA_FIELDS = ['NAME', 'AREA_TYPE', 'COUNTYNBR']
+
+
+class JoinIndex(object):
+    '''maps integer keys to a tuple of attribute values.
+
+    keys are held in one sorted int64 array and found with numpy searchsorted. every attribute column is
+    dictionary encoded so a value repeated on many rows, like a county number or area type, is stored once and each row
+    only costs a 4 byte code per column. about 8 + 4 * columns bytes per key compared to a few hundred for a dict of lists.
+    '''
+    __slots__ = ['keys', 'codes', 'categories']
+
+    def __init__(self, keys, codes, categories):
+        self.keys = keys
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_rows(cls, rows):
+        '''builds the index from (key, value, value, ...) rows such as an arcpy SearchCursor.
+        when a key is repeated the last row wins like assigning into a dict
+        '''
+        keys = array('q')
+        codes = None
+        lookups = None
+
+        for row in rows:
+            if codes is None:
+                codes = [array('l') for _ in row[1:]]
+                lookups = [{} for _ in row[1:]]
+
+            keys.append(row[0])
+            for column, lookup, value in zip(codes, lookups, row[1:]):
+                column.append(lookup.setdefault(value, len(lookup)))
+
+        if codes is None:
+            return cls(array('q'), [], [])
+
+        key_array = np.asarray(keys, dtype='i8')
+        order = np.argsort(key_array, kind='stable')
+        sorted_keys = key_array[order]
+        #: keep the last of each run of equal keys
+        last = np.r_[sorted_keys[1:] != sorted_keys[:-1], True] if len(sorted_keys) else np.empty(0, dtype=bool)
+        order = order[last]
+
+        return cls(
+            array('q', sorted_keys[last].tobytes()),
+            [np.asarray(column, dtype='i4')[order] for column in codes],
+            [list(lookup) for lookup in lookups],
+        )
+
+    def positions(self, keys):
+        '''returns the position of each key in an array of keys with -1 where a key is not in the index
+        '''
+        keys = np.asarray(keys, dtype='i8')
+        index = np.asarray(self.keys, dtype='i8')
+        if not len(index):
+            return np.full(len(keys), -1, dtype='i8')
+
+        positions = np.minimum(np.searchsorted(index, keys), len(index) - 1)
+
+        return np.where(index[positions] == keys, positions, -1)
+
+    def column(self, i, positions):
+        '''decodes attribute column i for an array of positions from positions(). missing positions decode to None
+        '''
+        categories = np.array(self.categories[i] + [None], dtype=object)
+        codes = np.where(positions >= 0, self.codes[i][np.maximum(positions, 0)] if len(self) else -1, -1)
+
+        return categories[codes]
+
+    @property
+    def nbytes(self):
+        return self.keys.itemsize * len(self.keys) + sum(codes.nbytes for codes in self.codes)
+
+
+def area_columns(index, fids):
+    '''returns the (name, values) NAME, AREA_TYPE and COUNTYNBR columns for an array of address point FIDs from an index
+    of (CountyNbr, Area_Type, NAME) assignment rows. an address point without an assignment is None in all three
+    '''
+    positions = index.positions(fids)
+
+    return list(zip(AREA_FIELDS, [index.column(2, positions), index.column(1, positions), index.column(0, positions)]))
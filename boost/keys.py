@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+keys.py
+
+A module that assigns dense integer ids to broadband service composite keys
+'''
+
+import numpy as np
+
+
+class KeyRegistry(object):
+    '''assigns an integer id to each unique (provider, technology, max download, max upload) key.
+
+    ids start at 1 so 0 and None can mean an address point with no service. speeds are kept as the floats they were
+    read as, so a key round trips exactly (0.768 stays 0.768) and 25 and 25.0 are the same key.
+    '''
+    __slots__ = ['ids', 'keys']
+
+    def __init__(self):
+        self.ids = {}
+        #: keys[0] is a placeholder so an id indexes its key directly
+        self.keys = [None]
+
+    def __len__(self):
+        return len(self.keys) - 1
+
+    def __getitem__(self, key_id):
+        return self.keys[key_id]
+
+    @staticmethod
+    def normalize(provider, tech, down, up):
+        return provider, tech, None if down is None else float(down), None if up is None else float(up)
+
+    @classmethod
+    def from_rows(cls, rows):
+        '''rebuilds a registry from (id, provider, tech, down, up) rows such as the Service_Keys lookup table
+        '''
+        registry = cls()
+        for key_id, provider, tech, down, up in sorted(rows, key=lambda row: row[0]):
+            key = cls.normalize(provider, tech, down, up)
+            while len(registry.keys) < key_id:
+                registry.keys.append(None)
+
+            registry.keys.append(key)
+            registry.ids[key] = key_id
+
+        return registry
+
+    def register(self, provider, tech, down, up):
+        '''returns the id of the key, assigning the next id when it has not been seen
+        '''
+        key = self.normalize(provider, tech, down, up)
+        key_id = self.ids.get(key)
+
+        if key_id is None:
+            key_id = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+
+        return key_id
+
+    def columns(self, key_ids):
+        '''returns the (name, values) Provider, TechType, MaxDown and MaxUp columns for an array of key ids. an id with no
+        key is no service so it gets an empty provider and technology and speeds of 0
+        '''
+        lookup = [('', '', 0.0, 0.0) if key is None else (key[0], str(key[1]), key[2] or 0.0, key[3] or 0.0) for key in self.keys]
+        key_ids = np.asarray(key_ids, dtype='i8')
+        key_ids = np.where((key_ids > 0) & (key_ids < len(self.keys)), key_ids, 0)
+
+        return [(name, np.array(values)[key_ids])
+                for name, values in zip(['Provider', 'TechType', 'MaxDown', 'MaxUp'], zip(*lookup))]
+
+    def rows(self):
+        '''yields (id, provider, tech, down, up) rows for the lookup table
+        '''
+        for key_id, key in enumerate(self.keys):
+            if key is not None:
+                yield (key_id, ) + key
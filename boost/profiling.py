@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+profiling.py
+
+A module that contains the profilers behind --profile. They listen to the stages of the instrument collector so the
+time is split by step.
+
+cprofile runs a cProfile profiler per stage. Only one is enabled at a time so the time of a nested stage is in its own
+file, not its parent's. Each stage gets a .prof file for snakeviz or pstats and a .txt of its slowest functions.
+
+sample runs a thread that records the stack of the main thread every few milliseconds and writes stacks.collapsed for
+flamegraph.pl or speedscope. The stage path is the root of every stack so each step is its own tower.
+'''
+
+import cProfile
+import pstats
+import re
+import sys
+import threading
+from collections import Counter
+from os import makedirs
+from os.path import basename
+from os.path import join
+
+
+def file_name(path):
+    '''a file name for a stage path
+    '''
+    return re.sub(r'[^\w.-]+', '.', path)
+
+
+class StageProfiler(object):
+    '''a cProfile profiler for each stage
+    '''
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.profiles = {}
+        self.active = []
+
+    def enter(self, stage):
+        if self.active:
+            self.active[-1].disable()
+
+        profile = self.profiles.setdefault(stage.path, cProfile.Profile())
+        self.active.append(profile)
+        profile.enable()
+
+    def exit(self, stage):
+        self.active.pop().disable()
+
+        if self.active:
+            self.active[-1].enable()
+
+    def close(self):
+        makedirs(self.folder, exist_ok=True)
+
+        for path, profile in self.profiles.items():
+            name = join(self.folder, file_name(path))
+            profile.dump_stats('{}.prof'.format(name))
+
+            with open('{}.txt'.format(name), 'w') as summary:
+                stats = pstats.Stats(profile, stream=summary)
+                stats.sort_stats('cumulative').print_stats(30)
+                stats.sort_stats('tottime').print_stats(30)
+
+        return self.folder
+
+
+class StackSampler(object):
+    '''samples the stack of the thread that started it every interval seconds in a daemon thread
+    '''
+
+    def __init__(self, folder, collector, interval=0.005):
+        self.folder = folder
+        self.collector = collector
+        self.interval = interval
+        self.counts = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='boost-sampler', daemon=True)
+        self.thread.start()
+
+    def enter(self, stage):
+        pass
+
+    def exit(self, stage):
+        pass
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)  #: pylint: disable=protected-access
+        if frame is None:
+            return
+
+        frames = []
+        while frame is not None:
+            frames.append('{}:{}'.format(basename(frame.f_code.co_filename), frame.f_code.co_name))
+            frame = frame.f_back
+
+        #: the main thread changes the stage stack while this runs so it is copied before it is read
+        stages = list(self.collector.stack)
+        root = stages[-1].path.split('/') if stages else ['boost']
+        #: a step named after its command, like the stats step of stats, would otherwise be rooted at stats;stats
+        root = [name for i, name in enumerate(root) if i == 0 or name != root[i - 1]]
+
+        self.counts[';'.join(root + frames[::-1])] += 1
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        makedirs(self.folder, exist_ok=True)
+
+        path = join(self.folder, 'stacks.collapsed')
+        with open(path, 'w') as collapsed:
+            for stack, count in sorted(self.counts.items()):
+                collapsed.write('{} {}\n'.format(stack.replace(' ', '_'), count))
+
+        return path
+
+
+#: mode: profiler
+modes = {
+    'cprofile': lambda folder, collector: StageProfiler(folder),
+    'sample': StackSampler,
+}
+
+
+def create(mode, folder, collector):
+    '''returns the profiler for the mode listening to the collector's stages
+    '''
+    if mode not in modes:
+        raise Exception('{} is not a profile mode. Choose from {}'.format(mode, ', '.join(modes)))
+
+    profiler = modes[mode](folder, collector)
+    collector.listeners.append(profiler)
+
+    return profiler
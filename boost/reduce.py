@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+reduce.py
+
+A module that reduces Address_Service_Final rows to one maximum speed record per address point in a single streaming pass
+'''
+
+from array import array
+from math import nan
+
+from boost.categorical import Categorical
+from boost.categorical import Encoder
+
+
+class MaxSpeedReducer(object):
+    '''a streaming group by on the address point FID that keeps the running max download and upload speed and the first
+    seen area attributes.
+
+    each address point is one slot across parallel typed arrays, so the state is a few dozen bytes per address point no
+    matter how many service rows it has. the area attributes are dictionary encoded as they stream in. null speeds are
+    ignored like the MAX statistic ignores them.
+    '''
+    __slots__ = ['slots', 'fid', 'frequency', 'max_down', 'max_up', 'name', 'area_type', 'county', 'encoders']
+
+    def __init__(self):
+        self.slots = {}
+        self.fid = array('q')
+        self.frequency = array('l')
+        self.max_down = array('d')
+        self.max_up = array('d')
+        self.name = array('l')
+        self.area_type = array('l')
+        self.county = array('l')
+        self.encoders = (Encoder(), Encoder(), Encoder())
+
+    def __len__(self):
+        return len(self.fid)
+
+    def update(self, rows):
+        '''consumes (fid, down, up, name, area type, county) rows from any iterable such as an arcpy SearchCursor
+        '''
+        slots = self.slots
+        fids = self.fid
+        frequency = self.frequency
+        max_down = self.max_down
+        max_up = self.max_up
+        name_encoder, area_type_encoder, county_encoder = self.encoders
+
+        for fid, down, up, name, area_type, county in rows:
+            slot = slots.get(fid)
+
+            if slot is None:
+                slots[fid] = len(fids)
+                fids.append(fid)
+                frequency.append(1)
+                max_down.append(nan if down is None else down)
+                max_up.append(nan if up is None else up)
+                self.name.append(name_encoder.encode(name))
+                self.area_type.append(area_type_encoder.encode(area_type))
+                self.county.append(county_encoder.encode(county))
+                continue
+
+            frequency[slot] += 1
+            #: `not down <= current` is also true when current is NaN so the first real speed replaces a null
+            if down is not None and not down <= max_down[slot]:
+                max_down[slot] = down
+            if up is not None and not up <= max_up[slot]:
+                max_up[slot] = up
+
+        return self
+
+    def categorical(self, column):
+        '''returns the name, area_type or county column as a Categorical
+        '''
+        encoder = self.encoders[['name', 'area_type', 'county'].index(column)]
+
+        return Categorical(getattr(self, column), encoder.categories)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+report.py
+
+A module that holds speed tier frequencies as an areas by tiers count matrix and writes the postprocess CSVs from it
+with vectorized percentages in buffered chunks. A matrix of small areas is rolled up into the matrix of the larger areas
+containing them by summing rows. The share of address points at or above both the download and upload speed of each
+pair of tiers, such as 25/3 Mbps, is written from a download by upload count matrix.
+'''
+
+import csv
+from array import array
+
+import numpy as np
+
+from boost import instrument
+from boost.tiers import MISSING
+
+#: the header of every postprocess CSV
+HEADER = ['AreaName', 'AreaType', 'NTIA Speed Code', 'NTIA Speed Range', 'Percentage', 'Count', 'Address Count']
+#: the header of the at or above tier CSVs
+CUMULATIVE_HEADER = ['AreaName', 'AreaType', 'NTIA Speed Code', 'NTIA Speed Range', 'Percentage At Or Above',
+                     'Count At Or Above', 'Address Count']
+#: the header of the download by upload at or above CSV
+JOINT_HEADER = ['AreaName', 'AreaType', 'Download Speed Range', 'Upload Speed Range', 'Percentage At Or Above',
+                'Count At Or Above', 'Address Count']
+
+
+class TierMatrix(object):
+    '''the number of address points in each speed tier of each area.
+
+    rows are areas in the order they were first added, columns are the tiers of a speed type in order. the matrix grows
+    with the number of areas, each costing its label and one row of int64 counts, so 100,000 census blocks take about
+    20 MB. the position of each area is only kept while the matrix is built. the address points in the MISSING tier,
+    which have no speed, are not in any column and are counted in missing instead.
+    '''
+    __slots__ = ['tiers', 'columns', 'areas', 'counts', 'missing']
+
+    def __init__(self, tiers):
+        self.tiers = np.asarray(list(tiers), dtype='i8')
+        self.columns = {tier: i for i, tier in enumerate(self.tiers.tolist())}
+        self.areas = []
+        self.counts = np.zeros((0, len(self.tiers)), dtype='i8')
+        self.missing = 0
+
+    def __len__(self):
+        return len(self.areas)
+
+    @classmethod
+    def from_rows(cls, rows, tiers):
+        '''builds the matrix from (area, tier, frequency) rows such as a frequency table. a repeated area and tier keeps
+        the last frequency. an area whose address points all have no speed is kept without any
+        '''
+        matrix = cls(tiers)
+        positions = {}
+        area_index = array('q')
+        tier_index = array('q')
+        frequencies = array('q')
+
+        for area, tier, frequency in rows:
+            position = positions.get(area)
+            if position is None:
+                position = positions[area] = len(matrix.areas)
+                matrix.areas.append(area)
+
+            if tier == MISSING:
+                matrix.missing += frequency
+                continue
+
+            if tier not in matrix.columns:
+                raise Exception('{} is not one of the speed tiers {}'.format(tier, matrix.tiers.tolist()))
+
+            area_index.append(position)
+            tier_index.append(matrix.columns[tier])
+            frequencies.append(frequency)
+
+        matrix.counts = np.zeros((len(matrix.areas), len(matrix.tiers)), dtype='i8')
+        matrix.counts[np.frombuffer(area_index, dtype='i8'), np.frombuffer(tier_index, dtype='i8')] = np.frombuffer(frequencies, dtype='i8')
+
+        return matrix
+
+    def sort(self, key):
+        '''sorts the areas by key(area) in place and returns the matrix
+        '''
+        order = sorted(range(len(self.areas)), key=lambda i: key(self.areas[i]))
+        self.areas = [self.areas[i] for i in order]
+        self.counts = self.counts[np.asarray(order, dtype='i8')]
+
+        return self
+
+    def rollup(self, parent):
+        '''returns the matrix of parent(area) for every area with the counts of the areas in each parent summed. the
+        parents are in the order they are first reached
+        '''
+        matrix = TierMatrix(self.tiers.tolist())
+        matrix.missing = self.missing
+        positions = {}
+        index = array('q')
+
+        for area in self.areas:
+            key = parent(area)
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = len(matrix.areas)
+                matrix.areas.append(key)
+
+            index.append(position)
+
+        matrix.counts = np.zeros((len(matrix.areas), len(self.tiers)), dtype='i8')
+        np.add.at(matrix.counts, np.frombuffer(index, dtype='i8'), self.counts)
+
+        return matrix
+
+    def lines(self, labels, ranges, chunk=1000, cumulative=False):
+        '''yields lists of CSV lines for chunk areas at a time. labels(area) returns the AreaName and AreaType and ranges
+        maps a tier to its speed range. the ordering, percentages and lines are computed a chunk at a time so writing
+        takes a few megabytes on top of the matrix however many areas it has.
+
+        within an area the tiers with address points come first and the empty tiers after them, each in tier order.
+        cumulative writes the address points at or above each tier instead, which stays in tier order
+        '''
+        range_names = np.array([ranges[tier] for tier in self.tiers.tolist()], dtype=object)
+
+        for start in range(0, len(self.areas), chunk):
+            counts = self.counts[start:start + chunk]
+            totals = counts.sum(axis=1)
+            if cumulative:
+                counts = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+
+            order = np.argsort(counts == 0, axis=1, kind='stable')
+            lines = []
+
+            for area, total, tier_row, range_row, percentage_row, count_row in zip(
+                    self.areas[start:start + chunk], totals.astype('f8').tolist(), self.tiers[order].tolist(),
+                    range_names[order].tolist(), np.take_along_axis(percentages(counts, totals), order, axis=1).tolist(),
+                    np.take_along_axis(counts, order, axis=1).tolist()):
+                area_name, area_type = labels(area)
+                if not total:
+                    #: an empty area has a percentage of 0 rather than 0.0
+                    percentage_row = [0] * len(percentage_row)
+
+                for tier, speed_range, percentage, count in zip(tier_row, range_row, percentage_row, count_row):
+                    lines.append([area_name, area_type, tier, speed_range, percentage, count, total])
+
+            yield lines
+
+
+def percentages(counts, totals):
+    '''each count as a fraction of its row total rounded to 3 places. rows without address points are 0
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fractions = np.where(totals[:, None] > 0, counts / totals[:, None], 0)
+
+    scaled = fractions * 1000
+    rounded = np.rint(scaled) / 1000
+
+    #: np.rint works on the scaled value so a fraction within float error of a half, like 341 / 400, can round the other
+    #: way than round(). those few are rounded with round() so the CSVs match it exactly
+    for index in zip(*np.nonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)):
+        rounded[index] = round(fractions[index].item(), 3)
+
+    return rounded
+
+
+def write_csv(path, matrix, labels, ranges, chunk=1000, cumulative=False):
+    '''writes a postprocess CSV for the matrix in buffered chunks
+    '''
+    with open(path, 'w', newline='\n') as file:
+        writer = csv.writer(file)
+        writer.writerow(CUMULATIVE_HEADER if cumulative else HEADER)
+
+        for lines in matrix.lines(labels, ranges, chunk, cumulative):
+            writer.writerows(lines)
+            instrument.rows(written=len(lines))
+
+
+def write_joint_csv(path, rows, label, down_ranges, up_ranges):
+    '''writes the address points at or above both the download and the upload tier of every pair of tiers from
+    (frequency, download tier, upload tier) rows. the 25-49.9 Mbps download and 3-5.9 Mbps upload row is 25/3 Mbps.
+    returns the number of address points left out because they have no download or upload speed
+    '''
+    down_tiers, up_tiers = sorted(down_ranges), sorted(up_ranges)
+    down_columns = {tier: i for i, tier in enumerate(down_tiers)}
+    up_columns = {tier: i for i, tier in enumerate(up_tiers)}
+    counts = np.zeros((len(down_tiers), len(up_tiers)), dtype='i8')
+    missing = 0
+
+    for frequency, down, up in rows:
+        if MISSING in (down, up):
+            missing += frequency
+            continue
+
+        if down not in down_columns or up not in up_columns:
+            raise Exception('{}/{} is not a pair of the speed tiers'.format(down, up))
+
+        counts[down_columns[down], up_columns[up]] += frequency
+
+    total = counts.sum()
+    at_or_above = counts[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+    shares = percentages(at_or_above.reshape(1, -1), np.array([total])).reshape(at_or_above.shape)
+    area_name, area_type = label
+
+    with open(path, 'w', newline='\n') as file:
+        writer = csv.writer(file)
+        writer.writerow(JOINT_HEADER)
+
+        for i, down in enumerate(down_tiers):
+            for j, up in enumerate(up_tiers):
+                #: an empty table has a percentage of 0 rather than 0.0 like the other CSVs
+                share = shares[i, j].item() if total else 0
+                writer.writerow([area_name, area_type, down_ranges[down], up_ranges[up], share, at_or_above[i, j].item(),
+                                 float(total)])
+
+        instrument.rows(written=len(down_tiers) * len(up_tiers))
+
+    return missing
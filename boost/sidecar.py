@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+sidecar.py
+
+A module that keeps the columns of Address_Service_Final the later steps need as .npy files next to the workspace so
+they can be memory mapped instead of read back through a cursor. There is one file per column with a value for every
+row of the table in table order: the address point fid, the KeyId, MaxDown, MaxUp, x, y and an area code.
+
+The manifest records the (NAME, AREA_TYPE, COUNTYNBR) each area code stands for and the fingerprint of the table when
+the columns were written. The columns are only used while the table still has that fingerprint, otherwise the caller
+reads the table. The fingerprint never reads the rows. It holds the change token the workspace gives the tables boost
+writes, kept by triggers in a GeoPackage or SQLite database and written as the alias of a file geodatabase table, so
+writing the table again without changing its row count is a change too. Callers that already fingerprinted the table,
+like a StageRunner, pass that fingerprint to load.
+'''
+
+import json
+from array import array
+from os import makedirs
+from os import remove
+from os.path import exists
+from os.path import join
+
+import numpy as np
+
+from boost.categorical import Encoder
+from boost.stages import digest
+
+#: name: dtype of each column
+COLUMNS = [('fid', 'i4'), ('key', 'i4'), ('down', 'f8'), ('up', 'f8'), ('x', 'f8'), ('y', 'f8'), ('area', 'i4')]
+#: dtype: the typecode a ColumnWriter collects it in
+TYPECODES = {'i4': 'q', 'f8': 'd'}
+#: changes when the files are laid out differently so an older sidecar is not read
+VERSION = 1
+
+
+def folder(workspace, table):
+    '''the folder the columns of a table in a workspace are kept in
+    '''
+    return '{}.{}.columns'.format(str(workspace.path).rstrip('/\\'), table)
+
+
+class Columns(object):
+    '''the columns of a table as read only memory mapped arrays and the area each area code stands for. an area code of
+    -1 is no area
+    '''
+    __slots__ = ['fid', 'key', 'down', 'up', 'x', 'y', 'area', 'areas']
+
+    def __init__(self, columns, areas):
+        for name, _ in COLUMNS:
+            setattr(self, name, columns[name])
+
+        self.areas = areas
+
+    def __len__(self):
+        return len(self.fid)
+
+
+class ColumnWriter(object):
+    '''collects the columns of Address_Service_Final rows as they stream past on their way to the table. rows are laid
+    out like address_service_rows yields them. areas that already have a code, like the areas of saved columns more rows
+    are added to, keep it
+    '''
+
+    def __init__(self, areas=()):
+        self.values = {name: array(TYPECODES[dtype]) for name, dtype in COLUMNS}
+        self.encoder = Encoder()
+
+        for area in areas:
+            self.encoder.encode(tuple(area))
+
+    def append(self, row):
+        fid, key, _, _, down, up, x, y, name, area_type, county = row
+        values = self.values
+
+        values['fid'].append(fid)
+        values['key'].append(key)
+        values['down'].append(np.nan if down is None else down)
+        values['up'].append(np.nan if up is None else up)
+        values['x'].append(x)
+        values['y'].append(y)
+        values['area'].append(self.encoder.encode((name, area_type, county)))
+
+    def write(self, workspace, table):
+        write(workspace, table, self.values, self.encoder.categories)
+
+
+def encode_areas(names, area_types, counties):
+    '''returns the area code of each row and the (name, area type, county) of each code
+    '''
+    encoder = Encoder()
+    codes = np.fromiter((encoder.encode(area) for area in zip(names, area_types, counties)), dtype='i4', count=len(names))
+
+    return codes, encoder.categories
+
+
+def discard(workspace, table):
+    '''removes the manifest so the columns are not used. call it before the table is written so a run that fails part
+    way through never leaves columns that look fresh
+    '''
+    manifest = join(folder(workspace, table), 'manifest.json')
+    if exists(manifest):
+        remove(manifest)
+
+
+def write(workspace, table, columns, areas):
+    '''saves a dict of the COLUMNS of a table as .npy files with a manifest holding the areas and the current fingerprint
+    of the table
+    '''
+    path = folder(workspace, table)
+    makedirs(path, exist_ok=True)
+
+    #: the manifest is written last so columns that were only partly written are never used
+    discard(workspace, table)
+
+    rows = None
+    for name, dtype in COLUMNS:
+        values = np.asarray(columns[name], dtype=dtype)
+        rows = len(values)
+        np.save(join(path, '{}.npy'.format(name)), values)
+
+    with open(join(path, 'manifest.json'), 'w') as output:
+        json.dump({
+            'version': VERSION,
+            'table': table,
+            'rows': rows,
+            'columns': dict(COLUMNS),
+            'areas': areas,
+            'fingerprint': digest(workspace.fingerprint(table)),
+        }, output, indent=2)
+
+    print('Columns of {} saved to {}'.format(table, path))
+
+
+def load(workspace, table, fingerprint=None):
+    '''returns the memory mapped Columns of a table or None when they were not written or the table has changed since.
+    fingerprint is the current fingerprint of the table when the caller has it
+    '''
+    path = folder(workspace, table)
+    manifest = join(path, 'manifest.json')
+    if not exists(manifest):
+        return None
+
+    with open(manifest) as source:
+        manifest = json.load(source)
+
+    if fingerprint is None:
+        fingerprint = workspace.fingerprint(table)
+
+    if manifest.get('version') != VERSION or manifest['fingerprint'] != digest(fingerprint):
+        return None
+
+    columns = {name: np.load(join(path, '{}.npy'.format(name)), mmap_mode='r') for name, _ in COLUMNS}
+    if any(len(values) != manifest['rows'] for values in columns.values()):
+        return None
+
+    return Columns(columns, [tuple(area) for area in manifest['areas']])
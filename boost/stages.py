@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+stages.py
+
+A module that runs the stages of a command in order. With --resume it records a fingerprint of what each stage read and
+wrote and skips the stages whose inputs and config have not changed since they last succeeded with --resume.
+
+The state is kept as json next to the workspace in <workspace>.stages.json with one section per command.
+'''
+
+import json
+from hashlib import sha1
+from os import replace
+from os.path import exists
+from os.path import getmtime
+from os.path import getsize
+from time import time
+
+from boost import instrument
+
+
+def state_path(workspace):
+    '''the json file the stage state of a workspace is kept in
+    '''
+    return '{}.stages.json'.format(str(workspace).rstrip('/\\'))
+
+
+def digest(value):
+    '''a short stable hash of any json serializable value
+    '''
+    return sha1(json.dumps(value, sort_keys=True, default=str).encode('utf8')).hexdigest()[:16]
+
+
+def file_fingerprint(path):
+    '''the fingerprint of a plain file like a csv. None when it does not exist
+    '''
+    if not exists(path):
+        return None
+
+    return {'size': getsize(path), 'modified': getmtime(path)}
+
+
+class StageRunner(object):
+    '''runs stages and records their fingerprints.
+
+    fingerprint is a callable returning a json serializable description of a dataset that changes when its rows do
+    (row count and schema along with a change token, an edit date or modified times) or None when it does not exist.
+    datasets are only fingerprinted when resuming and each one once per run, until a stage that writes it runs. a stage
+    is skipped only when resuming, no earlier stage in this run has executed, the config is the same and every input and
+    output still matches what was recorded when it last succeeded. once one stage runs every later stage runs too since
+    it may depend on what changed.
+    '''
+
+    def __init__(self, path, section, fingerprint, resume=False):
+        self.path = path
+        self.section = section
+        self.fingerprint = fingerprint
+        self.resume = resume
+        self.executed = False
+        self.known = {}
+        self.state = self.load()
+
+    def load(self):
+        if not self.path or not exists(self.path):
+            return {}
+
+        with open(self.path) as state:
+            return json.load(state)
+
+    def save(self):
+        if not self.path:
+            return
+
+        temporary = '{}.tmp'.format(self.path)
+        with open(temporary, 'w') as state:
+            json.dump(self.state, state, indent=2, sort_keys=True, default=str)
+
+        replace(temporary, self.path)
+
+    @property
+    def stages(self):
+        return self.state.setdefault(self.section, {})
+
+    def fingerprints(self, names):
+        '''the fingerprint of each dataset, remembered until forget is called for it
+        '''
+        for name in names:
+            if name not in self.known:
+                self.known[name] = self.fingerprint(name)
+
+        return {name: self.known[name] for name in names}
+
+    def forget(self, names):
+        '''drops the remembered fingerprints of datasets that were written
+        '''
+        for name in names:
+            self.known.pop(name, None)
+
+    def fresh(self, name, upstream, outputs, config):
+        '''true when the recorded run of the stage still describes the datasets. upstream are the fingerprints of the
+        inputs that are not also outputs
+        '''
+        record = self.stages.get(name)
+        if not self.resume or self.executed or record is None or 'inputs' not in record:
+            return False
+
+        if record['config'] != digest(config):
+            return False
+
+        if digest(upstream) != record['inputs']:
+            return False
+
+        current = self.fingerprints(outputs)
+
+        return None not in current.values() and digest(current) == record['outputs']
+
+    def run(self, name, function, inputs=(), outputs=(), config=None):
+        '''runs function as the stage called name unless it can be skipped. returns what function returned, or what it
+        returned last time when the stage is skipped
+        '''
+        outputs = list(outputs)
+        upstream = self.fingerprints([dataset for dataset in inputs if dataset not in outputs]) if self.resume else None
+
+        if self.fresh(name, upstream, outputs, config):
+            print('Skipping {}, its inputs have not changed'.format(name))
+            with instrument.stage(name) as measurement:
+                measurement.note('skipped', True)
+
+            return self.stages[name].get('result')
+
+        #: forget the stage before it runs so a failure part way through is never mistaken for a good run
+        self.executed = True
+        self.stages.pop(name, None)
+        self.save()
+
+        with instrument.stage(name):
+            result = function()
+
+        self.forget(outputs)
+        #: without resume nothing is fingerprinted so the stage is recorded with its result only and is never skipped
+        self.stages[name] = {'config': digest(config), 'result': result, 'finished': time()}
+        if self.resume:
+            self.stages[name].update(inputs=digest(upstream), outputs=digest(self.fingerprints(outputs)))
+        self.save()
+
+        return result
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+tiers.py
+
+A module that classifies broadband speeds into NTIA speed tiers using a sorted breakpoint table
+'''
+
+import numpy as np
+
+#: the lower bound (inclusive) of every tier above unserved, in Mbps
+BREAKPOINTS = (0.768, 1.5, 3, 6, 10, 25, 50, 100, 1000)
+#: the tier code for each interval between breakpoints, len(BREAKPOINTS) + 1 items
+#: [-inf, 0.768) = 0, [0.768, 1.5) = 3, ... [1000, inf) = 11
+TIERS = (0, 3, 4, 5, 6, 7, 8, 9, 10, 11)
+#: the tier assigned to null or NaN speeds
+MISSING = -1
+#: the table of the statewide address points in each pair of download and upload tiers
+JOINT_TABLE = 'MaxDownUp_State'
+
+
+def classify_speeds(down, up):
+    '''classify the download and upload speed columns together in one batched pass.
+    returns a tuple of (down_tiers, up_tiers)
+    '''
+    down = np.asarray(down, dtype='f8')
+    up = np.asarray(up, dtype='f8')
+    tiers = classify_numpy(np.concatenate((down, up)))
+
+    return tiers[:len(down)], tiers[len(down):]
+
+
+def classify_numpy(values):
+    '''classify an array of speeds with a single searchsorted call. returns an int16 array
+    '''
+    values = np.asarray(values, dtype='f8')
+    lookup = np.array(TIERS + (MISSING, ), dtype='i2')
+
+    index = np.searchsorted(np.array(BREAKPOINTS, dtype='f8'), values, side='right')
+    #: NaN sorts after every breakpoint so it is pointed at the trailing MISSING code instead
+    index[np.isnan(values)] = len(TIERS)
+
+    return lookup[index]
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+__init__.py
+
+A module that opens the workspace the stats and postprocess commands read from and write to
+'''
+
+from importlib import import_module
+from os.path import splitext
+
+#: file extension: (module, class). anything else is treated as a file geodatabase
+workspaces = {
+    '.gpkg': ('boost.workspaces.sqlite', 'SqliteWorkspace'),
+    '.sqlite': ('boost.workspaces.sqlite', 'SqliteWorkspace'),
+    '.db': ('boost.workspaces.sqlite', 'SqliteWorkspace'),
+}
+
+
+def create(path):
+    '''opens a GeoPackage or SQLite database with sqlite3 and anything else with arcpy. modules are imported on demand so
+    arcpy is only loaded for a file geodatabase
+    '''
+    module, workspace = workspaces.get(splitext(str(path).rstrip('/\\'))[1].lower(), ('boost.workspaces.esri', 'GeodatabaseWorkspace'))
+
+    return getattr(import_module(module), workspace)(path)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+base.py
+
+A module that contains the abstract workspace
+'''
+
+
+class Workspace(object):
+    '''An abstract workspace holding the tables the commands read and write.
+
+    Field types are given with the arcpy names TEXT, DOUBLE, LONG and SHORT. Tables, and columns of existing tables, are
+    written at once from numpy structured arrays like boost.frame.to_structured builds.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        self.close()
+
+        return False
+
+    def close(self):
+        '''releases what the workspace holds open. a workspace used in a with block is closed when the block ends
+        '''
+
+    def exists(self, table=None):
+        '''true when the workspace, or a table in it, exists
+        '''
+        raise NotImplementedError('You must implement the exists() method in the inheriting class.')
+
+    def list(self):
+        '''returns the names of the tables and feature classes
+        '''
+        raise NotImplementedError('You must implement the list() method in the inheriting class.')
+
+    def read(self, table, fields):
+        '''yields a tuple of the values of the fields for each row
+        '''
+        raise NotImplementedError('You must implement the read() method in the inheriting class.')
+
+    def write_table(self, name, array):
+        '''replaces the table with the rows of a numpy structured array
+        '''
+        raise NotImplementedError('You must implement the write_table() method in the inheriting class.')
+
+    def write_columns(self, table, key, array, nulls=()):
+        '''writes the columns of a numpy structured array to the rows of a table whose key field matches the array's key
+        column. columns the table does not have are added and the ones it has are replaced. the empty strings of the text
+        columns named in nulls are written as NULL since to_structured turns None into an empty string
+        '''
+        raise NotImplementedError('You must implement the write_columns() method in the inheriting class.')
+
+    def add_fields(self, table, fields):
+        '''adds (name, type) fields to a table
+        '''
+        raise NotImplementedError('You must implement the add_fields() method in the inheriting class.')
+
+    def fingerprint(self, table):
+        '''returns a json serializable description of a table that changes when its contents change or None when it does
+        not exist
+        '''
+        raise NotImplementedError('You must implement the fingerprint() method in the inheriting class.')
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+esri.py
+
+A module that contains the file geodatabase workspace. It reads with arcpy.da cursors, writes whole tables with
+NumPyArrayToTable and whole columns with ExtendTable. A file geodatabase keeps no modified time for a dataset so every
+table the workspace writes gets a new change token as its alias
+'''
+
+from os.path import basename
+from os.path import join
+from uuid import uuid4
+
+import arcpy
+
+from .base import Workspace
+from boost import instrument
+
+
+def last_edit(dataset, field):
+    '''the latest editor tracking date of a dataset
+    '''
+    with arcpy.da.SearchCursor(dataset, [field], sql_clause=(None, 'ORDER BY {} DESC'.format(field))) as cursor:
+        row = next(iter(cursor), None)
+
+    return None if row is None else str(row[0])
+
+
+def stamp(dataset):
+    '''gives a table or feature class boost wrote a new change token as its alias. the fingerprint reads it back so
+    a table that was written again is a change even when its row count, schema and extent are the same
+    '''
+    arcpy.AlterAliasName(dataset, '{} {}'.format(basename(dataset), uuid4().hex[:16]))
+
+
+def fingerprint(dataset):
+    '''describes a table or feature class by its row count, schema, extent and alias, which holds the change token of
+    the datasets boost writes, along with the last edit date when editor tracking is on. the rows are not read so an
+    edit to an input without editor tracking that keeps its row count and extent is not seen
+    '''
+    if not arcpy.Exists(dataset):
+        return None
+
+    describe = arcpy.Describe(dataset)
+    extent = getattr(describe, 'extent', None)
+    fingerprint = {
+        'count': int(arcpy.GetCount_management(dataset).getOutput(0)),
+        'fields': [(field.name, field.type, field.length) for field in arcpy.ListFields(dataset)],
+        'extent': None if extent is None else [extent.XMin, extent.YMin, extent.XMax, extent.YMax],
+        'alias': getattr(describe, 'aliasName', None),
+    }
+
+    if getattr(describe, 'editorTrackingEnabled', False) and describe.editedAtFieldName:
+        fingerprint['edited'] = last_edit(dataset, describe.editedAtFieldName)
+
+    return fingerprint
+
+
+class GeodatabaseWorkspace(Workspace):
+    '''a file geodatabase
+    '''
+
+    def __init__(self, path):
+        super().__init__(path)
+
+        arcpy.env.workspace = path
+        arcpy.env.overwriteOutput = True
+
+    def exists(self, table=None):
+        return arcpy.Exists(self.path if table is None else join(self.path, table))
+
+    def list(self):
+        arcpy.env.workspace = self.path
+
+        return (arcpy.ListTables() or []) + (arcpy.ListFeatureClasses() or [])
+
+    def read(self, table, fields):
+        progress = instrument.progress('Reading {}'.format(table))
+        read = 0
+
+        with arcpy.da.SearchCursor(join(self.path, table), fields) as cursor:
+            for read, row in enumerate(cursor, 1):
+                if read % 10000 == 0:
+                    instrument.rows(read=10000)
+                    progress.update(read)
+
+                yield row
+
+        instrument.rows(read=read % 10000)
+
+    def write_table(self, name, array):
+        path = join(self.path, name)
+        if arcpy.Exists(path):
+            arcpy.Delete_management(path)
+
+        arcpy.da.NumPyArrayToTable(array, path)
+        stamp(path)
+        instrument.rows(written=len(array))
+
+    def write_columns(self, table, key, array, nulls=()):
+        path = join(self.path, table)
+
+        #: ExtendTable renames a column that is already in the table so those are deleted first
+        existing = [field.name.upper() for field in arcpy.ListFields(path)]
+        replaced = [name for name in array.dtype.names if name != key and name.upper() in existing]
+        if replaced:
+            arcpy.DeleteField_management(path, replaced)
+
+        arcpy.da.ExtendTable(path, key, array, key, append_only=False)
+
+        #: a numpy array cannot hold a null string so only the rows with an empty one are updated afterwards
+        nulls = [name for name in nulls if name in array.dtype.names]
+        if nulls:
+            where = ' OR '.join("{} = ''".format(name) for name in nulls)
+            with arcpy.da.UpdateCursor(path, nulls, where_clause=where) as cursor:
+                for row in cursor:
+                    cursor.updateRow([None if value == '' else value for value in row])
+
+        stamp(path)
+        instrument.rows(written=len(array))
+
+    def add_fields(self, table, fields):
+        for name, field_type in fields:
+            arcpy.AddField_management(join(self.path, table), name, field_type)
+
+    def fingerprint(self, table):
+        return fingerprint(join(self.path, table))
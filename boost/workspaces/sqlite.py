@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+sqlite.py
+
+A module that contains the GeoPackage and SQLite workspace. It runs anywhere python does. Tables are written with
+batched executemany inserts and columns with batched executemany updates by key, each in one transaction. A database
+other than a GeoPackage is put in WAL mode and the FID_* and COUNTYNBR columns the commands look up by are indexed.
+
+Tables written to a GeoPackage are registered as attribute tables in gpkg_contents so GIS clients list them. The
+geometry of a GeoPackage feature table is read as WKB with the arcpy SHAPE@WKB token.
+
+A table the workspace writes, or that boost writes with GDAL and then tracks, is given a random change token in
+boost_changes along with triggers that give it a new token whenever a row is inserted, updated or deleted by any
+client. The fingerprint includes the token so editing values without changing the row count or schema is seen as a
+change. The workspace drops the triggers while it writes a table itself and gives the table one new token afterwards
+rather than one per row. Input tables are never given triggers, reading a workspace does not change it. They are
+fingerprinted by their row count, columns and, in a GeoPackage, the last change GDAL records in gpkg_contents.
+'''
+
+import sqlite3
+from os.path import exists
+
+from .base import Workspace
+from boost import instrument
+
+#: the bytes of the GeoPackage geometry header envelope for each envelope indicator
+ENVELOPES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+#: arcpy field type: sqlite column type
+TYPES = {'TEXT': 'TEXT', 'DOUBLE': 'REAL', 'FLOAT': 'REAL', 'LONG': 'INTEGER', 'SHORT': 'INTEGER'}
+#: the table holding the change token of each tracked table
+CHANGES = 'boost_changes'
+#: the row changes that give a table a new change token
+EVENTS = ['INSERT', 'UPDATE', 'DELETE']
+
+
+def quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def column_type(dtype):
+    '''the sqlite column type for a numpy dtype
+    '''
+    if dtype.kind in 'iub':
+        return 'INTEGER'
+    if dtype.kind == 'f':
+        return 'REAL'
+
+    return 'TEXT'
+
+
+def literal(value):
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def trigger(table, event):
+    return 'boost_{}_{}'.format(table, event.lower())
+
+
+def to_wkb(blob):
+    '''strips the GeoPackage header from a geometry blob leaving the WKB
+    '''
+    if blob is None:
+        return None
+
+    return bytes(blob[8 + ENVELOPES[(blob[3] >> 1) & 7]:])
+
+
+def indexed(field):
+    '''true for the columns tables are joined and filtered on
+    '''
+    return field.upper().startswith('FID_') or field.upper() == 'COUNTYNBR'
+
+
+class SqliteWorkspace(Workspace):
+    '''a GeoPackage or SQLite database
+    '''
+
+    #: the number of rows handed to each executemany
+    chunk = 50000
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            #: the rows of read are pulled on whatever thread consumes them, such as the pyarrow threads export writes
+            #: batches from. only one thread uses the connection at a time
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            #: GDAL writes a GeoPackage with its own copy of sqlite and two copies in one process corrupt a database in WAL
+            #: mode, so a GeoPackage keeps the rollback journal
+            self._connection.execute('PRAGMA journal_mode={}'.format('DELETE' if self.geopackage else 'WAL'))
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+
+        return self._connection
+
+    @property
+    def geopackage(self):
+        return str(self.path).lower().endswith('.gpkg')
+
+    def close(self):
+        '''closes the connection. a GeoPackage is also written by GDAL, which can bring its own copy of sqlite, so the
+        connection should not be left open while GDAL writes
+        '''
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def exists(self, table=None):
+        if not exists(self.path):
+            return False
+
+        if table is None:
+            return True
+
+        return table in self.list()
+
+    def list(self):
+        rows = self.connection.execute("SELECT name FROM sqlite_master WHERE type in ('table', 'view')")
+
+        return [name for name, in rows if not name.startswith(('sqlite_', 'gpkg_', 'rtree_')) and name != CHANGES]
+
+    def columns(self, table):
+        '''returns the (name, type) of each column
+        '''
+        return [(row[1], row[2]) for row in self.connection.execute('PRAGMA table_info({})'.format(quote(table)))]
+
+    def geometry_column(self, table):
+        '''the geometry column of a GeoPackage feature table
+        '''
+        row = self.connection.execute('SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?', (table, )).fetchone()
+        if row is None:
+            raise Exception('{} does not have a geometry column'.format(table))
+
+        return row[0]
+
+    def read(self, table, fields):
+        if fields == '*':
+            fields = [name for name, _ in self.columns(table)]
+
+        fields = list(fields)
+        shape = fields.index('SHAPE@WKB') if 'SHAPE@WKB' in fields else None
+        if shape is not None:
+            fields[shape] = self.geometry_column(table)
+
+        cursor = self.connection.execute('SELECT {} FROM {}'.format(', '.join(quote(field) for field in fields), quote(table)))
+        progress = instrument.progress('Reading {}'.format(table))
+        read = 0
+
+        while True:
+            rows = cursor.fetchmany(self.chunk)
+            if not rows:
+                return
+
+            read += len(rows)
+            instrument.rows(read=len(rows))
+            progress.update(read)
+
+            for row in rows:
+                if shape is not None:
+                    row = row[:shape] + (to_wkb(row[shape]), ) + row[shape + 1:]
+
+                yield row
+
+    def write_table(self, name, array):
+        fields = list(array.dtype.names)
+        connection = self.connection
+
+        with connection:
+            #: dropping the table drops its triggers so the rows are inserted without giving it a token each
+            connection.execute('DROP TABLE IF EXISTS {}'.format(quote(name)))
+            connection.execute('CREATE TABLE {} (OBJECTID INTEGER PRIMARY KEY AUTOINCREMENT, {})'.format(
+                quote(name), ', '.join('{} {}'.format(quote(field), column_type(array.dtype[field])) for field in fields)))
+
+            insert = 'INSERT INTO {} ({}) VALUES ({})'.format(quote(name), ', '.join(quote(field) for field in fields),
+                                                              ', '.join('?' for _ in fields))
+            for start in range(0, len(array), self.chunk):
+                connection.executemany(insert, array[start:start + self.chunk].tolist())
+
+            for field in fields:
+                if indexed(field):
+                    connection.execute('CREATE INDEX {} ON {} ({})'.format(quote('{}_{}'.format(name, field)), quote(name),
+                                                                          quote(field)))
+
+            self.register(name)
+            self.track(name)
+
+        instrument.rows(written=len(array))
+
+    def write_columns(self, table, key, array, nulls=()):
+        fields = [name for name in array.dtype.names if name != key]
+        existing = [name.upper() for name, _ in self.columns(table)]
+        connection = self.connection
+
+        with connection:
+            self.untrack(table)
+
+            for field in fields:
+                if field.upper() not in existing:
+                    connection.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(quote(table), quote(field),
+                                                                                column_type(array.dtype[field])))
+
+            #: OBJECTID is the rowid, any other key is indexed so each update is a lookup rather than a scan
+            if key.upper() != 'OBJECTID':
+                connection.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({})'.format(quote('{}_{}'.format(table, key)),
+                                                                                     quote(table), quote(key)))
+
+            update = 'UPDATE {} SET {} WHERE {} = ?'.format(quote(table), ', '.join(
+                '{} = {}'.format(quote(field), "NULLIF(?, '')" if field in nulls else '?') for field in fields), quote(key))
+            values = array[fields + [key]]
+            for start in range(0, len(array), self.chunk):
+                connection.executemany(update, values[start:start + self.chunk].tolist())
+
+            for field in fields:
+                if indexed(field) and field.upper() not in existing:
+                    connection.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({})'.format(
+                        quote('{}_{}'.format(table, field)), quote(table), quote(field)))
+
+            self.track(table)
+
+        instrument.rows(written=len(array))
+
+    def delete_rows(self, table, field, values):
+        '''deletes the rows whose field is one of the values and returns how many were deleted
+        '''
+        connection = self.connection
+
+        with connection:
+            self.untrack(table)
+            connection.execute('CREATE TEMP TABLE IF NOT EXISTS boost_delete (value PRIMARY KEY)')
+            connection.execute('DELETE FROM temp.boost_delete')
+            connection.executemany('INSERT OR IGNORE INTO temp.boost_delete VALUES (?)', ((value, ) for value in values))
+            deleted = connection.execute('DELETE FROM {} WHERE {} IN (SELECT value FROM temp.boost_delete)'.format(
+                quote(table), quote(field))).rowcount
+            connection.execute('DELETE FROM temp.boost_delete')
+            self.track(table)
+
+        instrument.rows(written=deleted)
+
+        return deleted
+
+    def register(self, name):
+        '''adds the table to gpkg_contents when the workspace is a GeoPackage
+        '''
+        connection = self.connection
+        if not connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'gpkg_contents'").fetchone():
+            return
+
+        connection.execute("INSERT OR REPLACE INTO gpkg_contents (table_name, data_type, identifier) VALUES (?, 'attributes', ?)",
+                           (name, name))
+
+    def add_fields(self, table, fields):
+        with self.connection as connection:
+            for name, field_type in fields:
+                connection.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(quote(table), quote(name), TYPES[field_type.upper()]))
+
+    def track(self, table):
+        '''gives a table boost wrote a new change token and installs the triggers that give it one whenever a row changes.
+        only call it for the outputs of boost, never for its inputs, and commit the connection afterwards
+        '''
+        connection = self.connection
+        stamp = 'INSERT OR REPLACE INTO {} (table_name, change) VALUES ({}, lower(hex(randomblob(8))))'.format(CHANGES, literal(table))
+
+        connection.execute('CREATE TABLE IF NOT EXISTS {} (table_name TEXT PRIMARY KEY, change TEXT)'.format(CHANGES))
+        for event in EVENTS:
+            connection.execute('CREATE TRIGGER IF NOT EXISTS {} AFTER {} ON {} BEGIN {}; END'.format(
+                quote(trigger(table, event)), event, quote(table), stamp))
+
+        connection.execute(stamp)
+
+    def untrack(self, table):
+        '''drops the triggers of a table the workspace is about to write itself. call track when it is written
+        '''
+        for event in EVENTS:
+            self.connection.execute('DROP TRIGGER IF EXISTS {}'.format(quote(trigger(table, event))))
+
+    def change(self, table):
+        '''the change token of a table boost wrote or None for a table it has not tracked. a table that was replaced
+        since, which drops its triggers, has no token either
+        '''
+        connection = self.connection
+        triggers = connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name IN ({})".format(
+            ', '.join('?' for _ in EVENTS)), [table] + [trigger(table, event) for event in EVENTS]).fetchone()[0]
+        if triggers < len(EVENTS):
+            return None
+
+        row = connection.execute('SELECT change FROM {} WHERE table_name = ?'.format(CHANGES), (table, )).fetchone()
+
+        return row and row[0]
+
+    def fingerprint(self, table):
+        '''the row count, columns and change token of a table along with its last change in gpkg_contents, which GDAL
+        keeps, in a GeoPackage. a table boost did not write has no change token
+        '''
+        if not self.exists(table):
+            return None
+
+        connection = self.connection
+        count, = connection.execute('SELECT count(*) FROM {}'.format(quote(table))).fetchone()
+        fingerprint = {'count': count, 'fields': self.columns(table), 'change': self.change(table)}
+
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'gpkg_contents'").fetchone():
+            row = connection.execute('SELECT last_change FROM gpkg_contents WHERE table_name = ?', (table, )).fetchone()
+            fingerprint['last_change'] = row and row[0]
+
+        return fingerprint
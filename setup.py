@@ -35,8 +35,12 @@ setup(
         'Programming Language :: Python :: 3.4',
     ],
     keywords='cli',
-    packages=find_packages(exclude=['docs', 'tests*']),
-    install_requires=['docopt', 'pylint'],
+    packages=find_packages(exclude=['benchmarks*', 'docs', 'tests*']),
+    install_requires=['docopt', 'numpy', 'pylint'],
+    extras_require={
+        'shapely': ['fiona', 'shapely>=2'],
+        'parquet': ['pyarrow'],
+    },
     entry_points={
         'console_scripts': [
             'boost=boost.__main__:main',
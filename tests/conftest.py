@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+conftest.py
+
+Fixtures that write a small GeoPackage with every layer the analysis reads and run the command line against it. The
+layers are squares so the area and service of each address point are known.
+'''
+
+import sqlite3
+import subprocess
+import sys
+from os.path import dirname
+
+import fiona
+import pytest
+from shapely.geometry import box
+from shapely.geometry import mapping
+
+from boost.config import feature_classes
+
+#: the repository root the commands are run from
+ROOT = dirname(dirname(__file__))
+#: address point fid: (x, y)
+POINTS = {
+    1: (2, 2),
+    2: (12, 12),
+    3: (6, 6),
+    4: (30, 30),
+}
+
+#: two providers covering both counties
+SERVICE = [(box(0, 0, 20, 20), 'UT01', 100.0, 10.0), (box(0, 0, 20, 20), 'UT02', 25.0, 3.0)]
+
+
+def write_layer(path, name, geometry, properties, records):
+    '''writes a layer of (geometry, properties) records to a GeoPackage
+    '''
+    with fiona.open(path, 'w', driver='GPKG', layer=name, crs='EPSG:26912',
+                    schema={'geometry': geometry, 'properties': properties}) as layer:
+        layer.writerecords([{'geometry': mapping(shape), 'properties': values} for shape, values in records])
+
+
+def write_service(path, name, service):
+    '''writes a service layer of (polygon, provider, down, up) records
+    '''
+    write_layer(path, name, 'Polygon', {'UTProvCode': 'str', 'TRANSTECH': 'int', 'MAXADDOWN': 'float', 'MAXADUP': 'float'}, [
+        (polygon, {'UTProvCode': provider, 'TRANSTECH': 50, 'MAXADDOWN': down, 'MAXADUP': up})
+        for polygon, provider, down, up in service
+    ])
+
+
+def edit(path, table, sql):
+    '''runs sql against a table of a GeoPackage outside of GDAL and records the change in gpkg_contents like GDAL does
+    '''
+    connection = sqlite3.connect(path)
+    #: the GDAL rtree triggers name these functions. they are only called when a geometry or fid changes
+    for function in ['ST_IsEmpty', 'ST_MinX', 'ST_MaxX', 'ST_MinY', 'ST_MaxY']:
+        connection.create_function(function, 1, lambda geometry: None)
+
+    with connection:
+        connection.execute(sql)
+        connection.execute("UPDATE gpkg_contents SET last_change = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE table_name = ?",
+                           (table, ))
+    connection.close()
+
+
+@pytest.fixture
+def gpkg(tmp_path):
+    '''a GeoPackage of two counties, a municipality layer without COUNTYNBR, an unincorporated layer with a lower case
+    countynbr field and two providers covering both counties
+    '''
+    path = str(tmp_path / 'boost.gpkg')
+
+    with fiona.open(path, 'w', driver='GPKG', layer=feature_classes['address_points'], crs='EPSG:26912',
+                    schema={'geometry': 'Point', 'properties': {'ADDR': 'str'}}) as layer:
+        layer.writerecords([{
+            'id': fid,
+            'geometry': {'type': 'Point', 'coordinates': coordinates},
+            'properties': {'ADDR': str(fid)},
+        } for fid, coordinates in POINTS.items()])
+
+    write_service(path, feature_classes['bb_service'], SERVICE)
+    write_layer(path, feature_classes['counties'], 'Polygon', {'NAME': 'str', 'COUNTYNBR': 'str'}, [
+        (box(0, 0, 10, 10), {'NAME': 'SALT LAKE', 'COUNTYNBR': '18'}),
+        (box(10, 10, 20, 20), {'NAME': 'UTAH', 'COUNTYNBR': '25'}),
+    ])
+    write_layer(path, feature_classes['municip'], 'Polygon', {'NAME': 'str'}, [
+        (box(1, 1, 4, 4), {'NAME': 'Draper'}),
+    ])
+    write_layer(path, feature_classes['unincorp'], 'Polygon', {'PLACENAME': 'str', 'countynbr': 'str'}, [
+        (box(11, 11, 14, 14), {'PLACENAME': 'Vineyard', 'countynbr': '49'}),
+    ])
+
+    return path
+
+
+@pytest.fixture
+def boost():
+    '''runs the boost command line with the arguments in its own process like it is run from a shell and returns what
+    it printed
+    '''
+    def run(*arguments):
+        process = subprocess.run([sys.executable, '-m', 'boost'] + list(arguments), check=True, cwd=ROOT, stdout=subprocess.PIPE,
+                                 universal_newlines=True)
+        print(process.stdout)
+
+        return process.stdout
+
+    return run
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_aggregate.py
+
+Tests for the single scan group by counts
+'''
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from boost import aggregate
+from boost.aggregate import MultiCount
+from boost.aggregate import sparse_counts
+
+COUNTY = np.array([0, 2, 2, 1, 0, 2, 2])
+TIER = np.array([3, 0, 3, 3, 1, 3, 0])
+NAME_AREA = np.array([1, 3, 3, 2, 0, 4, 3])
+#: the area type of each name area code
+AREA_TYPE = [0, 0, 1, 1, 0]
+
+
+def expected(*columns):
+    return sorted(Counter(zip(*[column.tolist() for column in columns])).items())
+
+
+@pytest.fixture(params=[aggregate.DENSE_LIMIT, 0], ids=['dense', 'unique'])
+def dense_limit(request, monkeypatch):
+    monkeypatch.setattr(aggregate, 'DENSE_LIMIT', request.param)
+
+
+@pytest.mark.usefixtures('dense_limit')
+def test_multi_count_groups_match_counting_each_group_on_its_own():
+    counts = MultiCount().add('county', COUNTY, 3).add('tier', TIER, 4).add('name_area', NAME_AREA, 5)
+    counts.derive('area_type', 'name_area', AREA_TYPE, 2)
+    counts.scan()
+
+    assert counts.group('county') == expected(COUNTY)
+    assert counts.group('tier', 'county') == expected(TIER, COUNTY)
+    assert counts.group('area_type', 'tier') == expected(np.array(AREA_TYPE)[NAME_AREA], TIER)
+    assert counts.group('county', 'tier', 'name_area') == expected(COUNTY, TIER, NAME_AREA)
+    assert counts.scans == 1
+
+
+@pytest.mark.usefixtures('dense_limit')
+def test_sparse_counts_returns_only_the_cells_with_rows():
+    up = np.array([1, 1, 0, 2, 1, 2, 0])
+    results = sparse_counts([(COUNTY, 3), (NAME_AREA, 5)], [TIER, up], 4)
+
+    assert len(results) == 2 and all(len(columns) == 2 for columns in results)
+    for (units, _), columns in zip([(COUNTY, 3), (NAME_AREA, 5)], results):
+        for tiers, (unit_codes, tier_codes, counts) in zip([TIER, up], columns):
+            cells = list(zip(unit_codes.tolist(), tier_codes.tolist(), counts.tolist()))
+
+            #: sorted by tier then unit
+            assert cells == sorted(cells, key=lambda cell: (cell[1], cell[0]))
+            assert sorted(((unit, tier), count) for unit, tier, count in cells) == expected(units, tiers)
+
+
+def test_sparse_counts_of_no_rows_is_empty():
+    results = sparse_counts([(np.empty(0, dtype='i8'), 3)], [np.empty(0, dtype='i8')], 4)
+
+    assert [[codes.tolist() for codes in cells] for cells in results[0]] == [[[], [], []]]
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_categorical.py
+
+Tests for the dictionary encoded column
+'''
+
+from boost.categorical import Categorical
+
+
+def test_from_values_codes_none_as_negative_one():
+    column = Categorical.from_values(['18', None, '49', '18'])
+
+    assert column.codes.tolist() == [0, -1, 1, 0]
+    assert column.categories == ['18', '49']
+    assert column.decode().tolist() == ['18', None, '49', '18']
+    assert column.strings().tolist() == ['18', '', '49', '18']
+    assert column[[3, 1]].decode().tolist() == ['18', None]
+
+
+def test_combine_keeps_the_parts_of_each_pair():
+    names = Categorical.from_values(['Emery', 'Emery', 'Lehi', None, 'Emery'])
+    area_types = Categorical.from_values(['County', 'Municipality', 'Municipality', None, 'County'])
+
+    combined = Categorical.combine(names, area_types)
+    name, area_type = combined.parts
+
+    assert combined.decode().tolist() == ['Emery|County', 'Emery|Municipality', 'Lehi|Municipality', 'None|None', 'Emery|County']
+    assert len(combined.categories) == 4
+    assert [name.category(code) for code in name.codes.tolist()] == [None, 'Emery', 'Emery', 'Lehi']
+    assert [area_type.category(code) for code in area_type.codes.tolist()] == [None, 'County', 'Municipality', 'Municipality']
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_export.py
+
+Tests for the export command
+'''
+
+import pyarrow.dataset as ds
+
+from boost import workspaces
+from boost.config import feature_classes
+
+
+def test_export_writes_every_table_of_a_geopackage(gpkg, tmp_path, boost):
+    target = str(tmp_path / 'parquet')
+    boost('analyze', '--workspace', gpkg, '--backend', 'shapely')
+    boost('stats', '--workspace', gpkg)
+    boost('export', '--workspace', gpkg, '--target', target)
+
+    workspace = workspaces.create(gpkg)
+    for table in [feature_classes['address_service_final'], feature_classes['msba']]:
+        dataset = ds.dataset(str(tmp_path / 'parquet' / table), format='parquet', partitioning='hive')
+        rows = list(workspace.read(table, ['*']))
+
+        assert dataset.count_rows() == len(rows) > 0
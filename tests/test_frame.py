@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_frame.py
+
+Tests for the MSBA frame
+'''
+
+import math
+
+from boost.frame import MsbaFrame
+from boost.tiers import MISSING
+
+ROWS = [
+    (2, 25.0, 3.0, 'Emery', 'Municipality', '8'),
+    (1, None, None, None, None, None),
+    (2, 100.0, None, 'Castle Dale', 'Municipality', '8'),
+    (3, 10.0, 1.0, 'Emery', 'County', '8'),
+]
+
+
+def test_from_rows_reduces_each_address_point_to_its_max_speeds_and_first_area():
+    frame = MsbaFrame.from_rows(ROWS)
+
+    assert frame.fid.tolist() == [1, 2, 3]
+    assert frame.frequency.tolist() == [1, 2, 1]
+    assert math.isnan(frame.max_down[0]) and frame.max_down[1:].tolist() == [100.0, 10.0]
+    assert math.isnan(frame.max_up[0]) and frame.max_up[1:].tolist() == [3.0, 1.0]
+    assert frame.name.decode().tolist() == [None, 'Emery', 'Emery']
+    assert frame.area_type.decode().tolist() == [None, 'Municipality', 'County']
+    assert frame.county.decode().tolist() == [None, '8', '8']
+
+
+def test_add_name_area_keeps_areas_with_the_same_name_apart():
+    frame = MsbaFrame.from_rows(ROWS[2:])
+    frame.add_name_area()
+
+    assert frame.name_area.decode().tolist() == ['Castle Dale|Municipality', 'Emery|County']
+    assert len(frame.name_area.categories) == 2
+
+
+def test_counts_groups_every_column_in_one_scan():
+    frame = MsbaFrame.from_rows(ROWS)
+    counts = frame.counts([('name', ), ('area_type', 'county'), ('down_tier', )])
+
+    assert counts[('name', )] == [((None, ), 1), (('Emery', ), 2)]
+    assert counts[('area_type', 'county')] == [((None, None), 1), (('County', '8'), 1), (('Municipality', '8'), 1)]
+    assert counts[('down_tier', )][0] == ((MISSING, ), 1)
+    assert sum(count for _, count in counts[('down_tier', )]) == 3
+    assert frame.count('county') == [((None, ), 1), (('8', ), 2)]
+
+
+def test_the_frame_stays_within_its_bytes_per_row():
+    points = 100000
+    frame = MsbaFrame.from_rows((fid, 25.0 * (fid % 5), 3.0, 'Area {}'.format(fid % 300), 'Municipality', str(fid % 29))
+                                for fid in range(1, points + 1))
+    frame.add_name_area()
+    frame.add_tiers()
+
+    assert len(frame) == points
+    assert frame.nbytes / len(frame) <= MsbaFrame.BYTES_PER_ROW
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_geos.py
+
+Tests for the shapely backend
+'''
+
+from shutil import copyfile
+
+import fiona
+import numpy as np
+from shapely.geometry import box
+
+from boost import sidecar
+from boost import workspaces
+from boost.backends.geos import ShapelyBackend
+from boost.config import feature_classes
+from boost.frame import MsbaFrame
+from boost.frame import to_structured
+from boost.join import AREA_FIELDS
+from boost.join import JoinIndex
+from boost.join import area_columns
+from conftest import SERVICE
+from conftest import write_service
+
+OUTPUT = feature_classes['address_service_final']
+ADDRESS_FID = 'FID_{}'.format(feature_classes['address_points'])
+
+
+def areas(path):
+    '''the (NAME, AREA_TYPE, COUNTYNBR) of each address point in an Address_Service_Final
+    '''
+    with fiona.open(path, layer=OUTPUT) as source:
+        return {
+            feature['properties'][ADDRESS_FID]: tuple(feature['properties'][field] for field in ['NAME', 'AREA_TYPE', 'COUNTYNBR'])
+            for feature in source
+        }
+
+
+def test_county_number_comes_from_the_area_layer_like_arcpy(gpkg):
+    #: the arcpy backend appends each area layer with its own COUNTYNBR, which is null for a layer without one
+    ShapelyBackend(gpkg).address_service(OUTPUT)
+
+    assert areas(gpkg) == {
+        1: ('Draper', 'Municipality', None),
+        2: ('Vineyard', 'Unincorporated', '49'),
+        3: ('SALT LAKE', 'Other', '18'),
+        4: (None, None, None),
+    }
+
+
+def test_unassigned_address_points_are_null_in_both_backends(gpkg, tmp_path):
+    #: the arcpy backend joins the assignment table, which has no row for an address point outside every area, and
+    #: writes the columns with write_columns
+    ShapelyBackend(gpkg).address_service(OUTPUT)
+    shapely = areas(gpkg)
+    assignments = [(fid, county, area_type, name) for fid, (name, area_type, county) in shapely.items() if name is not None]
+
+    workspace = workspaces.create(str(tmp_path / 'arcpy.sqlite'))
+    fids = np.array(sorted(shapely))
+    workspace.write_table(OUTPUT, to_structured([(ADDRESS_FID, fids)]))
+    workspace.write_columns(OUTPUT, ADDRESS_FID, to_structured([(ADDRESS_FID, fids)] + area_columns(JoinIndex.from_rows(assignments), fids)),
+                            nulls=AREA_FIELDS)
+
+    assert {row[0]: row[1:] for row in workspace.read(OUTPUT, [ADDRESS_FID] + AREA_FIELDS)} == shapely
+    assert shapely[4] == (None, None, None)
+
+
+def rows(path):
+    '''the Address_Service_Final rows in a stable order with the key of each KeyId checked and left out
+    '''
+    with fiona.open(path, layer=feature_classes['service_keys']) as source:
+        keys = {feature['properties']['KeyId']: tuple(feature['properties'].values())[1:] for feature in source}
+
+    output = []
+    with fiona.open(path, layer=OUTPUT) as source:
+        for feature in source:
+            values = tuple(feature['properties'].values())
+            if values[1]:
+                assert keys[values[1]] == values[2:6]
+
+            output.append(values[:1] + values[2:])
+
+    return sorted(output, key=repr)
+
+
+def test_incremental_replaces_the_rows_of_the_affected_address_points(gpkg, tmp_path):
+    ShapelyBackend(gpkg).address_service(OUTPUT)
+    before = rows(gpkg)
+
+    #: a new provider covers only the first address point
+    write_service(gpkg, 'previous_service', SERVICE)
+    write_service(gpkg, feature_classes['bb_service'], SERVICE + [(box(1, 1, 3, 3), 'UT03', 1000.0, 1000.0)])
+    full = str(tmp_path / 'full.gpkg')
+    copyfile(gpkg, full)
+
+    ShapelyBackend(gpkg).incremental(OUTPUT, 'previous_service')
+    ShapelyBackend(full).address_service(OUTPUT)
+
+    after = rows(gpkg)
+    assert after == rows(full)
+    assert [row for row in after if row not in before] == [(1, 'UT03', '50', 1000.0, 1000.0, 2.0, 2.0, 'Draper', 'Municipality', None)]
+
+    #: the saved columns are updated along with the table
+    workspace = workspaces.create(gpkg)
+    columns = sidecar.load(workspace, OUTPUT)
+    table = MsbaFrame.from_rows(workspace.read(OUTPUT, MsbaFrame.source_fields(feature_classes['address_points'])))
+    saved = MsbaFrame.from_columns(columns.fid, columns.down, columns.up, columns.area, columns.areas)
+    assert saved.max_down.tolist() == table.max_down.tolist() == [1000.0, 100.0, 100.0, 0.0]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_instrument.py
+
+Tests for the stage instrumentation
+'''
+
+from boost import instrument
+
+
+class FakeClock(object):
+    '''a clock that moves forward by step seconds every time it is read
+    '''
+
+    def __init__(self, step):
+        self.now = 0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+
+        return self.now
+
+
+def test_report_measures_each_stage_with_the_clocks():
+    #: a fake clock makes every stage take a known time
+    collector = instrument.Collector(clock=FakeClock(1), cpu_clock=FakeClock(0.5), memory=lambda: 1048576)
+    with collector.stage('stats'):
+        with collector.stage('max_speeds'):
+            collector.rows(read=100)
+        with collector.stage('write_msba') as stage:
+            collector.rows(written=50)
+            stage.note('table', 'MSBA')
+
+    report = collector.report(command='stats')
+    stages = {stage['path']: stage for stage in report['stages']}
+
+    #: the stages are in start order and a stage reads the clock twice
+    assert list(stages) == ['stats', 'stats/max_speeds', 'stats/write_msba']
+    assert stages['stats/max_speeds']['wall_seconds'] == 1
+    assert stages['stats/max_speeds']['cpu_seconds'] == 0.5
+    assert stages['stats/max_speeds']['rows_read_per_second'] == 100
+    assert stages['stats']['wall_seconds'] == 5 and stages['stats']['rows_read'] == 100
+    assert stages['stats']['rows_written'] == 50 and stages['stats/write_msba']['table'] == 'MSBA'
+    assert stages['stats']['peak_rss_mb'] == 1
+    assert report['wall_seconds'] == 5 and report['command'] == 'stats'
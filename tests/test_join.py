@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_join.py
+
+Tests for the join index
+'''
+
+from boost.join import JoinIndex
+from boost.join import area_columns
+
+
+def test_positions_are_negative_for_missing_keys():
+    index = JoinIndex.from_rows([(30, '18', 'Municipality', 'Draper'), (10, '49', 'Other', 'UTAH'), (20, '18', 'Other', 'SALT LAKE')])
+
+    positions = index.positions([20, 5, 30, 25, 40, 10])
+
+    assert positions.tolist() == [1, -1, 2, -1, -1, 0]
+    assert index.column(2, positions).tolist() == ['SALT LAKE', None, 'Draper', None, None, 'UTAH']
+    assert index.column(0, positions).tolist() == ['18', None, '18', None, None, '49']
+
+
+def test_the_last_row_of_a_repeated_key_wins():
+    index = JoinIndex.from_rows([(1, 'first'), (2, 'other'), (1, 'last')])
+
+    assert len(index) == 2
+    assert index.column(0, index.positions([1, 2])).tolist() == ['last', 'other']
+
+
+def test_an_empty_index_finds_nothing():
+    assert JoinIndex.from_rows([]).positions([1, 2]).tolist() == [-1, -1]
+
+
+def test_area_columns_are_none_for_address_points_without_an_assignment():
+    index = JoinIndex.from_rows([(1, '18', 'Municipality', 'Draper'), (3, None, 'Municipality', 'Vineyard')])
+
+    columns = [(name, values.tolist()) for name, values in area_columns(index, [3, 2, 1])]
+
+    assert columns == [
+        ('NAME', ['Vineyard', None, 'Draper']),
+        ('AREA_TYPE', ['Municipality', None, 'Municipality']),
+        ('COUNTYNBR', [None, None, '18']),
+    ]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_keys.py
+
+Tests for the service key registry
+'''
+
+from boost.keys import KeyRegistry
+
+
+def test_rows_round_trip_through_from_rows():
+    keys = KeyRegistry()
+    assert keys.register('UT01', 50, 0.768, 0.2) == 1
+    assert keys.register('UT02', 10, 25, 3) == 2
+    assert keys.register('UT01', 50, 0.768, 0.2) == 1
+
+    rebuilt = KeyRegistry.from_rows(reversed(list(keys.rows())))
+
+    assert list(rebuilt.rows()) == list(keys.rows()) == [(1, 'UT01', 50, 0.768, 0.2), (2, 'UT02', 10, 25.0, 3.0)]
+    #: 25 and 25.0 are the same key so a rebuilt registry gives a known key its id
+    assert rebuilt.register('UT02', 10, 25.0, 3.0) == 2
+    assert rebuilt.register('UT03', 40, 100, 10) == 3
+
+
+def test_from_rows_keeps_the_ids_of_a_lookup_table_with_gaps():
+    keys = KeyRegistry.from_rows([(4, 'UT04', 50, 100.0, 10.0), (2, 'UT02', 10, 25.0, 3.0)])
+
+    assert keys[2] == ('UT02', 10, 25.0, 3.0) and keys[4] == ('UT04', 50, 100.0, 10.0)
+    assert keys[3] is None
+    assert list(keys.rows()) == [(2, 'UT02', 10, 25.0, 3.0), (4, 'UT04', 50, 100.0, 10.0)]
+    assert keys.register('UT05', 40, 1000.0, 1000.0) == 5
+
+
+def test_columns_give_no_service_to_unknown_ids():
+    keys = KeyRegistry()
+    keys.register('UT01', 50, 25.0, None)
+
+    columns = dict((name, values.tolist()) for name, values in keys.columns([1, 0, 7, -1]))
+
+    assert columns == {
+        'Provider': ['UT01', '', '', ''],
+        'TechType': ['50', '', '', ''],
+        'MaxDown': [25.0, 0.0, 0.0, 0.0],
+        'MaxUp': [0.0, 0.0, 0.0, 0.0],
+    }
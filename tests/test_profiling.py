@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_profiling.py
+
+Tests for the profilers behind --profile
+'''
+
+from boost import instrument
+from boost.profiling import StackSampler
+
+
+def test_a_step_named_after_its_command_is_one_root_frame(tmp_path):
+    collector = instrument.Collector()
+    sampler = StackSampler(str(tmp_path), collector, interval=60)
+
+    with collector.stage('stats'), collector.stage('stats'), collector.stage('read'):
+        sampler.sample()
+
+    sampler.close()
+    stack, = sampler.counts
+
+    assert stack.startswith('stats;read;')
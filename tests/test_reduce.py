@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_reduce.py
+
+Tests for the max speed reducer
+'''
+
+import math
+
+from boost.reduce import MaxSpeedReducer
+
+
+def reduce(rows):
+    '''the (fid, frequency, max down, max up, name) of each address point in the order they were first seen
+    '''
+    reducer = MaxSpeedReducer().update(rows)
+    name = reducer.categorical('name')
+
+    return [(reducer.fid[slot], reducer.frequency[slot], reducer.max_down[slot], reducer.max_up[slot],
+             name.category(name.codes[slot])) for slot in range(len(reducer))]
+
+
+def test_ties_keep_the_speed_and_the_area_of_the_first_row():
+    assert reduce([
+        (7, 50.0, 10.0, 'Draper', 'Municipality', '18'),
+        (3, 25.0, 3.0, 'Vineyard', 'Unincorporated', '49'),
+        (7, 50.0, 10.0, 'Lehi', 'Municipality', '25'),
+        (7, 100.0, 10.0, 'Bluffdale', 'Municipality', '18'),
+    ]) == [(7, 3, 100.0, 10.0, 'Draper'), (3, 1, 25.0, 3.0, 'Vineyard')]
+
+
+def test_null_speeds_are_ignored_like_the_max_statistic():
+    fid, frequency, down, up, _ = zip(*reduce([
+        (1, None, None, 'Draper', 'Municipality', '18'),
+        (1, 25.0, None, 'Draper', 'Municipality', '18'),
+        (1, None, 3.0, 'Draper', 'Municipality', '18'),
+        (2, 10.0, 1.0, None, None, None),
+        (2, None, None, None, None, None),
+        (3, None, None, None, None, None),
+    ]))
+
+    assert fid == (1, 2, 3) and frequency == (3, 2, 1)
+    assert down[:2] == (25.0, 10.0) and up[:2] == (3.0, 1.0)
+    #: an address point with only null speeds has no max
+    assert math.isnan(down[2]) and math.isnan(up[2])
+
+
+def test_the_reducer_can_be_updated_with_more_rows():
+    reducer = MaxSpeedReducer().update([(1, 25.0, 3.0, 'Draper', 'Municipality', '18')])
+    reducer.update([(1, 100.0, 10.0, 'Lehi', 'Municipality', '25'), (2, 10.0, 1.0, 'Lehi', 'Municipality', '25')])
+
+    assert len(reducer) == 2
+    assert list(reducer.max_down) == [100.0, 10.0] and list(reducer.frequency) == [2, 1]
+    assert reducer.categorical('county').decode().tolist() == ['18', '25']
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_report.py
+
+Tests for the postprocess CSV writer
+'''
+
+import csv
+
+from boost.config import feature_classes
+from boost.report import TierMatrix
+from boost.report import write_csv
+from boost.report import write_joint_csv
+from boost.tiers import MISSING
+from conftest import edit
+
+RANGES = {1: 'slow', 2: 'fast', 3: 'faster'}
+
+
+def test_the_csv_does_not_depend_on_the_chunk_size(tmp_path):
+    rows = [(('Block {}'.format(area), 'Block'), area % 3 + 1, area + 1) for area in range(25)]
+    matrix = TierMatrix.from_rows(rows, RANGES).sort(lambda area: area[0])
+    outputs = []
+
+    for chunk in [1, 7, 1000]:
+        path = tmp_path / '{}.csv'.format(chunk)
+        write_csv(str(path), matrix, tuple, RANGES, chunk=chunk)
+        outputs.append(path.read_text())
+
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert outputs[0].count('\n') == 1 + 25 * len(RANGES)
+
+
+def test_the_joint_share_counts_the_address_points_at_or_above_both_speeds(tmp_path):
+    #: fast download with slow upload, slow download with fast upload and one address point fast at both
+    rows = [(1, 3, 1), (1, 1, 3), (1, 2, 2), (1, 1, 1)]
+    path = tmp_path / 'joint.csv'
+    write_joint_csv(str(path), rows, ('Utah', 'State'), RANGES, RANGES)
+
+    with open(str(path)) as source:
+        shares = {(row['Download Speed Range'], row['Upload Speed Range']): (row['Count At Or Above'], row['Percentage At Or Above'])
+                  for row in csv.DictReader(source)}
+
+    #: the download and upload at or above CSVs would each have 3 of 4 at or above fast
+    assert shares[('fast', 'fast')] == ('1', '0.25')
+    assert shares[('slow', 'slow')] == ('4', '1.0')
+    assert shares[('faster', 'slow')] == ('1', '0.25')
+
+
+def test_address_points_without_a_speed_are_counted_as_missing(tmp_path):
+    rows = [(('Draper', 'Municipality'), 1, 2), (('Draper', 'Municipality'), MISSING, 1), (('Alta', 'Municipality'), MISSING, 4)]
+    matrix = TierMatrix.from_rows(rows, RANGES)
+
+    assert matrix.missing == 5 and matrix.rollup(lambda area: area[1]).missing == 5
+    assert matrix.areas == [('Draper', 'Municipality'), ('Alta', 'Municipality')]
+    assert matrix.counts.sum(axis=1).tolist() == [2, 0]
+    assert write_joint_csv(str(tmp_path / 'joint.csv'), [(2, 1, 1), (3, MISSING, 1)], ('Utah', 'State'), RANGES, RANGES) == 3
+
+
+def test_postprocess_leaves_out_an_address_point_with_a_null_speed(gpkg, tmp_path, boost):
+    target = tmp_path / 'csv'
+    target.mkdir()
+    output = feature_classes['address_service_final']
+
+    boost('analyze', '--workspace', gpkg, '--backend', 'shapely')
+    edit(gpkg, output, 'UPDATE {} SET MaxDown = NULL WHERE FID_{} = 3'.format(output, feature_classes['address_points']))
+    boost('stats', '--workspace', gpkg)
+    printed = boost('postprocess', '--workspace', gpkg, '--target', str(target))
+
+    assert '1 address points have no MaxDown' in printed
+
+    with open(str(target / 'MaxDown_State.csv')) as source:
+        counts = {row['NTIA Speed Range']: (row['Count'], row['Address Count']) for row in csv.DictReader(source)}
+    assert counts['100-999 Mbps'] == ('2', '3.0')
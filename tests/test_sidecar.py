@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_sidecar.py
+
+Tests for the columns analyze saves next to the workspace
+'''
+
+import numpy as np
+import pytest
+
+from boost import sidecar
+from boost import workspaces
+from boost.frame import to_structured
+
+TABLE = 'Address_Service_Final'
+
+
+@pytest.fixture(params=['boost.sqlite', 'boost.gpkg'])
+def workspace(request, tmp_path):
+    workspace = workspaces.create(str(tmp_path / request.param))
+    workspace.write_table(TABLE, to_structured([('FID_AddressPoints', np.array([1, 2])), ('MaxDown', np.array([25.0, 100.0]))]))
+
+    sidecar.write(workspace, TABLE, {
+        'fid': [1, 2],
+        'key': [1, 2],
+        'down': [25.0, 100.0],
+        'up': [3.0, 10.0],
+        'x': [0.0, 1.0],
+        'y': [0.0, 1.0],
+        'area': [0, 0],
+    }, [[None, None, None]])
+
+    return workspace
+
+
+def test_the_columns_are_loaded_while_the_table_is_unchanged(workspace):
+    workspace.close()
+
+    assert len(sidecar.load(workspaces.create(workspace.path), TABLE)) == 2
+
+
+def test_editing_values_without_changing_the_row_count_rejects_the_columns(workspace):
+    with workspace.connection as connection:
+        connection.execute('UPDATE {} SET MaxDown = 1000 WHERE FID_AddressPoints = 1'.format(TABLE))
+
+    assert sidecar.load(workspace, TABLE) is None
+
+
+def test_the_fingerprint_the_caller_has_is_used_instead_of_describing_the_table_again(workspace):
+    fingerprint = workspace.fingerprint(TABLE)
+
+    assert len(sidecar.load(workspace, TABLE, fingerprint)) == 2
+    assert sidecar.load(workspace, TABLE, dict(fingerprint, change='written since')) is None
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_sqlite.py
+
+Tests for the GeoPackage and SQLite workspace
+'''
+
+import numpy as np
+import pytest
+
+from boost import workspaces
+from boost.frame import to_structured
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    workspace = workspaces.create(str(tmp_path / 'boost.sqlite'))
+    workspace.write_table('speeds', to_structured([('MaxDown', np.array([25.0, 100.0])), ('MaxUp', np.array([3.0, 10.0]))]))
+
+    return workspace
+
+
+def test_fingerprint_is_stable_while_the_table_is_unchanged(workspace):
+    assert workspace.fingerprint('speeds') == workspace.fingerprint('speeds')
+
+
+def test_editing_values_changes_the_fingerprint(workspace):
+    before = workspace.fingerprint('speeds')
+
+    with workspace.connection as connection:
+        connection.execute('UPDATE speeds SET MaxDown = 1000')
+
+    after = workspace.fingerprint('speeds')
+    assert after['count'] == before['count'] and after['fields'] == before['fields']
+    assert after != before
+
+
+def test_writing_columns_changes_the_fingerprint_once(workspace):
+    before = workspace.fingerprint('speeds')
+    workspace.write_columns('speeds', 'OBJECTID', to_structured([('OBJECTID', np.array([1, 2])), ('MaxUp', np.array([5.0, 5.0]))]))
+
+    assert workspace.fingerprint('speeds') != before
+    assert workspace.fingerprint('speeds') == workspace.fingerprint('speeds')
+    assert list(workspace.read('speeds', ['MaxUp'])) == [(5.0, ), (5.0, )]
+
+
+def test_fingerprinting_a_table_boost_did_not_write_does_not_change_it(workspace):
+    with workspace.connection as connection:
+        connection.execute('CREATE TABLE plain (value INTEGER)')
+        connection.execute('INSERT INTO plain VALUES (1)')
+
+    before = workspace.fingerprint('plain')
+    triggers = workspace.connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'plain'").fetchone()
+
+    assert before['change'] is None and triggers == (0, )
+    assert 'plain' in workspace.list() and 'boost_changes' not in workspace.list()
+
+    with workspace.connection as connection:
+        connection.execute('INSERT INTO plain VALUES (2)')
+
+    assert workspace.fingerprint('plain') != before
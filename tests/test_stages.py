@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_stages.py
+
+Tests that --resume reruns the steps whose inputs changed
+'''
+
+import csv
+
+import numpy as np
+
+from boost import workspaces
+from boost.config import feature_classes
+from boost.frame import to_structured
+from boost.stages import StageRunner
+from conftest import edit
+
+
+def test_a_stage_reruns_when_only_values_change(tmp_path):
+    workspace = workspaces.create(str(tmp_path / 'boost.sqlite'))
+    workspace.write_table('speeds', to_structured([('MaxDown', np.array([25.0]))]))
+
+    runs = []
+
+    def run():
+        StageRunner(str(tmp_path / 'stages.json'), 'test', workspace.fingerprint, resume=True).run(
+            'count', lambda: runs.append(1), inputs=['speeds'])
+
+    run()
+    run()
+    assert len(runs) == 1
+
+    with workspace.connection as connection:
+        connection.execute('UPDATE speeds SET MaxDown = 1000')
+
+    run()
+    assert len(runs) == 2
+
+
+def test_datasets_are_fingerprinted_once_and_only_when_resuming(tmp_path):
+    fingerprinted = []
+
+    def fingerprint(name):
+        fingerprinted.append(name)
+
+        return {'name': name}
+
+    for resume in [False, True]:
+        runner = StageRunner(str(tmp_path / 'stages.json'), 'test', fingerprint, resume=resume)
+        runner.run('first', lambda: None, inputs=['points'], outputs=['joined'])
+        runner.run('second', lambda: None, inputs=['points', 'joined'], outputs=['counts'])
+
+        if not resume:
+            assert fingerprinted == []
+
+    #: joined is fingerprinted again once the first stage writes it and that fingerprint is the input of the second
+    assert fingerprinted == ['points', 'joined', 'counts']
+
+
+def test_resume_reruns_every_command_after_service_speeds_are_edited(gpkg, tmp_path, boost):
+    target = str(tmp_path / 'csv')
+    (tmp_path / 'csv').mkdir()
+
+    def run_all(*resume):
+        return ''.join([
+            boost('analyze', '--workspace', gpkg, '--backend', 'shapely', *resume),
+            boost('stats', '--workspace', gpkg, *resume),
+            boost('postprocess', '--workspace', gpkg, '--target', target, *resume),
+        ])
+
+    assert 'Skipping' not in run_all('--resume')
+    assert run_all('--resume').count('Skipping') == 3
+
+    #: the same number of rows with every speed changed
+    edit(gpkg, feature_classes['bb_service'], 'UPDATE {} SET MAXADDOWN = 1000, MAXADUP = 1000'.format(feature_classes['bb_service']))
+
+    assert 'Skipping' not in run_all('--resume')
+
+    speeds = set(workspaces.create(gpkg).read(feature_classes['msba'], ['MAX_MaxDown', 'MAX_MaxUp']))
+    assert speeds == {(1000.0, 1000.0), (0.0, 0.0)}
+
+    with open(str(tmp_path / 'csv' / 'MaxDown_State.csv')) as source:
+        counts = {row['NTIA Speed Range']: row['Count'] for row in csv.DictReader(source)}
+    assert counts['1 Gbps or greater'] == '3'
+    assert counts['25-49.9 Mbps'] == '0'
+
+    with open(str(tmp_path / 'csv' / 'MaxDownUp_State_AtOrAbove.csv')) as source:
+        joint = {(row['Download Speed Range'], row['Upload Speed Range']): (row['Count At Or Above'], row['Address Count'])
+                 for row in csv.DictReader(source)}
+    assert joint[('25-49.9 Mbps', '3-5.9 Mbps')] == ('3', '4.0')
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_startup.py
+
+Tests that the command line only imports what the command it runs needs
+'''
+
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+def imported(*arguments):
+    '''runs boost with the arguments in a fresh interpreter under -X importtime and returns the modules it imported
+    '''
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'boost'] + list(arguments), cwd=ROOT,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+    return {
+        line.split('|')[-1].strip()
+        for line in process.stderr.splitlines() if line.startswith('import time:') and 'cumulative' not in line
+    }
+
+
+@pytest.mark.parametrize('arguments', [['--help'], ['--version']])
+def test_help_and_version_do_not_import_arcpy_or_numpy(arguments):
+    modules = imported(*arguments)
+    packages = {module.split('.')[0] for module in modules}
+
+    assert 'boost.cli' in modules
+    assert 'arcpy' not in packages and 'numpy' not in packages
+
+
+def test_postprocess_against_a_geopackage_does_not_import_arcpy(tmp_path):
+    modules = imported('postprocess', '--target', str(tmp_path), '--workspace', str(tmp_path / 'missing.gpkg'))
+
+    assert 'boost.report' in modules
+    assert 'arcpy' not in {module.split('.')[0] for module in modules}
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_tiers.py
+
+Tests for the speed tier classification
+'''
+
+import numpy as np
+
+from boost import tiers
+
+
+def ladder(value):
+    '''the per row classification Stats.speed_tiers ran before the breakpoint table
+    '''
+    if value < 0.768:
+        return 0
+    elif 0.768 <= value < 1.5:
+        return 3
+    elif 1.5 <= value < 3:
+        return 4
+    elif 3 <= value < 6:
+        return 5
+    elif 6 <= value < 10:
+        return 6
+    elif 10 <= value < 25:
+        return 7
+    elif 25 <= value < 50:
+        return 8
+    elif 50 <= value < 100:
+        return 9
+    elif 100 <= value < 1000:
+        return 10
+    elif value >= 1000:
+        return 11
+
+
+def test_every_breakpoint_edge_matches_the_ladder():
+    edges = np.array([0.768, 1.5, 3, 6, 10, 25, 50, 100, 1000], dtype='f8')
+    #: each breakpoint and the closest speeds on either side of it
+    speeds = np.concatenate(([0, -1, 5000], edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)))
+
+    down, up = tiers.classify_speeds(speeds, speeds[::-1])
+
+    assert down.tolist() == [ladder(speed) for speed in speeds.tolist()]
+    assert up.tolist() == [ladder(speed) for speed in speeds[::-1].tolist()]
+    assert down[3:12].tolist() == [3, 4, 5, 6, 7, 8, 9, 10, 11]
+
+
+def test_null_speeds_are_missing():
+    down, up = tiers.classify_speeds([np.nan, 25.0, None], [3.0, np.nan, np.nan])
+
+    assert down.tolist() == [tiers.MISSING, 8, tiers.MISSING]
+    assert up.tolist() == [5, tiers.MISSING, tiers.MISSING]